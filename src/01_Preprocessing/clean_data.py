@@ -1,108 +1,157 @@
-import csv
-import datetime
-from datetime import timedelta
+import numpy as np
+import pandas as pd
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.timestamps import NS_PER_MIN, to_timestamp_ns, from_timestamp_ns
 
 input_file = 'data_center_load.csv'
 output_file = 'data_center_load_clean.csv'
 
-def parse_row(row):
-    # row: [no, date, hour, minute, measured_kWh, realtime_kWh]
-    d_str, h_str, m_str = row[1], row[2], row[3]
-    try:
-        dt = datetime.datetime.strptime(f"{d_str} {h_str}:{m_str}", "%Y%m%d %H:%M")
-        m_kwh = float(row[4])
-        r_kwh = float(row[5])
-        return {'dt': dt, 'measured': m_kwh, 'realtime': r_kwh, 'orig_row': row}
-    except ValueError:
-        return None
-
-try:
-    with open(input_file, 'r', encoding='utf-8-sig') as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        
-        data_map = {}
-        for row in reader:
-            parsed = parse_row(row)
-            if parsed:
-                data_map[parsed['dt']] = parsed
-
-    # Determine range
-    all_dts = sorted(list(data_map.keys()))
-    start_dt = all_dts[0]
-    end_dt = all_dts[-1]
-    
-    print(f"Range: {start_dt} ~ {end_dt}")
-    
-    # Generate complete timeline
-    current = start_dt
-    cleaned_rows = []
-    
-    # We'll assign a new 'no' sequence
-    new_no = 1
-    missing_count = 0
-    
-    while current <= end_dt:
-        if current in data_map:
-            # Existing data
-            item = data_map[current]
-            # Reconstruct row with new 'no' to keep it clean, or keep original?
-            # Let's keep original structure: no,date,hour,minute,measured_kWh,realtime_kWh
-            # But update 'no' to be continuous
-            
-            # Format date, hour, minute
-            d_str = current.strftime("%Y%m%d")
-            h_str = str(current.hour)
-            m_str = str(current.minute)
-            
-            row = [
-                new_no, d_str, h_str, m_str, 
-                f"{item['measured']:.2f}", f"{item['realtime']:.2f}"
-            ]
-            cleaned_rows.append(row)
-            
-        else:
-            # Missing data (Interpolate)
-            prev_dt = current - timedelta(minutes=15)
-            next_dt = current + timedelta(minutes=15)
-            
-            if prev_dt in data_map and next_dt in data_map:
-                prev_val = data_map[prev_dt]
-                next_val = data_map[next_dt]
-                
-                # Average
-                interp_measured = (prev_val['measured'] + next_val['measured']) / 2
-                interp_realtime = (prev_val['realtime'] + next_val['realtime']) / 2
-                
-                d_str = current.strftime("%Y%m%d")
-                h_str = str(current.hour)
-                m_str = str(current.minute)
-                
-                row = [
-                    new_no, d_str, h_str, m_str, 
-                    f"{interp_measured:.2f}", f"{interp_realtime:.2f}"
-                ]
-                cleaned_rows.append(row)
-                missing_count += 1
-            else:
-                # Can't interpolate (edge case or large gap), just copy previous or skip?
-                # For this dataset we know it's just single gaps.
-                # If we can't interpolate, we might leave it or fill 0?
-                # Let's fill 0 for safety but notify
-                print(f"Warning: Could not interpolate for {current}")
-                pass
-
-        current += timedelta(minutes=15)
-        new_no += 1
-
-    # Write output
-    with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
-        writer.writerows(cleaned_rows)
-
-    print(f"Done. Filled {missing_count} missing intervals.")
-    print(f"Saved to {output_file}")
-
-except Exception as e:
-    print(f"Error: {e}")
+# Gap filling configuration
+STEP_MINUTES = 15
+MAX_GAP_SLOTS = 4          # Longest run of missing 15-min slots that gets interpolated
+METHOD = 'linear'          # 'linear' (slot position) or 'time' (actual sample timestamps)
+CHUNK_SIZE = 1_000_000     # Rows per read_csv chunk
+VALUE_COLS = ['measured_kWh', 'realtime_kWh']
+METER_COL = 'meter'        # Only used if the export has a meter column
+
+STEP_NS = STEP_MINUTES * NS_PER_MIN
+
+def fill_gaps(t_ns, values, step_ns=STEP_NS, max_gap=MAX_GAP_SLOTS, method=METHOD):
+    """
+    Reindex samples onto a regular grid and interpolate short gaps.
+
+    t_ns:    sorted int64 timestamps (ns), one per sample
+    values:  (n, k) float array
+    Returns (grid_ns, filled_values, is_filled, slot) where slot is the grid
+    position of every output row counted from the first sample. Slots inside
+    gaps longer than max_gap are left out.
+    """
+    if method not in ('linear', 'time'):
+        raise ValueError(f"Unknown interpolation method: {method}")
+
+    # Snap samples to the grid, first sample wins on duplicates
+    origin = t_ns[0] - t_ns[0] % step_ns
+    slot_obs = (t_ns - origin) // step_ns
+    slot_obs, first = np.unique(slot_obs, return_index=True)
+    t_ns, values = t_ns[first], values[first]
+
+    n_slots = slot_obs[-1] + 1
+    idx = np.arange(n_slots)
+    observed = np.zeros(n_slots, dtype=bool)
+    observed[slot_obs] = True
+
+    grid_vals = np.full((n_slots, values.shape[1]), np.nan)
+    grid_vals[slot_obs] = values
+
+    # Previous / next observed slot for every grid position
+    prev = np.maximum.accumulate(np.where(observed, idx, -1))
+    nxt = np.minimum.accumulate(np.where(observed, idx, n_slots)[::-1])[::-1]
+    gap_len = nxt - prev - 1
+
+    fillable = ~observed & (prev >= 0) & (nxt < n_slots) & (gap_len <= max_gap)
+    f_idx = idx[fillable]
+    p, n = prev[fillable], nxt[fillable]
+
+    if method == 'linear':
+        w = (f_idx - p) / (n - p)
+    else:
+        # Weight by true sample time so off-grid readings are respected
+        t_slot = np.zeros(n_slots, dtype=np.int64)
+        t_slot[slot_obs] = t_ns
+        t_grid = origin + f_idx * step_ns
+        w = (t_grid - t_slot[p]) / (t_slot[n] - t_slot[p])
+        w = np.clip(w, 0.0, 1.0)
+
+    grid_vals[f_idx] = grid_vals[p] + (grid_vals[n] - grid_vals[p]) * w[:, None]
+
+    keep = observed | fillable
+    slot = idx[keep]
+    return origin + slot * step_ns, grid_vals[keep], fillable[keep], slot
+
+def clean_data(input_path=input_file, output_path=output_file,
+               max_gap=MAX_GAP_SLOTS, method=METHOD, chunk_size=CHUNK_SIZE):
+    # Last observed sample per meter, carried across chunk boundaries so that
+    # gaps spanning two chunks are filled exactly like gaps inside one chunk:
+    # meter -> (t_ns, values, no)
+    carry = {}
+    total_rows = filled_count = skipped_count = stale_count = 0
+    t_min = t_max = None
+    first_chunk = True
+
+    with open(output_path, 'w', encoding='utf-8-sig', newline='') as out:
+        reader = pd.read_csv(input_path, encoding='utf-8-sig', chunksize=chunk_size)
+
+        for chunk in reader:
+            # Rows that fail to parse become gaps (same as before)
+            keys = chunk[['date', 'hour', 'minute']].apply(pd.to_numeric, errors='coerce')
+            vals = chunk[VALUE_COLS].apply(pd.to_numeric, errors='coerce')
+            valid = keys.notna().all(axis=1) & vals.notna().all(axis=1)
+            chunk, keys, vals = chunk[valid], keys[valid], vals[valid]
+            total_rows += len(chunk)
+
+            t_all = to_timestamp_ns(keys['date'].values, keys['hour'].values, keys['minute'].values)
+            v_all = vals.values.astype(float)
+            has_meter = METER_COL in chunk.columns
+            meters = chunk[METER_COL].values if has_meter else np.zeros(len(chunk), dtype=np.int64)
+
+            out_frames = []
+            for meter, pos in pd.Series(np.arange(len(chunk))).groupby(meters, sort=False).indices.items():
+                order = pos[np.argsort(t_all[pos], kind='stable')]
+                t, v = t_all[order], v_all[order]
+                base_no = 1
+
+                if meter in carry:
+                    c_t, c_v, c_no = carry[meter]
+                    newer = t > c_t
+                    stale_count += int((~newer).sum())
+                    t, v = t[newer], v[newer]
+                    if len(t) == 0:
+                        continue
+                    t = np.concatenate([[c_t], t])
+                    v = np.vstack([c_v, v])
+                    base_no = c_no
+
+                grid, filled, is_filled, slot = fill_gaps(t, v, max_gap=max_gap, method=method)
+                no = base_no + slot
+                skipped_count += int(slot[-1] + 1 - len(slot))
+
+                if meter in carry:
+                    # Carried sample was written with the previous chunk
+                    grid, filled, is_filled, no = grid[1:], filled[1:], is_filled[1:], no[1:]
+
+                carry[meter] = (grid[-1], filled[-1], no[-1])
+                filled_count += int(is_filled.sum())
+                t_min = grid[0] if t_min is None else min(t_min, grid[0])
+                t_max = grid[-1] if t_max is None else max(t_max, grid[-1])
+
+                date, hour, minute = from_timestamp_ns(grid)
+                frame = pd.DataFrame({'no': no, 'date': date, 'hour': hour, 'minute': minute})
+                if has_meter:
+                    frame.insert(0, METER_COL, meter)
+                for j, col in enumerate(VALUE_COLS):
+                    frame[col] = filled[:, j]
+                frame['is_filled'] = is_filled
+                out_frames.append(frame)
+
+            if out_frames:
+                pd.concat(out_frames, ignore_index=True).to_csv(
+                    out, header=first_chunk, index=False, float_format='%.2f')
+                first_chunk = False
+
+    if t_min is None:
+        print("No valid rows found.")
+        return
+
+    print(f"Range: {pd.Timestamp(t_min)} ~ {pd.Timestamp(t_max)}")
+    print(f"Rows read: {total_rows}")
+    if stale_count:
+        print(f"Warning: Dropped {stale_count} duplicate/out-of-order rows across chunk boundaries")
+    if skipped_count:
+        print(f"Warning: {skipped_count} intervals left empty (gap longer than {max_gap} slots)")
+    print(f"Done. Filled {filled_count} missing intervals ({method}).")
+    print(f"Saved to {output_path}")
+
+if __name__ == "__main__":
+    clean_data()
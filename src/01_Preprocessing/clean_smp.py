@@ -1,77 +1,145 @@
+import argparse
+import re
 import pandas as pd
 import numpy as np
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import save_frame
+from common.timestamps import NS_PER_DAY
 
 input_file = 'data/SMP_system_price.csv'
-output_file = 'data/smp_clean.csv'
-
-def clean_smp():
-    print("Loading SMP data...")
-    # Inspect first few lines to detect header
-    try:
-        df = pd.read_csv(input_file, encoding='cp949') # Korean usually requires cp949
-    except:
-        df = pd.read_csv(input_file, encoding='utf-8')
-        
-    print("Original Columns:", df.columns.tolist())
-    print(df.head())
-    
-    # User said: "Date, Day, 01h ... 24h, Max, Min, Avg"
-    # Identify Date column
-    # Often '기간', '일자', '구분' etc.
-    # Let's verify columns dynamically
-    
-    # Drop summary columns if they exist
-    cols_to_drop = ['최대', '최소', '가중평균', '육지', '제주'] # Common extras
-    # Also user said "Max, Min, WeightedAvg" are the last 3.
-    
-    # Potential column names for hours: '1h', '2h' or '01시', '02시'...
-    # Let's try to melt.
-    
-    # Assume first column is Date
-    date_col = df.columns[0]
-    
-    # Filter only hour columns
-    # We need to identify which are hour columns.
-    # Usually they are numerical or 'X시'
-    
-    melted = df.melt(id_vars=[date_col], var_name='Hour_raw', value_name='SMP')
-    
-    # Clean Hour_raw
-    # Remove 'h', '시', space, etc.
-    melted['Hour'] = melted['Hour_raw'].astype(str).str.extract(r'(\d+)').astype(float)
-    
-    # Drop rows where Hour is NaN (likely non-hour columns like 'Day', 'Max', 'Min')
-    melted = melted.dropna(subset=['Hour'])
-    melted['Hour'] = melted['Hour'].astype(int)
-    
-    # Correct Date
-    # If date_col is just 'Date', good.
-    melted['Date'] = pd.to_datetime(melted[date_col])
-    
-    # Adjust Hour: Data usually 1h = 00:00 - 01:00 or 01:00?
-    # Market standard: '01h' means 00:00 ~ 01:00 consumption OR price for that hour.
-    # Let's align to start time. 
-    # Hour 1 -> 00:00 ? Or Hour 1 -> 01:00?
-    # Usually in KR Power Market, 1h is 00:00 ~ 01:00.
-    # So timestamp should be Date + (Hour-1) hours.
-    
-    melted['datetime'] = melted['Date'] + pd.to_timedelta(melted['Hour'] - 1, unit='h')
-    
-    melted = melted.sort_values('datetime').set_index('datetime')
-    
-    # Select SMP column
-    smp_df = melted[['SMP']].astype(float)
-    
-    # Upsample to 15 min
-    # SMP is constant for the hour. So Forward Fill (ffill) is correct.
-    smp_15min = smp_df.resample('15T').ffill()
-    
+output_file = 'data/smp_clean'
+
+CHUNK_SIZE = 100_000   # Days per read_csv chunk (multi-year archives are streamed)
+SLOTS_PER_HOUR = 4     # 15-min resolution
+
+# EPSIS export: 기간, 01시 ... 24시, 최대, 최소, 가중평균
+# Hour headers seen in the wild: '01시', '1시', '01h', '1h', '1'
+HOUR_PATTERN = re.compile(r'^\s*(\d{1,2})\s*(시|h|H)?\s*$')
+
+# Land/Jeju variants: either a region column inside one file, or one file per
+# region with the region in the file name. Land is the system SMP ('SMP').
+REGION_COLS = ['구분', '지역', 'region']
+REGION_SERIES = {'육지': 'SMP', 'land': 'SMP', '제주': 'SMP_jeju', 'jeju': 'SMP_jeju'}
+
+def read_header(path):
+    """Detect encoding (Korean exports are usually cp949) and return (encoding, columns)."""
+    for encoding in ['cp949', 'utf-8-sig']:
+        try:
+            return encoding, pd.read_csv(path, encoding=encoding, nrows=0).columns.tolist()
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"Could not decode {path}")
+
+def hour_columns(columns):
+    """Map hour columns to their 0-based start hour. '01시' covers 00:00-01:00."""
+    hours = {}
+    for col in columns:
+        match = HOUR_PATTERN.match(str(col))
+        if match and 1 <= int(match.group(1)) <= 24:
+            hours[col] = int(match.group(1)) - 1
+    if sorted(hours.values()) != list(range(24)):
+        raise ValueError(f"Expected 24 hour columns, found {sorted(hours)}")
+    return sorted(hours, key=hours.get)
+
+def file_region(path):
+    """
+    Series of a per-region file from the whole tokens of its name (split on
+    _ - . and spaces), Jeju first: smp_jeju_island.csv is Jeju, not 'land'.
+    """
+    tokens = set(re.split(r'[_\-.\s]+', os.path.basename(path).lower()))
+    for key, series in sorted(REGION_SERIES.items(), key=lambda item: item[1] != 'SMP_jeju'):
+        if key in tokens:
+            return series
+    return 'SMP'
+
+def read_price_matrix(path):
+    """
+    Stream one SMP table into {series: (day_ns, prices)} where day_ns is the
+    int64 midnight timestamp of every row and prices is its (days x 24) matrix.
+    """
+    encoding, columns = read_header(path)
+    date_col = columns[0]
+    hours = hour_columns(columns)
+    region_col = next((c for c in REGION_COLS if c in columns), None)
+    usecols = [date_col] + hours + ([region_col] if region_col else [])
+
+    parts = {}
+    for chunk in pd.read_csv(path, encoding=encoding, usecols=usecols, chunksize=CHUNK_SIZE):
+        # Parse the ~365 dates per year, not every 15-min slot
+        days = pd.to_datetime(chunk[date_col].astype(str).str.strip(), format='mixed')
+        day_ns = days.values.astype('M8[ns]').view(np.int64)
+        prices = chunk[hours].apply(pd.to_numeric, errors='coerce').values
+
+        if region_col:
+            region = chunk[region_col].astype(str).str.strip().str.lower().map(REGION_SERIES).fillna('SMP').values
+        else:
+            region = np.full(len(chunk), file_region(path))
+
+        for series in np.unique(region):
+            rows = region == series
+            parts.setdefault(series, []).append((day_ns[rows], prices[rows]))
+
+    return {series: (np.concatenate([d for d, _ in p]), np.vstack([v for _, v in p]))
+            for series, p in parts.items()}
+
+def expand_to_15min(day_ns, prices):
+    """
+    Expand a (days x 24) hourly price matrix to a continuous 15-min series.
+
+    Days are sorted and de-duplicated (later rows win). Missing days are
+    forward filled from the previous price, like an hourly ffill would.
+    Returns (datetime ns, price) arrays covering every slot of every day.
+    """
+    # Later rows win on duplicate days: reverse, then take the first occurrence
+    days, first = np.unique(day_ns[::-1], return_index=True)
+    prices = prices[::-1][first]
+
+    day_idx = (days - days[0]) // NS_PER_DAY
+    n_days = int(day_idx[-1]) + 1
+    grid = np.full((n_days, 24), np.nan)
+    grid[day_idx] = prices
+    if n_days > len(days):
+        print(f"Warning: {n_days - len(days)} missing day(s) forward filled")
+
+    slots = np.repeat(grid, SLOTS_PER_HOUR, axis=1).ravel()
+    slots = pd.Series(slots).ffill().values
+
+    step_ns = NS_PER_DAY // (24 * SLOTS_PER_HOUR)
+    t_ns = days[0] + np.arange(len(slots), dtype=np.int64) * step_ns
+    return t_ns, slots
+
+def clean_smp(input_files=None):
+    input_files = input_files or [input_file]
+    print(f"Loading SMP data from {len(input_files)} file(s)...")
+
+    # Collect the price matrices of every file per series (land / Jeju)
+    collected = {}
+    for path in input_files:
+        for series, (day_ns, prices) in read_price_matrix(path).items():
+            print(f"  {path}: {len(day_ns)} days -> {series}")
+            collected.setdefault(series, []).append((day_ns, prices))
+
+    frames = []
+    for series, parts in collected.items():
+        t_ns, values = expand_to_15min(np.concatenate([d for d, _ in parts]),
+                                       np.vstack([v for _, v in parts]))
+        frames.append(pd.Series(values, index=pd.DatetimeIndex(t_ns.view('M8[ns]'), name='datetime'), name=series))
+
+    # Land (system) SMP first, Jeju and others after
+    frames.sort(key=lambda s: s.name != 'SMP')
+    smp_15min = pd.concat(frames, axis=1)
+
     # Save
-    smp_15min.to_csv(output_file)
-    print(f"Saved cleaned SMP data to {output_file}")
+    saved = save_frame(smp_15min, output_file)
+    print(f"Saved cleaned SMP data to {saved}")
     print(smp_15min.head())
     print("\nStats:")
     print(smp_15min.describe())
 
 if __name__ == "__main__":
-    clean_smp()
+    parser = argparse.ArgumentParser(description='Expand hourly SMP tables to 15-min resolution.')
+    parser.add_argument('inputs', nargs='*', help=f'SMP CSV files (default: {input_file})')
+    args = parser.parse_args()
+    clean_smp(args.inputs)
@@ -1,68 +1,163 @@
+import argparse
 import pandas as pd
+import numpy as np
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame, save_frame
+from common.timestamps import build_datetime
+from common.incremental import add_arguments, load_params, merge_into, recompute_start, save_params
 
-load_file = 'data/data_center_load_annualized_20240601_20250531.csv'
-weather_file = 'data/data_weather.csv'
-output_file = 'data/data_with_weather.csv'
+load_file = 'data/data_center_load_annualized_20240601_20250531'
+weather_files = ['data/data_weather.csv']  # One or more ASOS exports (any number of stations each)
+output_file = 'data/data_with_weather'
+PARAMS_NAME = 'clean_weather'
+
+# ASOS column keywords -> output variable. temperature/humidity are required,
+# the others are carried through when the export contains them.
+WEATHER_VARS = {
+    'temperature': '기온',
+    'humidity': '습도',
+    'dew_point': '이슬점',
+    'wind_speed': '풍속',
+    'solar_radiation': '일사',
+}
+REQUIRED_VARS = ['temperature', 'humidity']
+STATION_COL = '지점'
+TIME_COL = '일시'
+
+# Station weights for the site series, e.g. {119: 0.7, 108: 0.3} (Suwon/Seoul).
+# Stations not listed get weight 1.0; weights are renormalized over the
+# stations that have a value at each timestamp.
+STATION_WEIGHTS = {}
+
+def read_weather(paths):
+    frames = []
+    for path in paths:
+        # Encoding for Korean chars (likely cp949)
+        try:
+            df = pd.read_csv(path, encoding='cp949')
+        except UnicodeDecodeError:
+            df = pd.read_csv(path, encoding='utf-8')
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+def detect_columns(df):
+    """Map output variable -> source column for the variables present in the export."""
+    columns = {}
+    for var, keyword in WEATHER_VARS.items():
+        matches = [c for c in df.columns if keyword in c]
+        if matches:
+            columns[var] = matches[0]
+    missing = [v for v in REQUIRED_VARS if v not in columns]
+    if missing:
+        raise ValueError(f"Weather data is missing {missing}: {df.columns.tolist()}")
+    return columns
+
+def resample_weather(t_obs, station, values, t_target, weights):
+    """
+    Interpolate every station/variable onto t_target in one np.interp call per variable.
+
+    t_obs:    int64 ns observation times, station: station id per observation,
+    values:   (n_obs, n_vars) float array (NaN = missing)
+    t_target: int64 ns target grid
+    weights:  {station: weight}
+    Returns (site, per_station) where site is the (n_target, n_vars) weighted
+    series and per_station is (n_stations, n_target, n_vars). Values beyond a
+    station's first/last observation are held constant (as ffill/bfill would).
+    """
+    stations = np.unique(station)
+    n_st, n_t, n_var = len(stations), len(t_target), values.shape[1]
+
+    # Work in minutes from the first timestamp so float64 stays exact, and
+    # lay the stations end to end on one monotonic axis: station k lives in
+    # [k * span, (k + 1) * span).
+    t0 = min(t_obs.min(), t_target.min())
+    x_obs = (t_obs - t0) / 6e10
+    x_tgt = (t_target - t0) / 6e10
+    span = max(x_obs.max(), x_tgt.max()) + 1.0
+    st_idx = np.searchsorted(stations, station)
+
+    # Sort by (station, time); first observation wins on duplicates
+    order = np.lexsort((x_obs, st_idx))
+    x_obs, st_idx, values = x_obs[order], st_idx[order], values[order]
+    dup = np.zeros(len(x_obs), dtype=bool)
+    dup[1:] = (x_obs[1:] == x_obs[:-1]) & (st_idx[1:] == st_idx[:-1])
+    x_obs, st_idx, values = x_obs[~dup], st_idx[~dup], values[~dup]
+
+    per_station = np.full((n_st, n_t, n_var), np.nan)
+    for j in range(n_var):
+        valid = ~np.isnan(values[:, j])
+        xs, ks, vs = x_obs[valid], st_idx[valid], values[valid, j]
+        has = np.bincount(ks, minlength=n_st) > 0
+        if not has.any():
+            continue
+        # Clamp each station's targets to its own observed range so np.interp
+        # never blends two neighbouring stations
+        lo = np.full(n_st, np.inf)
+        hi = np.full(n_st, -np.inf)
+        np.minimum.at(lo, ks, xs)
+        np.maximum.at(hi, ks, xs)
+        k = np.flatnonzero(has)
+        xq = np.clip(x_tgt[None, :], lo[k, None], hi[k, None]) + k[:, None] * span
+        per_station[k, :, j] = np.interp(xq, xs + ks * span, vs)
+
+    w = np.array([weights.get(s, 1.0) for s in stations], dtype=float)[:, None, None]
+    w = np.where(np.isnan(per_station), 0.0, w)
+    with np.errstate(invalid='ignore'):
+        site = np.nansum(per_station * w, axis=0) / w.sum(axis=0)
+    return site, per_station
+
+def clean_and_merge(incremental=False, since=None):
+    # Incremental: rows after the last weather observation seen by the previous
+    # run were held constant (no later sample to interpolate towards), so they
+    # are recomputed together with the new load rows
+    start = recompute_start(output_file, since=since) if incremental else None
+    if start is not None:
+        params = load_params(PARAMS_NAME)
+        if params is not None and since is None:
+            start = min(start, pd.Timestamp(params['weather_end']))
+        print(f"Incremental update from {start}")
+    elif incremental:
+        print("No existing output. Running full merge.")
 
-def clean_and_merge():
     # 1. Load Power Data
     print("Loading power data...")
-    df_load = pd.read_csv(load_file)
+    df_load = load_frame(load_file, since=start)
     
     # Create datetime index for load
-    df_load['datetime'] = pd.to_datetime(df_load['date'].astype(str) + ' ' + 
-                                         df_load['hour'].astype(str).str.zfill(2) + ':' + 
-                                         df_load['minute'].astype(str).str.zfill(2))
+    df_load['datetime'] = build_datetime(df_load['date'], df_load['hour'], df_load['minute'])
     df_load.set_index('datetime', inplace=True)
-    # Ensure is_weekday is boolean if needed, read_csv might load as object/bool
-    # It is already in file.
+    # is_weekday is loaded as a real boolean by the store
 
     
     # 2. Load Weather Data
     print("Loading weather data...")
-    # Encoding for Korean chars (likely cp949)
-    try:
-        df_weather = pd.read_csv(weather_file, encoding='cp949')
-    except UnicodeDecodeError:
-        df_weather = pd.read_csv(weather_file, encoding='utf-8')
-        
+    df_weather = read_weather(weather_files)
+
     # Inspect columns
-    # Expected: column containing '일시' for time, '기온' for temp
-    time_col = [c for c in df_weather.columns if '일시' in c][0]
-    temp_col = [c for c in df_weather.columns if '기온' in c][0]
-    humid_col = [c for c in df_weather.columns if '습도' in c][0]
-    
-    print(f"Weather columns detected: Time='{time_col}', Temp='{temp_col}', Humid='{humid_col}'")
-    
-    df_weather[time_col] = pd.to_datetime(df_weather[time_col])
-    df_weather.set_index(time_col, inplace=True)
-    
-    # Select temperature and humidity
-    df_weather = df_weather[[temp_col, humid_col]].rename(columns={temp_col: 'temperature', humid_col: 'humidity'})
-    
-    # Remove duplicates if any
-    df_weather = df_weather[~df_weather.index.duplicated(keep='first')]
-    
+    # Expected: '일시' for time, '기온' for temp, '습도' for humidity (+ optional extras)
+    var_cols = detect_columns(df_weather)
+    print(f"Weather columns detected: Time='{TIME_COL}', " +
+          ", ".join(f"{v}='{c}'" for v, c in var_cols.items()))
+
+    t_obs = pd.to_datetime(df_weather[TIME_COL]).values.astype('M8[ns]').view(np.int64)
+    station = df_weather[STATION_COL].values if STATION_COL in df_weather.columns else np.zeros(len(df_weather), dtype=int)
+    values = df_weather[list(var_cols.values())].apply(pd.to_numeric, errors='coerce').values
+    print(f"Stations: {np.unique(station).tolist()}")
+
     # 3. Resample and Interpolate
     print("Resampling weather data...")
-    # Reindex to match load data (15 min)
-    combined_index = df_load.index.union(df_weather.index).sort_values()
-    df_weather_resampled = df_weather.reindex(combined_index)
-    
-    # Interpolate (Time method respects distance)
-    df_weather_resampled['temperature'] = df_weather_resampled['temperature'].interpolate(method='time')
-    df_weather_resampled['humidity'] = df_weather_resampled['humidity'].interpolate(method='time')
-    
-    # Now filter only the timestamps we need (from load data)
-    df_final_weather = df_weather_resampled.loc[df_load.index]
-    
+    # Interpolate straight onto the load's 15-min timestamps (time-weighted)
+    t_target = df_load.index.values.astype('M8[ns]').view(np.int64)
+    site, _ = resample_weather(t_obs, station, values, t_target, STATION_WEIGHTS)
+    df_final_weather = pd.DataFrame(site, index=df_load.index, columns=list(var_cols))
+
     # 4. Merge
     print("Merging datasets...")
     # df_load has [no, date, hour, minute, measured, realtime, is_weekday]
-    # Do join
-    df_merged = df_load.join(df_final_weather[['temperature', 'humidity']])
-    
+    df_merged = df_load.join(df_final_weather)
+
     # Check for NaNs
     nan_count_t = df_merged['temperature'].isnull().sum()
     nan_count_h = df_merged['humidity'].isnull().sum()
@@ -73,29 +168,16 @@ def clean_and_merge():
         df_merged['humidity'] = df_merged['humidity'].ffill().bfill()
         
     # Round to 2 decimal places
-    df_merged['temperature'] = df_merged['temperature'].round(2)
-    df_merged['humidity'] = df_merged['humidity'].round(2)
+    df_merged[list(var_cols)] = df_merged[list(var_cols)].round(2)
         
-    # Save (index=False to remove datetime column, keeping date/hour/minute/is_weekday columns)
-    # df_merged currently has index 'datetime'. Columns are [no, date, hour, minute, measured, realtime, is_weekday, temperature, humidity]
-    df_merged.to_csv(output_file) # Saving index=True is actually safer for TS but user pattern was index=False. 
-    # But clean_weather.py used `df_merged.to_csv(output_file, index=False)`.
-    # And index was 'datetime'. So previous output was MISSING datetime index?
-    # Or did it rely on 'date', 'hour', 'minute' columns being present? Yes.
-    # df_load still has those columns because set_index(inplace=True) removes the column by default unless drop=False?
-    # Default drop=True. 
-    # WAIT. pd.read_csv -> set_index(inplace=True) -> 'datetime' becomes index, removes 'date' if it was used? 
-    # No, 'date' was used in `pd.to_datetime` contruction but not as `keys`.
-    # Actually, `set_index` drops the column used as index. 
-    # I created `datetime` column then set it as index. 
-    # Original columns `date`, `hour` etc remain unless I explicitly dropped them? No, they remain.
-    # Ah, `set_index` removes the column that becomes the index.
-    # BUT `date`, `hour` were NOT the index. `datetime` was the new column.
-    # So `date`, `hour` etc are safe.
-    
-    # So simply saving with index=False (default behavior in previous code) is fine.
-    df_merged.to_csv(output_file, index=False)
-    print(f"Saved merged data to {output_file}")
+    # Save without the datetime index; date/hour/minute/is_weekday columns are kept
+    # Columns are [no, date, hour, minute, measured, realtime, is_weekday, temperature, humidity, (extras)]
+    if start is not None:
+        saved, _ = merge_into(output_file, df_merged, start, index=False)
+    else:
+        saved = save_frame(df_merged, output_file, index=False)
+    save_params(PARAMS_NAME, {'weather_end': str(pd.Timestamp(t_obs.max()))})
+    print(f"Saved merged data to {saved}")
     print(df_merged.head())
     print("\nTemperature Stats:")
     print(df_merged['temperature'].describe())
@@ -103,4 +185,7 @@ def clean_and_merge():
     print(df_merged['humidity'].describe())
 
 if __name__ == "__main__":
-    clean_and_merge()
+    parser = argparse.ArgumentParser(description='Merge interpolated weather into the load data.')
+    add_arguments(parser)
+    args = parser.parse_args()
+    clean_and_merge(args.incremental, args.since)
@@ -1,184 +1,206 @@
+import argparse
 import pandas as pd
 import numpy as np
 import warnings
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.profile_cube import load_cube, SLOTS_PER_HOUR
+from common.storage import load_frame, save_frame
+from common.timestamps import build_datetime, from_timestamp_ns
 
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
 # Configuration
-INPUT_FILE = 'data/data_center_load_clean.csv'
-OUTPUT_FILE = 'data/data_center_load_annualized_20240601_20250531.csv'
+INPUT_FILE = 'data/data_center_load_clean'
+OUTPUT_FILE = 'data/data_center_load_annualized_20240601_20250531'
+MC_OUTPUT_FILE = 'data/data_center_load_mc_years.npz'
 SEED = 42
 TARGET_END_DATE = '2025-05-31'
 
-def get_season(month):
-    if month in [6, 7, 8]:
-        return 'Summer'
-    elif month in [9, 10, 11]:
-        return 'Fall'
-    elif month in [12, 1]:
-        return 'Winter'
-    else:
-         # For profile extraction (existing data), existing months are 6,7,8,9,10,11,12,1.
-         # So we cover all existing.
-         # For generation (Mar, Apr, May), we assign them 'Spring' typically, 
-         # but here we map them to Fall Profile later. 
-         # We'll handle generation mapping separately.
-        return 'Spring' 
+# Profile tensor axes: season x is_weekend x hour x 15-min slot
+SEASONS = ['Summer', 'Fall', 'Winter', 'Spring']
+SEASON_CODE = {s: i for i, s in enumerate(SEASONS)}
+PROFILE_STATS = ['mean', 'std', 'p05', 'p95']
+PROFILE_QUANTILES = (0.05, 0.95)
 
-def generate_annual_load():
-    np.random.seed(SEED)
-    print("Loading existing data...")
+# Generation rules per calendar month: (profile season, noise scale)
+# Jan-Feb -> Winter Profile (Noise * 0.7)
+# Mar-May -> Fall Profile (Fall Proxy)
+MONTH_PROFILE = {
+    1: ('Winter', 0.7), 2: ('Winter', 0.7),
+    3: ('Fall', 1.0), 4: ('Fall', 1.0), 5: ('Fall', 1.0),
+    6: ('Summer', 1.0), 7: ('Summer', 1.0), 8: ('Summer', 1.0),
+    9: ('Fall', 1.0), 10: ('Fall', 1.0), 11: ('Fall', 1.0),
+    12: ('Winter', 1.0),
+}
+# Lookup arrays indexed by month (index 0 unused)
+MONTH_SEASON = np.array([0] + [SEASON_CODE[MONTH_PROFILE[m][0]] for m in range(1, 13)])
+MONTH_NOISE = np.array([0.0] + [MONTH_PROFILE[m][1] for m in range(1, 13)])
+
+# Profile extraction season of every month (index 0 unused).
+# Existing months are 6,7,8,9,10,11,12,1, so Summer/Fall/Winter cover all of them.
+# For generation (Mar, Apr, May), we assign them 'Spring' typically,
+# but they are mapped to the Fall Profile by MONTH_PROFILE.
+PROFILE_SEASON_OF_MONTH = ['', 'Winter', 'Spring', 'Spring', 'Spring', 'Spring', 'Summer',
+                           'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter']
+
+def build_profile_tensor(path=INPUT_FILE):
+    """
+    Extract seasonal profiles into a dense array.
+
+    Returns float array of shape (4 stats, 4 seasons, 2 day types, 24 hours, 4 slots)
+    ordered as PROFILE_STATS x SEASONS x [weekday, weekend] x hour x minute//15.
+    Cells with no source data are NaN. The statistics of measured_kWh come from
+    the shared (cached) profile cube of the input table.
+    """
+    cube = load_cube(path, ['measured_kWh'], seasons=SEASONS, season_of_month=PROFILE_SEASON_OF_MONTH,
+                     quantiles=PROFILE_QUANTILES)
+    stats = cube['values'][[cube['stats'].index(stat) for stat in PROFILE_STATS], 0]
+    return stats.reshape(stats.shape[:-1] + (24, SLOTS_PER_HOUR))
+
+def synthesize_load(index, profiles, n_years=1):
+    """
+    Draw synthetic 15-min loads for every timestamp in index.
+
+    All profile lookups are a single gather and the noise for all n_years
+    samples is drawn in one call, so the result is an (n_years, len(index))
+    array. Uses the global NumPy RNG (seeded by the caller); with n_years=1 the
+    draws match the original row-by-row generator.
+    """
+    month = index.month.values
+    s = MONTH_SEASON[month]
+    w = (index.weekday >= 5).astype(int) # 5=Sat, 6=Sun
+    h = index.hour.values
+    m = index.minute.values // 15
+
+    mean_val, std_val, p05_val, p95_val = profiles[:, s, w, h, m]
+
+    # Fallback if specific key missing (unlikely if data is complete)
+    missing = np.isnan(mean_val)
+    if missing.any():
+        print(f"Warning: Missing profile for {missing.sum()} timestamps (e.g. {index[missing][0]})")
+        mean_val = np.where(missing, 1000.0, mean_val) # dummy
+        p05_val = np.where(missing, 1000.0, p05_val)
+        p95_val = np.where(missing, 1000.0, p95_val)
+    std_val = np.nan_to_num(std_val)
+
+    # Generate Noise (one draw for every sample x timestamp)
+    noise = np.random.normal(0, std_val * MONTH_NOISE[month], size=(n_years, len(index)))
+
+    # Clip between P05 and P95 to remove extreme outliers, and keep non-negative
+    # Ensure P05 <= P95 (sanity)
+    lower = np.maximum(np.minimum(p05_val, p95_val), 0)
+    upper = np.maximum(np.maximum(p05_val, p95_val), 0)
+    return np.clip(mean_val + noise, lower, upper)
+
+def load_existing():
     # Load data
-    df = pd.read_csv(INPUT_FILE)
-    
+    df = load_frame(INPUT_FILE)
+
     # Create datetime from columns if needed, or parse if 'date' is YYYYMMDD
     # 'date' column is int YYYYMMDD. 'hour', 'minute'.
     # Let's create a proper datetime index
-    df['datetime'] = pd.to_datetime(df['date'].astype(str) + ' ' + 
-                                   df['hour'].astype(str).str.zfill(2) + ':' + 
-                                   df['minute'].astype(str).str.zfill(2))
+    df['datetime'] = build_datetime(df['date'], df['hour'], df['minute'])
     df = df.set_index('datetime').sort_index()
-    
-    # 1. Feature Engineering for Profile Extraction
-    df['month'] = df.index.month
-    df['season'] = df['month'].apply(get_season)
-    df['is_weekend'] = df.index.weekday >= 5 # 5=Sat, 6=Sun
-    df['hour'] = df.index.hour
-    df['minute'] = df.index.minute
-    
+    return df
+
+def generate_annual_load():
+    np.random.seed(SEED)
+    print("Loading existing data...")
+    df = load_existing()
+
     print(f"Existing Data Range: {df.index.min()} to {df.index.max()}")
-    
+
     # 2. Extract Profiles
-    # Group by [Season, IsWeekend, Hour, Minute]
     # We only care about Summer, Fall, Winter in existing data.
     # Spring (if any) shouldn't exist in source 2024-06 to 2025-01.
-    
-    # Calculate Mean, Std, P05, P95
-    # Only use measured_kWh
-    groups = df.groupby(['season', 'is_weekend', 'hour', 'minute'])['measured_kWh']
-    
-    profile_mean = groups.mean()
-    profile_std = groups.std()
-    profile_p05 = groups.quantile(0.05)
-    profile_p95 = groups.quantile(0.95)
-    
+    profiles = build_profile_tensor()
+
     print("Seasonal Profiles extracted.")
-    
+
     # 3. Define Generation Period
     last_date = df.index.max()
     start_gen = last_date + pd.Timedelta(minutes=15)
     end_gen = pd.Timestamp(TARGET_END_DATE) + pd.Timedelta(hours=23, minutes=45)
-    
+
     print(f"Generating Data from {start_gen} to {end_gen}...")
-    
+
     gen_index = pd.date_range(start=start_gen, end=end_gen, freq='15min')
     gen_df = pd.DataFrame(index=gen_index)
-    
+
     # 4. Generate Data
-    generated_loads = []
-    
-    for ts in gen_index:
-        month = ts.month
-        hour = ts.hour
-        minute = ts.minute
-        is_weekend = ts.weekday() >= 5
-        
-        # Determine Profile to Use & Noise Scale
-        # Rules:
-        # Jan-Feb -> Winter Profile (Noise * 0.7)
-        # Mar-May -> Fall Profile (Fall Proxy)
-        
-        if month in [1, 2]:
-            season_key = 'Winter'
-            noise_scale = 0.7
-        elif month in [3, 4, 5]:
-            season_key = 'Fall'
-            noise_scale = 1.0 # Standard noise for Fall proxy
-        elif month in [6, 7, 8]: # Should check if we need to generate Summer? End date is May 31.
-            season_key = 'Summer'
-            noise_scale = 1.0
-        else:
-             # Fall
-            season_key = 'Fall'
-            noise_scale = 1.0
-            
-        # Get Stats
-        try:
-            # profile keys: (season, is_weekend, hour, minute)
-            mean_val = profile_mean.loc[(season_key, is_weekend, hour, minute)]
-            std_val = profile_std.loc[(season_key, is_weekend, hour, minute)]
-            p05_val = profile_p05.loc[(season_key, is_weekend, hour, minute)]
-            p95_val = profile_p95.loc[(season_key, is_weekend, hour, minute)]
-        except KeyError:
-            # Fallback if specific key missing (unlikely if data is complete)
-            # Use just hour/minute mean ignoring season/weekend? Or surrounding?
-            # Assuming complete data for simplification
-            mean_val = 1000 # dummy
-            std_val = 0
-            p05_val = 1000
-            p95_val = 1000
-            print(f"Warning: Missing profile for {ts}")
-
-        # Generate Noise
-        noise = np.random.normal(0, std_val * noise_scale)
-        
-        # Base Load
-        load = mean_val + noise
-        
-        # Clip
-        # Clip between P05 and P95 to remove extreme outliers
-        # Ensure P05 <= P95 (sanity)
-        lower = min(p05_val, p95_val)
-        upper = max(p05_val, p95_val)
-        
-        # Apply strict clip? Or soft clip?
-        # User suggested: "Clip(Load, P05, P95)"
-        load = np.clip(load, lower, upper)
-        
-        # Ensure non-negative
-        load = max(0, load)
-        
-        generated_loads.append(load)
-        
+    generated_loads = synthesize_load(gen_index, profiles)[0]
+
     gen_df['measured_kWh'] = generated_loads
     gen_df['realtime_kWh'] = generated_loads # Assuming forecast matches actual for generation
-    
+
     # 5. Combine
     # Prepare generated dataframe to match existing format
     # Columns: no, date, hour, minute, measured_kWh, realtime_kWh
     # 'no' needs to continue
     last_no = df['no'].max()
     gen_df['no'] = range(last_no + 1, last_no + 1 + len(gen_df))
-    gen_df['date'] = gen_df.index.strftime('%Y%m%d').astype(int)
-    gen_df['hour'] = gen_df.index.hour
-    gen_df['minute'] = gen_df.index.minute
-    
+    gen_df['date'], gen_df['hour'], gen_df['minute'] = from_timestamp_ns(gen_index.asi8)
+
     # Append
-    final_df = pd.concat([df[['no', 'date', 'hour', 'minute', 'measured_kWh', 'realtime_kWh']], 
+    final_df = pd.concat([df[['no', 'date', 'hour', 'minute', 'measured_kWh', 'realtime_kWh']],
                           gen_df[['no', 'date', 'hour', 'minute', 'measured_kWh', 'realtime_kWh']]])
-    
+
     # 6. Final Polish
     # Sort
     final_df = final_df.sort_index()
-    
+
     # Add 'is_weekday' column as requested (Important!)
     # Re-calculate on full index
     final_df['is_weekday'] = final_df.index.weekday < 5
-    
+
     # Round to 2 decimal places
     final_df['measured_kWh'] = final_df['measured_kWh'].round(2)
     final_df['realtime_kWh'] = final_df['realtime_kWh'].round(2)
-    
+
     # Save
-    print(f"Saving to {OUTPUT_FILE}...")
-    final_df.to_csv(OUTPUT_FILE, index=False) # Index is datetime, but we want 'date', 'hour', 'minute' columns. 
-    # Usually we don't save the index if date/hour/minute are columns.
-    
+    # Index is datetime, but we want 'date', 'hour', 'minute' columns.
+    saved = save_frame(final_df, OUTPUT_FILE, index=False)
+    print(f"Saved to {saved}")
+
     print("Annual Load Generation Complete.")
     print(final_df.head())
     print(final_df.tail())
     print(f"Total Rows: {len(final_df)}")
 
+def generate_mc_years(n_years):
+    """
+    Synthesize n_years full Monte Carlo years (existing period start to
+    TARGET_END_DATE) purely from the seasonal profiles, shaped (n_years, T).
+    """
+    np.random.seed(SEED)
+    print("Loading existing data...")
+    df = load_existing()
+    profiles = build_profile_tensor()
+
+    start = df.index.min()
+    end = pd.Timestamp(TARGET_END_DATE) + pd.Timedelta(hours=23, minutes=45)
+    index = pd.date_range(start=start, end=end, freq='15min')
+
+    print(f"Synthesizing {n_years} years x {len(index)} intervals...")
+    loads = synthesize_load(index, profiles, n_years=n_years).astype(np.float32)
+
+    np.savez_compressed(MC_OUTPUT_FILE, datetime=index.values.astype('datetime64[ns]').view(np.int64),
+                        measured_kWh=loads)
+    print(f"Saved {loads.shape} samples to {MC_OUTPUT_FILE}")
+    print(f"Annual Energy (MWh): Mean={loads.sum(axis=1).mean()/1e3:,.1f}, "
+          f"P10={np.percentile(loads.sum(axis=1), 10)/1e3:,.1f}, P90={np.percentile(loads.sum(axis=1), 90)/1e3:,.1f}")
+    return index, loads
+
 if __name__ == "__main__":
-    generate_annual_load()
+    parser = argparse.ArgumentParser(description='Annualize the data center load from seasonal profiles.')
+    parser.add_argument('--mc-years', type=int, default=0,
+                        help='Synthesize N Monte Carlo years into MC_OUTPUT_FILE instead of the annualized CSV')
+    args = parser.parse_args()
+
+    if args.mc_years > 0:
+        generate_mc_years(args.mc_years)
+    else:
+        generate_annual_load()
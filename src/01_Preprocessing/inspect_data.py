@@ -1,89 +1,291 @@
-import csv
-import datetime
-import statistics
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.timestamps import NS_PER_MIN, to_timestamp_ns
 
 file_path = 'data_center_load.csv'
+report_file = 'data_center_load_profile.json'
 
-def parse_row(row):
-    # row: [no, date, hour, minute, measured_kWh, realtime_kWh]
-    # Handle byte order mark in header or first key if using DictReader
-    # But here we use reader, so header is separated.
-    
-    # Date: YYYYMMDD
-    d_str = row[1]
-    h_str = row[2]
-    m_str = row[3]
-    
-    try:
-        dt = datetime.datetime.strptime(f"{d_str} {h_str}:{m_str}", "%Y%m%d %H:%M")
-        m_kwh = float(row[4]) if row[4] else None
-        r_kwh = float(row[5]) if row[5] else None
-        return dt, m_kwh, r_kwh
-    except ValueError:
-        return None, None, None
-
-try:
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        print(f"Header: {header}")
-        
-        data = []
-        for row in reader:
-            if not row: continue
-            data.append(parse_row(row))
-            
-    # Remove None parse failures if any
-    data = [d for d in data if d[0] is not None]
-    
-    timestamps = [d[0] for d in data]
-    measured = [d[1] for d in data if d[1] is not None]
-    realtime = [d[2] for d in data if d[2] is not None]
-    
-    print(f"\n--- Total Rows: {len(data)} ---")
-    
-    # Missing values
-    missing_measured = len(data) - len(measured)
-    missing_realtime = len(data) - len(realtime)
-    print(f"Missing measured_kWh: {missing_measured}")
-    print(f"Missing realtime_kWh: {missing_realtime}")
-    
-    # Duplicates
-    if len(timestamps) != len(set(timestamps)):
-        print(f"Duplicate timestamps found! Unique: {len(set(timestamps))}")
+# Profiling configuration
+STEP_MINUTES = 15
+CHUNK_SIZE = 1_000_000          # Rows per read_csv chunk; memory is bounded by this
+VALUE_COLS = ['measured_kWh', 'realtime_kWh']
+METER_COL = 'meter'             # Only used if the export has a meter column
+VALUE_RANGE = (0.0, 1e6)        # Plausible kWh per interval; outside is flagged
+DIVERGENCE_TOL = 0.2            # |measured - realtime| / |realtime| above this is flagged
+MAX_LISTED = 1000               # Gap runs / examples kept in the report (totals are exact)
+
+STEP_NS = STEP_MINUTES * NS_PER_MIN
+NO_TIME = np.iinfo(np.int64).min
+
+def new_state():
+    return {
+        'meters': [], 'meter_ids': {},
+        'first': np.empty(0, dtype=np.int64), 'last': np.empty(0, dtype=np.int64),
+        'rows': np.empty(0, dtype=np.int64), 'duplicates': np.empty(0, dtype=np.int64),
+        'late': np.empty(0, dtype=np.int64), 'off_grid': np.empty(0, dtype=np.int64),
+        'seen': [],    # Per meter: bool bitmap of the grid slots first..last that have a row
+        'stats': {col: {k: np.empty(0) for k in ['count', 'missing', 'sum', 'sumsq', 'min', 'max', 'out_of_range']}
+                  for col in VALUE_COLS},
+        'div': {k: np.empty(0) for k in ['count', 'diverged', 'abs_sum', 'abs_max']},
+        'out_of_range_examples': [],
+        'header': None, 'total_rows': 0, 'bad_rows': 0,
+    }
+
+def _grow(state, n):
+    """Extend every per-meter array to n meters."""
+    def pad(a, fill):
+        return np.concatenate([a, np.full(n - len(a), fill, dtype=a.dtype)])
+    add = n - len(state['first'])
+    if add <= 0:
+        return
+    state['first'] = pad(state['first'], NO_TIME)
+    state['last'] = pad(state['last'], NO_TIME)
+    for k in ['rows', 'duplicates', 'late', 'off_grid']:
+        state[k] = pad(state[k], 0)
+    state['seen'].extend([None] * add)
+    for col in VALUE_COLS:
+        s = state['stats'][col]
+        for k in ['count', 'missing', 'sum', 'sumsq', 'out_of_range']:
+            s[k] = pad(s[k], 0.0)
+        s['min'] = pad(s['min'], np.inf)
+        s['max'] = pad(s['max'], -np.inf)
+    for k in state['div']:
+        state['div'][k] = pad(state['div'][k], 0.0)
+
+def meter_ids(state, chunk):
+    """Map the chunk's meter column to stable integer ids across chunks."""
+    if METER_COL not in chunk.columns:
+        if not state['meters']:
+            state['meters'].append('all')
+            state['meter_ids']['all'] = 0
+        return np.zeros(len(chunk), dtype=np.int64)
+    codes, uniques = pd.factorize(chunk[METER_COL].astype(str))
+    lookup = np.empty(len(uniques), dtype=np.int64)
+    for i, name in enumerate(uniques):
+        if name not in state['meter_ids']:
+            state['meter_ids'][name] = len(state['meters'])
+            state['meters'].append(name)
+        lookup[i] = state['meter_ids'][name]
+    return lookup[codes]
+
+def profile_chunk(state, chunk):
+    keys = chunk[['date', 'hour', 'minute']].apply(pd.to_numeric, errors='coerce')
+    valid = keys.notna().all(axis=1).values
+    state['total_rows'] += len(chunk)
+    state['bad_rows'] += int((~valid).sum())
+    chunk, keys = chunk[valid], keys[valid]
+    if len(chunk) == 0:
+        return
+
+    mid = meter_ids(state, chunk)
+    _grow(state, len(state['meters']))
+    n_m = len(state['meters'])
+    t = to_timestamp_ns(keys['date'].values, keys['hour'].values, keys['minute'].values)
+    vals = chunk[VALUE_COLS].apply(pd.to_numeric, errors='coerce').values
+
+    state['rows'] += np.bincount(mid, minlength=n_m)
+
+    # --- Value statistics ---
+    # Sums use np.add.at: one running sum per meter in file order, so they do
+    # not depend on where the chunks split (a per-chunk bincount would)
+    lo, hi = VALUE_RANGE
+    for j, col in enumerate(VALUE_COLS):
+        s = state['stats'][col]
+        v = vals[:, j]
+        ok = ~np.isnan(v)
+        s['missing'] += np.bincount(mid[~ok], minlength=n_m)
+        s['count'] += np.bincount(mid[ok], minlength=n_m)
+        np.add.at(s['sum'], mid[ok], v[ok])
+        np.add.at(s['sumsq'], mid[ok], v[ok] ** 2)
+        np.minimum.at(s['min'], mid[ok], v[ok])
+        np.maximum.at(s['max'], mid[ok], v[ok])
+        bad = ok & ((v < lo) | (v > hi))
+        s['out_of_range'] += np.bincount(mid[bad], minlength=n_m)
+        for i in np.flatnonzero(bad)[:max(0, MAX_LISTED - len(state['out_of_range_examples']))]:
+            state['out_of_range_examples'].append(
+                {'meter': state['meters'][mid[i]], 'time': str(pd.Timestamp(t[i])), 'column': col, 'value': float(v[i])})
+
+    # --- Measured vs realtime divergence ---
+    m, r = vals[:, 0], vals[:, 1]
+    both = ~np.isnan(m) & ~np.isnan(r)
+    diff = np.abs(m[both] - r[both])
+    rel = diff / np.maximum(np.abs(r[both]), 1e-9)
+    d = state['div']
+    d['count'] += np.bincount(mid[both], minlength=n_m)
+    d['diverged'] += np.bincount(mid[both][rel > DIVERGENCE_TOL], minlength=n_m)
+    np.add.at(d['abs_sum'], mid[both], diff)
+    np.maximum.at(d['abs_max'], mid[both], diff)
+
+    # --- Continuity: every on-grid row marks its slot in its meter's bitmap ---
+    # A row whose slot was already seen is a duplicate; a new slot before the
+    # meter's newest earlier row is late (it fills a gap). Both only depend on
+    # the file order, so the report is the same for any chunk size.
+    on_grid = t % STEP_NS == 0
+    state['off_grid'] += np.bincount(mid[~on_grid], minlength=n_m)
+    slot, mid = t[on_grid] // STEP_NS, mid[on_grid]
+    order = np.argsort(mid, kind='stable')      # File order within every meter
+    slot, mid = slot[order], mid[order]
+    starts = np.flatnonzero(np.r_[True, mid[1:] != mid[:-1]]) if len(mid) else []
+    for m, s in zip(mid[starts], np.split(slot, starts[1:])):
+        mark_slots(state, m, s)
+
+def mark_slots(state, m, s):
+    """Mark the grid slots s (file order) of meter m and count its duplicate / late rows."""
+    lo, hi = int(s.min()), int(s.max())
+    seen = state['seen'][m]
+    if seen is None:
+        first, last = lo, hi
+        seen = np.zeros(hi - lo + 1, dtype=bool)
     else:
-        print("No duplicate timestamps.")
-        
-    # Continuity
-    timestamps.sort()
-    start_time = timestamps[0]
-    end_time = timestamps[-1]
-    expected_count = int((end_time - start_time).total_seconds() / 900) + 1 # 15 min = 900 sec
-    
-    print(f"\n--- Time Range: {start_time} to {end_time} ---")
-    print(f"Expected count (15min intervals): {expected_count}")
-    print(f"Actual count: {len(timestamps)}")
-    
-    if len(timestamps) != expected_count:
-        print(f"MISSING INTERVALS: {expected_count - len(timestamps)}")
-        # Find holes
-        current = start_time
-        missing_count = 0
-        timestamp_set = set(timestamps)
-        while current <= end_time:
-            if current not in timestamp_set:
-                if missing_count < 5:
-                    print(f"Missing: {current}")
-                missing_count += 1
-            current += datetime.timedelta(minutes=15)
-        if missing_count >= 5:
-            print("...")
-            
-    # Stats
-    if measured:
-        print(f"\nMeasured kWh: Min={min(measured)}, Max={max(measured)}, Mean={statistics.mean(measured):.2f}")
-    if realtime:
-        print(f"\nRealtime kWh: Min={min(realtime)}, Max={max(realtime)}, Mean={statistics.mean(realtime):.2f}")
-
-except Exception as e:
-    print(f"Error: {e}")
+        # Grow the bitmap to the new first..last (exact, so it stays bounded)
+        first, last = state['first'][m] // STEP_NS, state['last'][m] // STEP_NS
+        if lo < first or hi > last:
+            grown = np.zeros(max(hi, last) - min(lo, first) + 1, dtype=bool)
+            grown[first - min(lo, first):][:len(seen)] = seen
+            first, last, seen = min(lo, first), max(hi, last), grown
+    idx = s - first
+
+    first_in_chunk = np.zeros(len(s), dtype=bool)
+    first_in_chunk[np.unique(idx, return_index=True)[1]] = True
+    new = first_in_chunk & ~seen[idx]
+    newest = state['last'][m] // STEP_NS if state['last'][m] != NO_TIME else lo
+    before = np.maximum.accumulate(np.r_[newest, s[:-1]])
+    state['duplicates'][m] += int((~new).sum())
+    state['late'][m] += int((new & (s < before)).sum())
+
+    seen[idx] = True
+    state['seen'][m] = seen
+    state['first'][m], state['last'][m] = first * STEP_NS, last * STEP_NS
+
+def gap_runs(seen):
+    """(start index, length) of every run of unseen slots in a meter's bitmap."""
+    edges = np.diff(np.r_[0, (~seen).astype(np.int8), 0])
+    starts = np.flatnonzero(edges == 1)
+    return starts, np.flatnonzero(edges == -1) - starts
+
+def build_report(state, path):
+    meters, gaps = [], []
+    for i, name in enumerate(state['meters']):
+        first, last = state['first'][i], state['last'][i]
+        expected = int((last - first) // STEP_NS + 1) if first != NO_TIME else 0
+        seen = state['seen'][i] if state['seen'][i] is not None else np.ones(0, dtype=bool)
+        g_start, g_len = gap_runs(seen)
+        for start, slots in zip(g_start[:max(0, MAX_LISTED - len(gaps))], g_len):
+            gaps.append({'meter': name, 'start': str(pd.Timestamp(first + int(start) * STEP_NS)),
+                         'slots': int(slots)})
+        entry = {
+            'meter': name,
+            'rows': int(state['rows'][i]),
+            'start': str(pd.Timestamp(first)) if first != NO_TIME else None,
+            'end': str(pd.Timestamp(last)) if last != NO_TIME else None,
+            'expected_intervals': expected,
+            'duplicates': int(state['duplicates'][i]),
+            'late_rows': int(state['late'][i]),
+            'off_grid': int(state['off_grid'][i]),
+            'gap_runs': len(g_len),
+            'missing_intervals': int(g_len.sum()),
+            'longest_gap_slots': int(g_len.max(initial=0)),
+            'columns': {},
+        }
+        for col in VALUE_COLS:
+            s = state['stats'][col]
+            n = s['count'][i]
+            mean = s['sum'][i] / n if n else None
+            std = np.sqrt(max(s['sumsq'][i] / n - mean ** 2, 0.0)) if n else None
+            entry['columns'][col] = {
+                'count': int(n), 'missing': int(s['missing'][i]),
+                'min': float(s['min'][i]) if n else None, 'max': float(s['max'][i]) if n else None,
+                'mean': mean, 'std': std, 'out_of_range': int(s['out_of_range'][i]),
+            }
+        d = state['div']
+        n = d['count'][i]
+        entry['divergence'] = {
+            'pairs': int(n), 'diverged': int(d['diverged'][i]), 'tolerance': DIVERGENCE_TOL,
+            'mean_abs_diff': float(d['abs_sum'][i] / n) if n else None,
+            'max_abs_diff': float(d['abs_max'][i]) if n else None,
+        }
+        meters.append(entry)
+
+    return {
+        'file': path, 'header': state['header'], 'step_minutes': STEP_MINUTES,
+        'total_rows': state['total_rows'], 'unparsable_rows': state['bad_rows'],
+        'value_range': list(VALUE_RANGE),
+        'meters': meters,
+        'gaps': gaps,
+        'out_of_range_examples': state['out_of_range_examples'],
+        'listed_limit': MAX_LISTED,
+    }
+
+def print_report(report):
+    print(f"Header: {report['header']}")
+    print(f"\n--- Total Rows: {report['total_rows']} ---")
+    if report['unparsable_rows']:
+        print(f"Unparsable rows: {report['unparsable_rows']}")
+
+    for m in report['meters']:
+        if len(report['meters']) > 1:
+            print(f"\n=== Meter {m['meter']} ({m['rows']} rows) ===")
+        for col, s in m['columns'].items():
+            print(f"Missing {col}: {s['missing']}")
+
+        if m['duplicates']:
+            print(f"Duplicate timestamps found! Duplicates: {m['duplicates']}")
+        else:
+            print("No duplicate timestamps.")
+        if m['late_rows']:
+            print(f"Late/out-of-order rows (filling earlier gaps): {m['late_rows']}")
+        if m['off_grid']:
+            print(f"Off-grid timestamps (not on the {STEP_MINUTES}-min grid): {m['off_grid']}")
+
+        print(f"\n--- Time Range: {m['start']} to {m['end']} ---")
+        print(f"Expected count ({STEP_MINUTES}min intervals): {m['expected_intervals']}")
+        if m['missing_intervals']:
+            print(f"MISSING INTERVALS: {m['missing_intervals']} in {m['gap_runs']} run(s), "
+                  f"longest {m['longest_gap_slots']} slots")
+            runs = [g for g in report['gaps'] if g['meter'] == m['meter']]
+            for g in runs[:5]:
+                print(f"Missing: {g['start']} (+{g['slots']} slots)")
+            if m['gap_runs'] > 5:
+                print("...")
+
+        for col, s in m['columns'].items():
+            if s['count']:
+                print(f"\n{col}: Min={s['min']}, Max={s['max']}, Mean={s['mean']:.2f}, Std={s['std']:.2f}"
+                      + (f", Out of range={s['out_of_range']}" if s['out_of_range'] else ""))
+        d = m['divergence']
+        if d['pairs']:
+            print(f"\nMeasured vs realtime: {d['diverged']} of {d['pairs']} intervals differ by more than "
+                  f"{DIVERGENCE_TOL:.0%} (mean |diff|={d['mean_abs_diff']:.2f}, max={d['max_abs_diff']:.2f})")
+
+def profile(path=file_path, output_path=report_file, chunk_size=CHUNK_SIZE):
+    state = new_state()
+    reader = pd.read_csv(path, encoding='utf-8-sig', chunksize=chunk_size, dtype=str)
+    for chunk in reader:
+        if state['header'] is None:
+            state['header'] = chunk.columns.tolist()
+        profile_chunk(state, chunk)
+
+    report = build_report(state, path)
+    print_report(report)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nSaved profile report to {output_path}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Profile a 15-min load export in chunks.')
+    parser.add_argument('path', nargs='?', default=file_path)
+    parser.add_argument('--report', default=report_file, help='JSON report output path')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    try:
+        profile(args.path, args.report, args.chunk_size)
+    except Exception as e:
+        print(f"Error: {e}")
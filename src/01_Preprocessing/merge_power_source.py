@@ -1,76 +1,181 @@
 import pandas as pd
 import glob
+import hashlib
+import json
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
 input_dir = 'power_source_data'
 output_file = 'data/power_source_integrated.csv'
 
-def merge_power_source():
+# Parsed monthly workbooks are cached here, keyed on the workbook content hash.
+# The manifest records which workbook versions are already in output_file.
+cache_dir = 'data/.cache/power_source'
+manifest_file = os.path.join(cache_dir, 'manifest.json')
+MAX_WORKERS = None  # Defaults to os.cpu_count()
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_EXT = '.parquet'
+except ImportError:
+    CACHE_EXT = '.pkl'
+
+# Columns: '태양광(BTM,추정)', '태양광(PPA,추정)', '태양광(전력시장)'
+SOLAR_COLS = ['태양광(BTM,추정)', '태양광(PPA,추정)', '태양광(전력시장)']
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def cache_path(digest):
+    return os.path.join(cache_dir, digest[:32] + CACHE_EXT)
+
+def read_cache(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+def parse_workbook(path, digest):
+    """Parse one monthly EPSIS workbook into a datetime-indexed frame and cache it."""
+    # Load excel, skip first row (title), use 2nd row as header
+    df = pd.read_excel(path, header=1)
+
+    # Create datetime index from '날짜' and '시간'
+    # '날짜' is likely YYYY-MM-DD, '시간' is likely HH:MM
+    if '날짜' not in df.columns or '시간' not in df.columns:
+        raise ValueError(f"Missing '날짜'/'시간' columns: {df.columns.tolist()}")
+    df['datetime'] = pd.to_datetime(df['날짜'].astype(str) + ' ' + df['시간'].astype(str))
+    df = df.set_index('datetime').sort_index()
+
+    # Select numeric columns only for resampling
+    df = df.select_dtypes(include=['number']).astype(float)
+
+    out = cache_path(digest)
+    if CACHE_EXT == '.parquet':
+        df.to_parquet(out)
+    else:
+        df.to_pickle(out)
+    return out
+
+def resample_month(df):
+    # Resample to 15 min using mean (assuming instantaneous MW data)
+    resampled = df.resample('15min').mean()
+
+    # Drop rows with all NaNs if any (e.g. gaps) - though probably continuous
+    resampled = resampled.dropna(how='all')
+
+    # Calculate PV_total
+    # Some might be missing if source file format changes, but assuming they exist based on previous output.
+    existing_solar_cols = [c for c in SOLAR_COLS if c in resampled.columns]
+    if existing_solar_cols:
+        resampled['PV_total'] = resampled[existing_solar_cols].sum(axis=1)
+
+    # Round to 2 decimal places
+    return resampled.round(2)
+
+def load_manifest():
+    if os.path.exists(manifest_file) and os.path.exists(output_file):
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def merge_power_source(full=False):
     print("Searching for Excel files...")
     # List all xlsx files
     files = sorted(glob.glob(os.path.join(input_dir, '*.xlsx')))
-    
+
     if not files:
         print("No Excel files found!")
         return
-        
+
     print(f"Found {len(files)} files: {[os.path.basename(f) for f in files]}")
-    
-    all_dfs = []
-    
-    for f in files:
-        print(f"Reading {f}...")
-        try:
-            # Load excel, skip first row (title), use 2nd row as header
-            df = pd.read_excel(f, header=1)
-            all_dfs.append(df)
-        except Exception as e:
-            print(f"Error reading {f}: {e}")
-            
-    if not all_dfs:
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # 1. Parse new/changed workbooks concurrently (unchanged ones come from cache)
+    previous = load_manifest()
+    digests = {os.path.basename(f): file_hash(f) for f in files}
+    to_parse = [f for f in files if not os.path.exists(cache_path(digests[os.path.basename(f)]))]
+
+    if to_parse:
+        print(f"Parsing {len(to_parse)} workbook(s) in parallel...")
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            futures = {f: pool.submit(parse_workbook, f, digests[os.path.basename(f)]) for f in to_parse}
+            for f, fut in futures.items():
+                try:
+                    fut.result()
+                    print(f"Parsed {f}")
+                except Exception as e:
+                    # Keep the last good version of the month (if any) rather than dropping it
+                    name = os.path.basename(f)
+                    print(f"Error reading {f}: {e}")
+                    if name in previous and os.path.exists(cache_path(previous[name])):
+                        print(f"  Keeping the previous version of {name}")
+                        digests[name] = previous[name]
+                    else:
+                        del digests[name]
+    else:
+        print("All workbooks cached.")
+
+    if not digests:
         print("No data loaded.")
         return
-    
-    print("Concatenating...")
-    merged_df = pd.concat(all_dfs, ignore_index=True)
-    
-    print("\nColumns:", merged_df.columns.tolist())
-    
-    # Create datetime index from '날짜' and '시간'
-    if '날짜' in merged_df.columns and '시간' in merged_df.columns:
-        print("Creating datetime index...")
-        # '날짜' is likely YYYY-MM-DD, '시간' is likely HH:MM
-        merged_df['datetime'] = pd.to_datetime(merged_df['날짜'].astype(str) + ' ' + merged_df['시간'].astype(str))
-        merged_df = merged_df.set_index('datetime').sort_index()
-        
-        # Resample to 15 min using mean (assuming instantaneous MW data)
-        print("Resampling to 15-min intervals...")
-        # Select numeric columns only for resampling
-        numeric_cols = merged_df.select_dtypes(include=['number']).columns
-        merged_resampled = merged_df[numeric_cols].resample('15min').mean()
-        
-        # Drop rows with all NaNs if any (e.g. gaps) - though probably continuous
-        merged_resampled = merged_resampled.dropna(how='all')
-        
-        # Calculate PV_total
-        # Columns: '태양광(BTM,추정)', '태양광(PPA,추정)', '태양광(전력시장)'
-        # Some might be missing if source file format changes, but assuming they exist based on previous output.
-        solar_cols = ['태양광(BTM,추정)', '태양광(PPA,추정)', '태양광(전력시장)']
-        existing_solar_cols = [c for c in solar_cols if c in merged_resampled.columns]
-        
-        if existing_solar_cols:
-            print(f"Calculating PV_total from {existing_solar_cols}...")
-            merged_resampled['PV_total'] = merged_resampled[existing_solar_cols].sum(axis=1)
-        
-        # Round to 2 decimal places
-        merged_df = merged_resampled.round(2)
-
-    # Save to CSV
-    merged_df.to_csv(output_file)
-    print(f"Saved merged and resampled data to {output_file}")
-    
+
+    # 2. Work out which months the integrated output is missing
+    # Only workbooks deleted from disk count as removed
+    manifest = {} if full else previous
+    on_disk = {os.path.basename(f) for f in files}
+    changed = [name for name, d in digests.items() if manifest.get(name) != d]
+    removed = [name for name in manifest if name not in on_disk]
+
+    if not changed and not removed:
+        print(f"{output_file} is up to date.")
+        return
+
+    if removed or not manifest:
+        # Full rebuild from cached months
+        print(f"Rebuilding from {len(digests)} cached months...")
+        parts = [resample_month(read_cache(cache_path(d))) for d in digests.values()]
+        merged_df = pd.concat(parts).sort_index()
+        merged_df = merged_df[~merged_df.index.duplicated(keep='last')]
+        merged_df.to_csv(output_file)
+        print(f"Saved merged and resampled data to {output_file}")
+    else:
+        print(f"Updating {len(changed)} month(s): {changed}")
+        parts = [resample_month(read_cache(cache_path(digests[name]))) for name in changed]
+        new_df = pd.concat(parts).sort_index()
+
+        existing_cols = pd.read_csv(output_file, nrows=0).columns.tolist()[1:]
+        existing_end = pd.to_datetime(pd.read_csv(output_file, usecols=['datetime'])['datetime']).max()
+
+        if new_df.index.min() > existing_end and new_df.columns.tolist() == existing_cols:
+            # New months only: append without touching existing rows
+            new_df.to_csv(output_file, mode='a', header=False)
+            print(f"Appended {len(new_df)} rows to {output_file}")
+        else:
+            # Changed months: replace their time range
+            existing = pd.read_csv(output_file, parse_dates=['datetime'], index_col='datetime')
+            keep = pd.Series(True, index=existing.index)
+            for part in parts:
+                keep &= ~((existing.index >= part.index.min()) & (existing.index <= part.index.max()))
+            merged_df = pd.concat([existing[keep.values], new_df]).sort_index()
+            merged_df.to_csv(output_file)
+            print(f"Replaced {len(new_df)} rows in {output_file}")
+        merged_df = new_df
+
+    # Months that failed to parse and have no previous version stay out of the
+    # manifest, so they are retried on the next run
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(digests, f, indent=2, ensure_ascii=False)
+
     print("\nShape:", merged_df.shape)
     print(merged_df.head())
 
 if __name__ == "__main__":
-    merge_power_source()
+    parser = argparse.ArgumentParser(description='Merge monthly EPSIS power source workbooks.')
+    parser.add_argument('--full', action='store_true', help='Rebuild the integrated file from all months')
+    args = parser.parse_args()
+    merge_power_source(full=args.full)
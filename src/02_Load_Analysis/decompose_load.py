@@ -1,108 +1,164 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.linear_model import LinearRegression
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import exists, load_frame, save_frame
+from common.timestamps import build_datetime
+from common.psychrometrics import calculate_enthalpy, pressure_at_altitude
+from common.changepoint import (fit_models, fit_models_batch, select_model, weather_terms,
+                                batch_weather_terms, rolling_hinge_fit, MODELS)
+from common.calibration import period_codes, period_targets, solve_k, k_per_sample, PERIODS
+from common.incremental import add_arguments, load_params, merge_into, recompute_start, save_params
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-file_path = 'data/data_with_weather.csv'
-output_csv = 'data/data_decomposition.csv'
+file_path = 'data/data_with_weather'
+output_data = 'data/data_decomposition'
+metered_pue_file = 'data/metered_pue'   # Optional metered PUE series ('pue' column)
+output_rolling = 'data/data_decomposition_rolling'
+output_bootstrap = 'data/data_decomposition_bootstrap'
 output_fig = 'figures/figure_decomposition.png'
+PARAMS_NAME = 'decompose_load'
+
+TARGET_PUE = 1.35
+PUE_PERIOD = 'year'       # Calibrate k once per 'year' (whole history), per 'season' or per 'month'
+PUE_TARGETS = {}          # Per-period targets, e.g. {'Summer': 1.45, 'Winter': 1.28} or {7: 1.5}; else TARGET_PUE
+PUE_SMOOTHING = 0.1       # Penalty on period-to-period changes of k (0 = independent periods)
+SITE_ALTITUDE_M = 0   # Station pressure for the enthalpy (0 m = 1013.25 hPa)
+
+# Change-point cooling model (common/changepoint.py)
+CP_MODELS = MODELS        # Candidate family: 3PC, 3PH, 4P, 5P
+CP_GROUP_BY = 'season'    # Fit one model per 'season', per 'month', or None for the whole year
+CP_CRITERION = 'bic'      # Model selection: 'bic' or 'aic'
+BREAKPOINT_STEP = 0.5     # Breakpoint grid step (kJ/kg), spanning the group's P2-P98 enthalpy
+
+# Rolling mode (--rolling 7D / 30D): trailing-window 3PC refit at every sample
+ROLLING_STEP = 1.0        # Threshold grid step (kJ/kg), spanning the whole P2-P98 enthalpy
+ROLLING_MIN_COVERAGE = 0.5  # Windows with fewer samples than this share of a full window
+                            # (start of the history) reuse the first well-covered coefficients
+
+# Bootstrap mode (--bootstrap N): day-block resampling of the change-point fits
+BOOTSTRAP_BANDS = [10, 50, 90]  # Percentiles of the Cooling series written per component
+BOOTSTRAP_CHUNK = 50            # Replicates per batched fit (one process-pool task)
+BOOTSTRAP_SEED = 42
+
+def get_season(month):
+    if month in [3, 4, 5]:
+        return 'Spring'
+    elif month in [6, 7, 8]:
+        return 'Summer'
+    elif month in [9, 10, 11]:
+        return 'Fall'
+    else:
+        return 'Winter'
 
-def calculate_enthalpy(temp_c, rel_humid_percent):
+def model_groups(index, group_by=CP_GROUP_BY):
+    """Group label of every timestamp for the per-group change-point fits."""
+    if group_by == 'season':
+        return np.array([get_season(m) for m in range(13)])[index.month]
+    if group_by == 'month':
+        return np.char.zfill(index.month.values.astype(str), 2)
+    return np.full(len(index), 'all')
+
+def fit_decomposition(df, cooling=None, pue_period=PUE_PERIOD):
     """
-    Calculate specific enthalpy of moist air (kJ/kg).
-    Formula approximate: h = 1.006*T + W*(2501 + 1.86*T)
-    Where W (mixing ratio) ~= 0.622 * (Pv / (Patm - Pv))
-    Pv (Vapor Pressure) = P_sat * (RH/100)
-    P_sat (Saturation Pressure) ~= 0.6112 * exp(17.67*T / (T + 243.5)) * 10 (hPa -> kPa? No, standard formula uses different units)
-    
-    Let's use a standard approximation for Enthalpy in kJ/kg:
-    h = 1.006*T + W*(2501 + 1.86*T)
-    
-    W calculation:
-    $P_{ws}$ (Saturation Vapor Pressure in hPa) uses Magnus formula:
-    $P_{ws} = 6.112 \times \exp(\frac{17.67 \times T}{T + 243.5})$
-    $P_v = P_{ws} \times \frac{RH}{100}$
-    $P_{atm} \approx 1013.25$ hPa (Standard Pressure)
-    $W = 0.622 \times \frac{P_v}{P_{atm} - P_v}$ (kg_water / kg_dry_air)
+    Fit the global decomposition parameters (change-point models, k) on df.
+    With a precomputed (rolling) cooling series only k is calibrated.
     """
-    
-    # 1. Saturation Vapor Pressure (hPa)
-    es = 6.112 * np.exp((17.67 * temp_c) / (temp_c + 243.5))
-    
-    # 2. Actual Vapor Pressure (hPa)
-    e = es * (rel_humid_percent / 100.0)
-    
-    # 3. Mixing Ratio (kg/kg) - assuming standard pressure at sea level approx
-    p_atm = 1013.25 
-    w = 0.622 * (e / (p_atm - e))
-    
-    # 4. Enthalpy (kJ/kg)
-    # Cp_air = 1.006 kJ/kg.K
-    # Latent_heat = 2501 kJ/kg
-    # Cp_vapor = 1.86 kJ/kg.K
-    h = 1.006 * temp_c + w * (2501 + 1.86 * temp_c)
-    
-    return h
+    if cooling is not None:
+        return {'group_by': None, 'criterion': None, 'models': {}, 'pue_period': pue_period,
+                'heating_in_base': True, 'k': calibrate_k(df, cooling, pue_period)}
 
-def decompose_load():
-    print("Loading data...")
-    df = pd.read_csv(file_path)
-    # No datetime index in file, create one for plotting
-    df['datetime'] = pd.to_datetime(df['date'].astype(str) + ' ' + 
-                                    df['hour'].astype(str).str.zfill(2) + ':' + 
-                                    df['minute'].astype(str).str.zfill(2))
-    df.set_index('datetime', inplace=True)
-    
-    # 1. Feature Engineering: Enthalpy
-    print("Calculating Enthalpy...")
-    df['enthalpy'] = calculate_enthalpy(df['temperature'].values, df['humidity'].values)
-    
-    print(f"Enthalpy Stats: Min={df['enthalpy'].min():.2f}, Max={df['enthalpy'].max():.2f}, Mean={df['enthalpy'].mean():.2f}")
-    
     # 2. Change-Point Regression
-    # Model: Load = Base + Sensitivity * max(0, Enthalpy - Threshold)
-    
-    best_r2 = -100
-    best_threshold = 20 # Initial guess
-    best_model = None
-    
-    # Search range for Enthalpy Threshold (e.g., 20 to 60 kJ/kg)
-    search_range = np.arange(10, 60, 1)
-    
-    print("Optimizing Enthalpy Threshold...")
-    y = df['measured_kWh'].values
-    
-    for t in search_range:
-        X = np.maximum(0, df['enthalpy'].values - t).reshape(-1, 1)
-        
-        reg = LinearRegression()
-        reg.fit(X, y)
-        r2 = reg.score(X, y)
-        
-        if r2 > best_r2:
-            best_r2 = r2
-            best_threshold = t
-            best_model = reg
-            
-    print(f"Best Enthalpy Threshold: {best_threshold} kJ/kg (R2={best_r2:.4f})")
-    print(f"Cooling Sensitivity: {best_model.coef_[0]:.2f} kWh per kJ/kg")
-    print(f"Intercept (Base Load): {best_model.intercept_:.2f} kWh")
+    # ASHRAE-style family per group, e.g. 3PC: Load = Base + Sensitivity * max(0, Enthalpy - Threshold)
+    # Every model and breakpoint (pair) is scored in one closed-form pass, and
+    # the model with the lowest information criterion is kept per group
+    print(f"Fitting change-point models {CP_MODELS} per {CP_GROUP_BY or 'year'} ({CP_CRITERION.upper()})...")
+    groups = model_groups(df.index)
+    models = {}
+    for group in pd.unique(groups):
+        sel = groups == group
+        x = df['enthalpy'].values[sel]
+        y = df['measured_kWh'].values[sel]
+        fits = fit_models(x, y, breakpoint_grid(x), CP_MODELS)
+        if not fits:
+            print(f"  [{group}] No change-point model with positive slopes. No weather-dependent load.")
+            models[group] = {'model': 'none', 'intercept': float(y.mean()), 'heating_slope': 0.0,
+                             'heating_break': None, 'cooling_slope': 0.0, 'cooling_break': None}
+            continue
+        best = select_model(fits, CP_CRITERION)
+        models[group] = best
+        scores = ", ".join(f"{m}={f[CP_CRITERION]:.0f}" for m, f in fits.items())
+        print(f"  [{group}] {best['model']} (R2={best['r2']:.4f}) "
+              f"heating: {best['heating_slope']:.2f} below {best['heating_break']}, "
+              f"cooling: {best['cooling_slope']:.2f} above {best['cooling_break']} kJ/kg | {scores}")
     
+    # Calculate Cooling first (Model)
+    # Cooling is fixed based on the selected regression per group
+    cooling = cooling_load(df, models)
+
+    return {
+        'group_by': CP_GROUP_BY,
+        'criterion': CP_CRITERION,
+        'models': models,
+        'pue_period': pue_period,
+        'heating_in_base': True,
+        'k': calibrate_k(df, cooling, pue_period),
+    }
+
+def breakpoint_grid(x):
+    lo, hi = np.floor(np.percentile(x, 2)), np.ceil(np.percentile(x, 98))
+    return np.arange(lo, hi + BREAKPOINT_STEP, BREAKPOINT_STEP)
+
+def load_metered_pue(index):
+    """Metered PUE aligned to index (NaN where not metered), or None without a meter file."""
+    if not exists(metered_pue_file):
+        return None
+    metered = load_frame(metered_pue_file, columns=['pue'])['pue']
+    metered = metered.reindex(index, method='ffill', tolerance=pd.Timedelta('1h'))
+    print(f"Metered PUE: {metered.notna().sum()} of {len(index)} samples covered ({metered_pue_file})")
+    return metered.to_numpy(dtype=float)
+
+def calibrate_k_periods(df, cooling, pue_period):
+    """
+    k per period (label -> k) against per-period targets or the metered PUE,
+    smoothed along time and kept non-negative (common/calibration.py).
+    """
+    codes, labels = period_codes(df.index, pue_period)
+    targets = period_targets(labels, PUE_TARGETS, TARGET_PUE)
+    k, raw, ratio, pue = solve_k(df['measured_kWh'].to_numpy(dtype=float), np.asarray(cooling, dtype=float),
+                                 codes, targets, PUE_SMOOTHING, load_metered_pue(df.index))
+
+    print(f"\n[PUE Calibration per {pue_period}] ({len(labels)} periods, smoothing={PUE_SMOOTHING})")
+    table = pd.DataFrame({'target_pue': pue, 'cooling_%': ratio * 100, 'raw_k': raw, 'k': k}, index=labels)
+    print(table.to_string(float_format=lambda v: f"{v:.4f}"))
+    if (raw < 0).any():
+        print(f"Warning: Target PUE too low for {list(table.index[raw < 0])} given the Cooling load. k floored at 0.")
+    return {label: float(v) for label, v in zip(labels, k)}
+
+def k_values(index, params):
+    """k per timestamp (array) for per-period calibration, or the single k."""
+    if isinstance(params['k'], dict):
+        return k_per_sample(index, params['k'], params['pue_period'])
+    return params['k']
+
+def describe_k(params):
+    if isinstance(params['k'], dict):
+        values = list(params['k'].values())
+        return f"{min(values):.4f} - {max(values):.4f} over {len(values)} {params['pue_period']} periods"
+    return f"{params['k']:.4f}"
+
+def calibrate_k(df, cooling, pue_period=PUE_PERIOD):
+    if pue_period != 'year' or exists(metered_pue_file):
+        return calibrate_k_periods(df, cooling, pue_period)
+
     # 3. Calculate Components
     # Strategy: Tune k (Other/IT ratio) to match Target PUE = 1.35
-    target_pue = 1.35
-    
-    # Calculate Cooling first (Model)
-    # Cooling is fixed based on regression
-    df['Cooling'] = best_model.coef_[0] * np.maximum(0, df['enthalpy'] - best_threshold)
+    target_pue = TARGET_PUE
     
     total_energy = df['measured_kWh'].sum()
-    cooling_energy = df['Cooling'].sum()
+    cooling_energy = cooling.sum()
     cooling_ratio = cooling_energy / total_energy
     
     print(f"\nTotal Energy: {total_energy:,.0f} kWh")
@@ -128,30 +184,146 @@ def decompose_load():
         k = 0
     else:
         k = calculated_k
+    return float(k)
+
+def rolling_cooling(df, window, grid):
+    """
+    Time-varying cooling series from a trailing-window 3PC refit at every sample.
+    grid: (lo, hi, step) of the enthalpy threshold grid.
+    Returns (cooling Series, per-sample coefficient DataFrame).
+    """
+    lo, hi, step = grid
+    thresholds = np.arange(lo, hi + step, step)
+    print(f"Rolling {window} change-point fit over {len(thresholds)} thresholds ({lo} to {hi} kJ/kg)...")
+    fit = rolling_hinge_fit(df.index.asi8, df['enthalpy'].values, df['measured_kWh'].values,
+                            thresholds, pd.Timedelta(window).value)
+    coeffs = pd.DataFrame({'cp_threshold': fit['threshold'], 'cp_slope': fit['slope'],
+                           'cp_intercept': fit['intercept'], 'cp_r2': fit['r2'],
+                           'cp_samples': fit['samples']}, index=df.index)
+
+    # Partial windows at the start of the history take the first well-covered fit
+    full = fit['samples'].max()
+    short = fit['samples'] < ROLLING_MIN_COVERAGE * full
+    if short.any() and not short.all():
+        first = int(np.argmax(~short))
+        coeffs.iloc[:first, :4] = coeffs.iloc[first, :4].values
+        print(f"  {first} samples in partial windows use the coefficients of {df.index[first]}")
+
+    no_fit = coeffs['cp_threshold'].isna()
+    if no_fit.any():
+        print(f"  {no_fit.sum()} windows without a positive cooling slope (Cooling = 0)")
+    cooling = coeffs['cp_slope'] * np.maximum(0, df['enthalpy'] - coeffs['cp_threshold'].fillna(np.inf))
+    print(f"  Sensitivity range: {coeffs['cp_slope'].min():.2f} - {coeffs['cp_slope'].max():.2f} kWh per kJ/kg, "
+          f"threshold range: {coeffs['cp_threshold'].min()} - {coeffs['cp_threshold'].max()} kJ/kg")
+    return cooling, coeffs
+
+def bootstrap_bands(df, n_boot, jobs=None, pue_period=PUE_PERIOD):
+    """
+    Day-block bootstrap of the per-group change-point fits.
+
+    Each replicate resamples whole days with replacement within every group
+    and refits the model family; a resample is just a weight vector (how often
+    each day was drawn), so a chunk of replicates is one batched closed-form
+    fit. Chunks run on a process pool.
+
+    Returns a DataFrame with IT/Cooling/Other per band (e.g. Cooling_p10):
+    band pXX takes Cooling at the pointwise XXth percentile of the replicates
+    and re-splits the rest into IT/Other with k recalibrated to the target PUE
+    (per pue_period / metered PUE, as in calibrate_k), so every band is a
+    consistent decomposition of the measured load.
+    """
+    print(f"Bootstrapping change-point fits: {n_boot} day-block replicates per {CP_GROUP_BY or 'year'}...")
+    groups = model_groups(df.index)
+    days = df.index.normalize()
+    x_all = df['enthalpy'].values
+    y_all = df['measured_kWh'].values
+    rng = np.random.default_rng(BOOTSTRAP_SEED)
+    cooling = np.zeros((n_boot, len(df)))
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        tasks = []
+        for group in pd.unique(groups):
+            sel = np.flatnonzero(groups == group)
+            x, y = x_all[sel], y_all[sel]
+            day_ids, day_of = np.unique(days[sel], return_inverse=True)
+            draws = rng.multinomial(len(day_ids), np.full(len(day_ids), 1 / len(day_ids)), size=n_boot)
+            for b in range(0, n_boot, BOOTSTRAP_CHUNK):
+                weights = draws[b:b + BOOTSTRAP_CHUNK][:, day_of]
+                future = pool.submit(fit_models_batch, x, y, weights, breakpoint_grid(x), CP_MODELS, CP_CRITERION)
+                tasks.append((group, sel, b, future))
+
+        chosen = {}
+        for group, sel, b, future in tasks:
+            fits = future.result()
+            _, cool = batch_weather_terms(fits, x_all[sel])
+            cooling[b:b + len(cool), sel] = cool
+            chosen.setdefault(group, []).extend(fits['model'])
+
+    for group, names in chosen.items():
+        share = pd.Series(names).value_counts(normalize=True)
+        print(f"  [{group}] " + ", ".join(f"{m} {p*100:.0f}%" for m, p in share.items()))
+
+    total_energy = y_all.sum()
+    ratio = np.percentile(cooling.sum(axis=1) / total_energy, BOOTSTRAP_BANDS)
+    print("  Cooling share of total energy: "
+          + ", ".join(f"P{q}={r*100:.2f}%" for q, r in zip(BOOTSTRAP_BANDS, ratio)))
+
+    bands = pd.DataFrame(index=df.index)
+    per_period = pue_period != 'year' or exists(metered_pue_file)
+    for q, band in zip(BOOTSTRAP_BANDS, np.percentile(cooling, BOOTSTRAP_BANDS, axis=0)):
+        if per_period:
+            # Same per-period targets / metered PUE as the point estimate
+            params = {'k': calibrate_k_periods(df, band, pue_period), 'pue_period': pue_period}
+            k = k_values(df.index, params)
+        else:
+            params = {'k': max(0.0, TARGET_PUE * (1 - band.sum() / total_energy) - 1)}
+            k = params['k']
+        base = np.clip(y_all - band, 0, None)
+        bands[f'IT_p{q}'] = base / (1 + k)
+        bands[f'Cooling_p{q}'] = band
+        bands[f'Other_p{q}'] = base * k / (1 + k)
+        print(f"  Band P{q}: Cooling {band.sum():,.0f} kWh, k={describe_k(params)}")
+    return bands
+
+def cooling_load(df, models, group_by=CP_GROUP_BY):
+    """
+    Cooling load of every row from its group's change-point model: the
+    cooling slope above the cooling breakpoint. The heating-side hinge of
+    4P/5P fits (load rising as enthalpy drops) is not cooling; it stays in
+    the base load that is split into IT/Other.
+    """
+    groups = model_groups(df.index, group_by)
+    x = df['enthalpy'].values
+    load = np.zeros(len(df))
+    for group, fit in models.items():
+        sel = groups == group
+        _, cooling = weather_terms(fit, x[sel])
+        load[sel] = cooling
+    missing = ~np.isin(groups, list(models))
+    if missing.any():
+        print(f"Warning: No fitted model for groups {sorted(set(groups[missing]))}. Cooling set to 0.")
+    return pd.Series(load, index=df.index)
+
+def apply_decomposition(df, params, cooling=None):
+    """Split measured load into Cooling / IT / Other with fitted parameters."""
+    if cooling is None:
+        cooling = cooling_load(df, params['models'], params['group_by'])
+    df['Cooling'] = cooling
 
     # Calculate remaining Base Load
     base_load_series = df['measured_kWh'] - df['Cooling']
     base_load_series = base_load_series.clip(lower=0)
     
-    # Apply k
+    # Apply k (one value, or one per calibration period)
+    k = k_values(df.index, params)
     df['IT'] = base_load_series / (1 + k)
     df['Other'] = base_load_series * k / (1 + k)
-    
-    # Final Stats
-    final_it_sum = df['IT'].sum()
-    final_pue = total_energy / final_it_sum
-    
-    print("\n--- Component Summary (Average) ---")
-    print(df[['measured_kWh', 'IT', 'Cooling', 'Other']].mean())
-    print(f"\nFinal PUE: {final_pue:.4f}")
-    print(f"Other/IT Ratio: {k:.4f}")
-    
-    # Save Results
-    df_save = df[['measured_kWh', 'IT', 'Cooling', 'Other', 'temperature', 'humidity', 'enthalpy']]
-    df_save.to_csv(output_csv)
-    print(f"Saved results to {output_csv}")
-    
-    # 4. Visualization
+    return df
+
+def plot_decomposition(df):
+    """Daily stackplot of the components with the enthalpy on a twin axis."""
+    from common.plotting import plt, save_figure
+
     print("Generating Figure...")
     # Resample to Daily Mean for stackplot
     daily = df[['IT', 'Other', 'Cooling']].resample('D').mean()
@@ -178,8 +350,110 @@ def decompose_load():
     # ax2.legend(loc='upper right')
     
     plt.tight_layout()
-    plt.savefig(output_fig, dpi=300)
+    save_figure(output_fig, fig)
     print(f"Saved figure to {output_fig}")
 
+def decompose_load(incremental=False, since=None, rolling=None, bootstrap=None, jobs=None, pue_period=PUE_PERIOD,
+                   figures=True):
+    start = recompute_start(output_data, since=since) if incremental else None
+    params = load_params(PARAMS_NAME) if start is not None else None
+    if params is not None and 'models' not in params:
+        params = None  # Stored by the single-threshold version: refit
+    if params is not None and (params.get('rolling') or {}).get('window') != rolling:
+        params = None  # Rolling mode changed: refit
+    if params is not None and params.get('pue_period', 'year') != pue_period:
+        params = None  # Calibration period changed: refit
+    if params is not None and not params.get('heating_in_base'):
+        params = None  # k calibrated with the heating hinge inside Cooling: refit
+    if incremental and params is None:
+        print("No existing output/parameters. Running full decomposition.")
+        start = None
+
+    print("Loading data...")
+    # A trailing window needs the history before the first recomputed row
+    df = load_frame(file_path, since=start - pd.Timedelta(rolling) if start is not None and rolling else start)
+    # No datetime index in file, create one for plotting
+    df['datetime'] = build_datetime(df['date'], df['hour'], df['minute'])
+    df.set_index('datetime', inplace=True)
+    
+    # 1. Feature Engineering: Enthalpy
+    print("Calculating Enthalpy...")
+    df['enthalpy'] = calculate_enthalpy(df['temperature'].values, df['humidity'].values,
+                                        pressure_at_altitude(SITE_ALTITUDE_M))
+    
+    print(f"Enthalpy Stats: Min={df['enthalpy'].min():.2f}, Max={df['enthalpy'].max():.2f}, Mean={df['enthalpy'].mean():.2f}")
+    
+    cooling = coeffs = None
+    if rolling:
+        if params is not None:
+            grid = params['rolling']['grid']
+        else:
+            grid = [float(np.floor(df['enthalpy'].quantile(0.02))), float(np.ceil(df['enthalpy'].quantile(0.98))), ROLLING_STEP]
+        cooling, coeffs = rolling_cooling(df, rolling, grid)
+
+    if params is None:
+        params = fit_decomposition(df, cooling, pue_period)
+        params['rolling'] = {'window': rolling, 'grid': grid} if rolling else None
+        save_params(PARAMS_NAME, params)
+    else:
+        # Incremental: keep the parameters fitted on the full history
+        models = ", ".join(f"{g}={m['model']}" for g, m in params['models'].items()) or f"rolling {rolling}"
+        print(f"Updating from {start} with stored parameters: {models}, k={describe_k(params)}")
+
+    df = apply_decomposition(df, params, cooling)
+    if start is not None and rolling:
+        df = df[df.index >= start]
+        coeffs = coeffs[coeffs.index >= start]
+    
+    # Final Stats
+    total_energy = df['measured_kWh'].sum()
+    final_it_sum = df['IT'].sum()
+    final_pue = total_energy / final_it_sum
+    
+    print("\n--- Component Summary (Average) ---")
+    print(df[['measured_kWh', 'IT', 'Cooling', 'Other']].mean())
+    print(f"\nFinal PUE: {final_pue:.4f}")
+    print(f"Other/IT Ratio: {describe_k(params)}")
+    
+    if bootstrap:
+        saved = save_frame(bootstrap_bands(df, bootstrap, jobs, pue_period), output_bootstrap)
+        print(f"Saved bootstrap bands to {saved}")
+
+    # Save Results
+    df_save = df[['measured_kWh', 'IT', 'Cooling', 'Other', 'temperature', 'humidity', 'enthalpy']]
+    if start is not None:
+        saved, df = merge_into(output_data, df_save, start)
+    else:
+        saved = save_frame(df_save, output_data)
+    print(f"Saved results to {saved}")
+    if coeffs is not None:
+        if start is not None:
+            saved, _ = merge_into(output_rolling, coeffs, start)
+        else:
+            saved = save_frame(coeffs, output_rolling)
+        print(f"Saved rolling coefficients to {saved}")
+    
+    # 4. Visualization
+    if figures:
+        plot_decomposition(df)
+
 if __name__ == "__main__":
-    decompose_load()
+    parser = argparse.ArgumentParser(description='Decompose the load into IT / Cooling / Other.')
+    add_arguments(parser)
+    parser.add_argument('--rolling', default=None, metavar='WINDOW',
+                        help='Refit the cooling regression on a trailing window (e.g. 7D, 30D) '
+                             'instead of per-season models')
+    parser.add_argument('--bootstrap', type=int, default=None, metavar='N',
+                        help='Also write P10/P50/P90 component bands from N day-block bootstrap refits')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Worker processes for --bootstrap (default: CPU count)')
+    parser.add_argument('--pue-period', choices=PERIODS, default=PUE_PERIOD,
+                        help='Calibrate k against the PUE target once per year (default), per season or per month')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only write the data outputs (matplotlib/seaborn are never imported)')
+    args = parser.parse_args()
+    if args.bootstrap and (args.rolling or args.incremental):
+        parser.error('--bootstrap refits the per-season models on the full history; '
+                     'it cannot be combined with --rolling or --incremental')
+    decompose_load(args.incremental, args.since, args.rolling, args.bootstrap, args.jobs, args.pue_period,
+                   not args.no_figures)
@@ -0,0 +1,47 @@
+import argparse
+import time
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame, save_frame
+from common.panel import decompose_panel, SHARD_SIZE
+
+# Panel inputs: datetime index, one column per site (same site names in all three)
+load_path = 'data/panel_load'                # measured kWh per 15-min interval
+temperature_path = 'data/panel_temperature'  # deg C
+humidity_path = 'data/panel_humidity'        # % RH
+output_data = 'data/data_decomposition_panel'
+output_sites = 'data/panel_site_summary'
+
+def main(sites=None, jobs=1, shard_size=SHARD_SIZE):
+    print("Loading panel data...")
+    load = load_frame(load_path, columns=sites)
+    temperature = load_frame(temperature_path, columns=sites)
+    humidity = load_frame(humidity_path, columns=sites)
+    print(f"{load.shape[1]} sites x {load.shape[0]} timestamps ({load.index.min()} ~ {load.index.max()})")
+
+    missing = [s for s in load.columns if s not in temperature.columns or s not in humidity.columns]
+    if missing:
+        print(f"Warning: No weather for sites {missing}. Their Cooling is NaN.")
+
+    t0 = time.perf_counter()
+    components, summary = decompose_panel(load, temperature, humidity, shard_size=shard_size, jobs=jobs)
+    elapsed = time.perf_counter() - t0
+    print(f"Decomposed {len(summary)} sites in {elapsed:.2f} s ({elapsed / max(len(summary), 1) * 1000:.1f} ms per site)")
+
+    print("\n--- Site Summary ---")
+    model_cols = [c for c in summary.columns if c.endswith('_model')]
+    print(summary[['k', 'cooling_share', 'pue'] + model_cols].to_string(float_format=lambda v: f"{v:.4f}"))
+
+    saved = save_frame(components, output_data)
+    print(f"\nSaved components to {saved}")
+    saved = save_frame(summary.reset_index(), output_sites, index=False)
+    print(f"Saved site summary to {saved}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Decompose the load of many sites into IT / Cooling / Other at once.')
+    parser.add_argument('--sites', nargs='+', default=None, help='Only these sites (default: all columns)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Worker processes for the site shards')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help='Sites per batched fit')
+    args = parser.parse_args()
+    main(args.sites, args.jobs, args.shard_size)
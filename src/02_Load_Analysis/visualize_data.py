@@ -1,24 +1,71 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.plotting import plt, sns, plot_series, save_figure, render_figures
+from common.storage import load_frame
+from common.timestamps import build_datetime
 
-# Set style for premium look
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
+file_path = 'data/data_with_weather'
 
-file_path = 'data/data_with_weather.csv'
+def plot_full_timeseries(load):
+    # Figure 1: Full Time Series (LTTB-downsampled to the figure's resolution)
+    fig, ax = plt.subplots(figsize=(15, 6))
+    plot_series(ax, load.index, load, label='Measured Load (kWh)', color='#1f77b4', linewidth=0.8, alpha=0.8)
+    ax.set_title('Data Center Power Consumption (Full Period)', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Load (kWh)')
+    ax.legend()
+    fig.tight_layout()
+    return save_figure('figure_1_full_timeseries.png', fig)
+
+def plot_daily_profile(daily_profile):
+    # Figure 2: Daily Load Profile (Average per hour/minute)
+    # Prepare x-axis for daily profile (string representation for plotting)
+    time_labels = [t.strftime('%H:%M') for t in daily_profile.index]
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(time_labels, daily_profile.values, color='#ff7f0e', linewidth=2)
+    plt.title('Average Daily Load Profile', fontsize=16, fontweight='bold')
+    plt.xlabel('Time of Day')
+    plt.ylabel('Average Load (kWh)')
+
+    # Simplify x-ticks to show every hour
+    plt.xticks(ticks=range(0, len(time_labels), 4), labels=time_labels[::4], rotation=45)
+
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    return save_figure('figure_2_daily_profile.png')
+
+def plot_monthly_dist(df):
+    # Figure 3: Monthly Distribution (Boxplot)
+    plt.figure(figsize=(12, 6))
+    sns.boxplot(x='month', y='measured_kWh', data=df, palette='viridis')
+    plt.title('Monthly Load Distribution', fontsize=16, fontweight='bold')
+    plt.xlabel('Month')
+    plt.ylabel('Load (kWh)')
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    return save_figure('figure_3_monthly_dist.png')
+
+def plot_histogram(load):
+    # Figure 4: Load Histogram
+    plt.figure(figsize=(10, 6))
+    sns.histplot(load, bins=50, kde=True, color='#2ca02c')
+    plt.title('Load Distribution Histogram', fontsize=16, fontweight='bold')
+    plt.xlabel('Load (kWh)')
+    plt.ylabel('Frequency')
+    plt.tight_layout()
+    return save_figure('figure_4_histogram.png')
 
 def clean_and_visualize():
     try:
         # 1. Load Data
         print("Loading cleaned data...")
-        df = pd.read_csv(file_path)
+        df = load_frame(file_path)
         
         # Create datetime index
         # combining date + hour + minute
-        df['datetime'] = pd.to_datetime(df['date'].astype(str) + ' ' + 
-                                        df['hour'].astype(str).str.zfill(2) + ':' + 
-                                        df['minute'].astype(str).str.zfill(2))
+        df['datetime'] = build_datetime(df['date'], df['hour'], df['minute'])
         
         df.set_index('datetime', inplace=True)
         
@@ -29,60 +76,17 @@ def clean_and_visualize():
         # 2. Plotting
         print("\nGenerating Figures...")
 
-        # Figure 1: Full Time Series
-        plt.figure(figsize=(15, 6))
-        plt.plot(df.index, df['measured_kWh'], label='Measured Load (kWh)', color='#1f77b4', linewidth=0.8, alpha=0.8)
-        plt.title('Data Center Power Consumption (Full Period)', fontsize=16, fontweight='bold')
-        plt.xlabel('Date')
-        plt.ylabel('Load (kWh)')
-        plt.legend()
-        plt.tight_layout()
-        plt.savefig('figure_1_full_timeseries.png', dpi=300)
-        print("Saved figure_1_full_timeseries.png")
-
-        # Figure 2: Daily Load Profile (Average per hour/minute)
-        # Group by hour and minute to see the daily shape
+        # Each figure gets only the columns it draws, so pool workers receive small payloads
         df['time_of_day'] = df.index.time
-        daily_profile = df.groupby('time_of_day')['measured_kWh'].mean()
-        
-        # Prepare x-axis for daily profile (string representation for plotting)
-        time_labels = [t.strftime('%H:%M') for t in daily_profile.index]
-        
-        plt.figure(figsize=(12, 6))
-        plt.plot(time_labels, daily_profile.values, color='#ff7f0e', linewidth=2)
-        plt.title('Average Daily Load Profile', fontsize=16, fontweight='bold')
-        plt.xlabel('Time of Day')
-        plt.ylabel('Average Load (kWh)')
-        
-        # Simplify x-ticks to show every hour
-        plt.xticks(ticks=range(0, len(time_labels), 4), labels=time_labels[::4], rotation=45)
-        
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        plt.savefig('figure_2_daily_profile.png', dpi=300)
-        print("Saved figure_2_daily_profile.png")
-
-        # Figure 3: Monthly Distribution (Boxplot)
         df['month'] = df.index.strftime('%Y-%m')
-        plt.figure(figsize=(12, 6))
-        sns.boxplot(x='month', y='measured_kWh', data=df, palette='viridis')
-        plt.title('Monthly Load Distribution', fontsize=16, fontweight='bold')
-        plt.xlabel('Month')
-        plt.ylabel('Load (kWh)')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig('figure_3_monthly_dist.png', dpi=300)
-        print("Saved figure_3_monthly_dist.png")
-
-        # Figure 4: Load Histogram
-        plt.figure(figsize=(10, 6))
-        sns.histplot(df['measured_kWh'], bins=50, kde=True, color='#2ca02c')
-        plt.title('Load Distribution Histogram', fontsize=16, fontweight='bold')
-        plt.xlabel('Load (kWh)')
-        plt.ylabel('Frequency')
-        plt.tight_layout()
-        plt.savefig('figure_4_histogram.png', dpi=300)
-        print("Saved figure_4_histogram.png")
+        tasks = [
+            (plot_full_timeseries, df['measured_kWh']),
+            (plot_daily_profile, df.groupby('time_of_day')['measured_kWh'].mean()),
+            (plot_monthly_dist, df[['month', 'measured_kWh']]),
+            (plot_histogram, df['measured_kWh']),
+        ]
+        for saved in render_figures(tasks):
+            print(f"Saved {saved}")
 
         print("\nAll figures generated successfully!")
 
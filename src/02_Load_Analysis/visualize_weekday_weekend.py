@@ -1,141 +1,124 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.plotting import plt, sns, save_figure, render_figures
+from common.profile_cube import load_cube, profile_table, season_of, DAY_TYPES
+from common.storage import load_frame
+from common.timestamps import build_datetime
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-file_path = 'data/data_with_weather.csv'
+file_path = 'data/data_with_weather'
 output_dir = 'figures'
 
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
 
-def get_season(month):
-    if month in [3, 4, 5]:
-        return 'Spring'
-    elif month in [6, 7, 8]:
-        return 'Summer'
-    elif month in [9, 10, 11]:
-        return 'Autumn'
-    else:
-        return 'Winter'
+def plot_overall_box(df):
+    # --- Figure 7: Overall Boxplot (Weekday vs Weekend) ---
+    plt.figure(figsize=(8, 6))
+    sns.boxplot(x='day_type', y='measured_kWh', data=df, palette='pastel', order=['Weekday', 'Weekend'])
+    plt.title('Overall Load Distribution: Weekday vs Weekend', fontsize=14, fontweight='bold')
+    plt.ylabel('Load (kWh)')
+    plt.xlabel('')
+    plt.tight_layout()
+    return save_figure(f'{output_dir}/figure_7_overall_weekday_weekend_box.png')
+
+def plot_overall_profile(profile):
+    # --- Figure 8: Overall Daily Profile (Weekday vs Weekend) ---
+    plt.figure(figsize=(12, 6))
+    sns.lineplot(data=profile, x=profile['time'].astype(str), y='measured_kWh', hue='day_type',
+                 palette={'Weekday': '#1f77b4', 'Weekend': '#ff7f0e'}, linewidth=2.5)
+
+    plt.title('Average Daily Load Profile: Weekday vs Weekend', fontsize=14, fontweight='bold')
+    plt.xlabel('Time of Day')
+    plt.ylabel('Average Load (kWh)')
+
+    # X-axis formatting
+    unique_times = sorted(profile['time'].astype(str).unique())
+    plt.xticks(ticks=range(0, len(unique_times), 8), labels=unique_times[::8], rotation=45)
+
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    return save_figure(f'{output_dir}/figure_8_overall_weekday_weekend_profile.png')
+
+def plot_seasonal_box(df, existing_seasons):
+    # --- Figure 9: Seasonal Weekday vs Weekend (Boxplot) ---
+    plt.figure(figsize=(12, 6))
+    sns.boxplot(x='Season', y='measured_kWh', hue='day_type', data=df,
+                order=existing_seasons, palette='muted', hue_order=['Weekday', 'Weekend'])
+
+    plt.title('Seasonal Load Distribution: Weekday vs Weekend', fontsize=14, fontweight='bold')
+    plt.ylabel('Load (kWh)')
+    plt.xlabel('Season')
+    plt.legend(title='Day Type')
+    plt.tight_layout()
+    return save_figure(f'{output_dir}/figure_9_seasonal_weekday_weekend_box.png')
+
+def plot_season_profile(subset, season):
+    # --- Figure 10: Seasonal Daily Profile (Weekday vs Weekend), one file per season ---
+    # Define colors consistent with Figure 8
+    pal = {'Weekday': '#1f77b4', 'Weekend': '#ff7f0e'}
+
+    plt.figure(figsize=(10, 6))
+    sns.lineplot(data=subset, x=subset['time'].astype(str), y='measured_kWh', hue='day_type',
+                 palette=pal, linewidth=2.5)
+
+    plt.title(f'Average Daily Load Profile: {season} (Weekday vs Weekend)', fontsize=15, fontweight='bold')
+    plt.xlabel('Time of Day')
+    plt.ylabel('Average Load (kWh)')
+    plt.legend(title='Day Type')
+
+    # X-ticks formatting
+    unique_time_strs = sorted(subset['time'].astype(str).unique())
+    plt.xticks(ticks=range(0, len(unique_time_strs), 8), labels=unique_time_strs[::8], rotation=45)
+
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    return save_figure(f'{output_dir}/figure_10_{season}_profile.png')
 
 def analyze_weekday_weekend():
     try:
         print("Loading data...")
-        df = pd.read_csv(file_path)
+        df = load_frame(file_path, columns=['date', 'hour', 'minute', 'measured_kWh'])
         
         # Datetime conversion
-        df['datetime'] = pd.to_datetime(df['date'].astype(str) + ' ' + 
-                                        df['hour'].astype(str).str.zfill(2) + ':' + 
-                                        df['minute'].astype(str).str.zfill(2))
+        dt = pd.DatetimeIndex(build_datetime(df['date'], df['hour'], df['minute']))
         
         # Feature Engineering
-        df['weekday'] = df['datetime'].dt.weekday # 0=Mon, 6=Sun
-        df['day_type'] = df['weekday'].apply(lambda x: 'Weekend' if x >= 5 else 'Weekday')
-        
-        df['month'] = df['datetime'].dt.month
-        df['Season'] = df['month'].apply(get_season)
-        df['time'] = df['datetime'].dt.time
+        df['day_type'] = np.array(DAY_TYPES)[(dt.weekday >= 5).astype(int)] # 5=Sat, 6=Sun
+        df['Season'] = season_of(dt)
         
         print(f"Data ready. Total rows: {len(df)}")
         print(df['day_type'].value_counts())
 
-        # --- Figure 7: Overall Boxplot (Weekday vs Weekend) ---
-        plt.figure(figsize=(8, 6))
-        sns.boxplot(x='day_type', y='measured_kWh', data=df, palette='pastel', order=['Weekday', 'Weekend'])
-        plt.title('Overall Load Distribution: Weekday vs Weekend', fontsize=14, fontweight='bold')
-        plt.ylabel('Load (kWh)')
-        plt.xlabel('')
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/figure_7_overall_weekday_weekend_box.png', dpi=300)
-        print("Saved figure_7")
-
-        # --- Figure 8: Overall Daily Profile (Weekday vs Weekend) ---
-        profile = df.groupby(['day_type', 'time'])['measured_kWh'].mean().reset_index()
-        
-        plt.figure(figsize=(12, 6))
-        sns.lineplot(data=profile, x=profile['time'].astype(str), y='measured_kWh', hue='day_type', 
-                     palette={'Weekday': '#1f77b4', 'Weekend': '#ff7f0e'}, linewidth=2.5)
-        
-        plt.title('Average Daily Load Profile: Weekday vs Weekend', fontsize=14, fontweight='bold')
-        plt.xlabel('Time of Day')
-        plt.ylabel('Average Load (kWh)')
-        
-        # X-axis formatting
-        unique_times = sorted(profile['time'].astype(str).unique())
-        plt.xticks(ticks=range(0, len(unique_times), 8), labels=unique_times[::8], rotation=45)
-        
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/figure_8_overall_weekday_weekend_profile.png', dpi=300)
-        print("Saved figure_8")
-
-        # --- Figure 9: Seasonal Weekday vs Weekend (Boxplot) ---
         season_order = ['Summer', 'Autumn', 'Winter', 'Spring']
         existing_seasons = [s for s in season_order if s in df['Season'].unique()]
-        
-        plt.figure(figsize=(12, 6))
-        sns.boxplot(x='Season', y='measured_kWh', hue='day_type', data=df, 
-                    order=existing_seasons, palette='muted', hue_order=['Weekday', 'Weekend'])
-        
-        plt.title('Seasonal Load Distribution: Weekday vs Weekend', fontsize=14, fontweight='bold')
-        plt.ylabel('Load (kWh)')
-        plt.xlabel('Season')
-        plt.legend(title='Day Type')
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/figure_9_seasonal_weekday_weekend_box.png', dpi=300)
-        print("Saved figure_9")
-
-        # --- Figure 10: Seasonal Daily Profile (Weekday vs Weekend) ---
-        print("Generating Figure 10...")
-        # Group by Season, day_type, time
-        seasonal_day_profile = df.groupby(['Season', 'day_type', 'time'])['measured_kWh'].mean().reset_index()
-        
-        # --- Figure 10: Seasonal Daily Profile (Separate Files per Season) ---
-        print("Generating Figure 10 (Separate files)...")
-        # Group by Season, day_type, time
-        seasonal_day_profile = df.groupby(['Season', 'day_type', 'time'])['measured_kWh'].mean().reset_index()
-        
-        seasons_to_plot = [s for s in season_order if s in df['Season'].unique()]
-        
-        # Define colors consistent with Figure 8
-        pal = {'Weekday': '#1f77b4', 'Weekend': '#ff7f0e'}
-        
-        for season in seasons_to_plot:
-            plt.figure(figsize=(10, 6))
-            
-            subset = seasonal_day_profile[seasonal_day_profile['Season'] == season]
-            
-            sns.lineplot(data=subset, x=subset['time'].astype(str), y='measured_kWh', hue='day_type', 
-                         palette=pal, linewidth=2.5)
-            
-            plt.title(f'Average Daily Load Profile: {season} (Weekday vs Weekend)', fontsize=15, fontweight='bold')
-            plt.xlabel('Time of Day')
-            plt.ylabel('Average Load (kWh)')
-            plt.legend(title='Day Type')
-            
-            # X-ticks formatting
-            unique_time_strs = sorted(subset['time'].astype(str).unique())
-            plt.xticks(ticks=range(0, len(unique_time_strs), 8), labels=unique_time_strs[::8], rotation=45)
-            
-            plt.grid(True, linestyle='--', alpha=0.7)
-            plt.tight_layout()
-            
-            output_file = f'{output_dir}/figure_10_{season}_profile.png'
-            plt.savefig(output_file, dpi=300)
-            print(f"Saved {output_file}")
-            plt.close() # Close figure to free memory
+
+        # Profiles come from the shared profile cube; the boxplots get only the columns they draw
+        print("Generating Figures 7-10 (Figure 10: separate files per season)...")
+        box_data = df[['day_type', 'Season', 'measured_kWh']]
+        cube = load_cube(file_path, ['measured_kWh'])
+        profile = profile_table(cube, by=['day_type', 'time'])
+        seasonal_day_profile = profile_table(cube).rename(columns={'season': 'Season'})
+
+        tasks = [
+            (plot_overall_box, box_data),
+            (plot_overall_profile, profile),
+            (plot_seasonal_box, box_data, existing_seasons),
+        ]
+        for season in existing_seasons:
+            tasks.append((plot_season_profile, seasonal_day_profile[seasonal_day_profile['Season'] == season], season))
+        for saved in render_figures(tasks):
+            print(f"Saved {saved}")
 
         # --- Stats Printout ---
         print("\n--- Statistics: Weekday vs Weekend ---")
         print(df.groupby('day_type')['measured_kWh'].describe())
         
         print("\n--- Statistics: Seasonal Weekday vs Weekend (Mean) ---")
-        print(df.groupby(['Season', 'day_type'])['measured_kWh'].mean().unstack(level=1).reindex(existing_seasons))
+        season_means = profile_table(cube, by=['season', 'day_type']).rename(columns={'season': 'Season'})
+        print(season_means.pivot(index='Season', columns='day_type', values='measured_kWh').reindex(existing_seasons))
 
     except Exception as e:
         print(f"Error: {e}")
@@ -1,19 +1,111 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.dr_sweep import DEFAULT_PARAMS
+from common.storage import load_frame
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-input_file = 'data/dr_simulation_results.csv'
+input_file = 'data/dr_simulation_results'
 output_dir = 'figures/06_Final_Report'
 
-def analyze_dr_final():
+def plot_profile(hourly, season):
+    from common.plotting import plt, save_figure
+
+    # --- Figure 1: Seasonal Profile (Line + Area) ---
+    plt.figure(figsize=(10, 6))
+    plt.plot(hourly.index, hourly['P_Total_kW'], 'k-', lw=2, label='Total Load')
+    plt.plot(hourly.index, hourly['P_IT_kW'], 'b--', lw=1, label='IT Load')
+    plt.plot(hourly.index, hourly['P_Cool_kW'], 'c:', lw=1, label='Cooling Load')
+
+    # Area
+    plt.fill_between(hourly.index, 0, hourly['Q_shed_kW'], color='salmon', alpha=0.3, label='Shed Pot')
+    if hourly['Q_up_kW'].sum() > 0:
+        # Shift Up potential for visibility? Or just plot from 0?
+        # User said "Area".
+         plt.fill_between(hourly.index, 0, hourly['Q_up_kW'], color='lightgreen', alpha=0.3, label='Up Pot')
+
+    plt.title(f'Figure 1. Seasonal Average Profile ({season})')
+    plt.legend(loc='upper right')
+    plt.xlabel('Hour')
+    plt.ylabel('kW')
+    plt.grid(True, alpha=0.5)
+    plt.tight_layout()
+    return save_figure(f'{output_dir}/final_figure_1_profile_{season}.png')
+
+def plot_boxplot(shed_data, up_data, season_order):
+    from common.plotting import plt, sns, save_figure
+
+    # --- Figure 2: Boxplot (Shed / Up Distribution) ---
+    # User said: "Two separate boxplots or select one".
+    # Let's do 2 Subplots side-by-side.
+    fig, axes = plt.subplots(1, 2, figsize=(12, 6))
+
+    # Shed
+    sns.boxplot(data=shed_data, x='season', y='Q_shed_kW', order=season_order, ax=axes[0], palette='Reds')
+    axes[0].set_title('Shed Potential Distribution')
+
+    # Up
+    if not up_data.empty:
+        # Filter season order to only existing
+        up_seasons = [s for s in season_order if s in up_data['season'].unique()]
+        sns.boxplot(data=up_data, x='season', y='Q_up_kW', order=up_seasons, ax=axes[1], palette='Greens')
+    axes[1].set_title('Up Potential Distribution')
+
+    plt.tight_layout()
+    return save_figure(f'{output_dir}/final_figure_2_boxplot.png', fig)
+
+def plot_components(plot_df):
+    from common.plotting import plt, save_figure
+
+    # --- Figure 3: Stacked Bar Components ---
+    ax = plot_df.plot(kind='bar', stacked=True, figsize=(10, 6), colormap='viridis', alpha=0.8)
+    plt.title('Figure 3. DR Component Breakdown (Mean kW)')
+    plt.ylabel('Capacity (kW)')
+    plt.xticks(rotation=0)
+    plt.grid(axis='y', alpha=0.5)
+
+    # Labels
+    for c in ax.containers:
+        ax.bar_label(c, fmt='%.0f', label_type='center', color='white', fontweight='bold')
+
+    plt.tight_layout()
+    return save_figure(f'{output_dir}/final_figure_3_components.png', ax.figure)
+
+def plot_figures(df, comp_df, season_order):
+    from common.plotting import render_figures
+
+    print("\n[4] Generating Figures...")
+    
+    # --- Figure 1: Seasonal Profile (Line + Area) ---
+    # We already did this via visualize_dr_profile.py
+    # Re-generating with consistent naming if needed or skip?
+    # User asked for "Figure 1", "Figure 2", "Figure 3". 
+    # Let's just create them specifically named 'final_figure_X.png'
+    
+    # Fig 1: one hourly profile per season
+    tasks = []
+    for season in ['Spring', 'Summer', 'Fall', 'Winter']:
+        subset = df[df['season'] == season]
+        if subset.empty: continue
+        tasks.append((plot_profile, subset.groupby('hour').mean(numeric_only=True), season))
+
+    # Fig 2: only the boxplot columns go to the renderer
+    box_cols = ['season', 'Q_shed_kW', 'Q_up_kW']
+    tasks.append((plot_boxplot, df.loc[df['mask_shed'], box_cols], df.loc[df['mask_up'], box_cols], season_order))
+
+    # Fig 3: Create a unique label 'Season-Type'
+    comp_df['Label'] = comp_df['Season'] + '\n(' + comp_df['Type'] + ')'
+    # Reorganize for stacked plot: index=Label, cols=[IT, Cooling, ESS]
+    tasks.append((plot_components, comp_df.set_index('Label')[['IT_DR (kW)', 'Cooling_DR (kW)', 'ESS_DR (kW)']]))
+    render_figures(tasks)
+
+    print("\nAnalysis Complete. Figures saved to figures/final_figure_*.png")
+
+def analyze_dr_final(figures=True):
     print("Loading DR Simulation Results...")
-    df = pd.read_csv(input_file, parse_dates=['datetime'], index_col='datetime')
+    df = load_frame(input_file)
     df['hour'] = df.index.hour
     
     # Calculate Total Load
@@ -22,12 +114,11 @@ def analyze_dr_final():
     # Ensure params used in simulation are available or re-defined ?
     # We can infer components if not saved, but we only saved Q. 
     # BUT, we saved P_IT_kW, P_Cool_kW. We know alpha parameters.
-    # Re-defining parameters for component decomp:
-    alpha_IT = 0.10
-    alpha_cool_summer = 0.15
-    alpha_cool_other = 0.10
-    alpha_IT_forward = 0.10
-    Q_ESS_fixed = 1250.0
+    # Same parameters as simulate_dr.py for component decomp:
+    alpha_IT = DEFAULT_PARAMS['alpha_IT']
+    alpha_IT_forward = DEFAULT_PARAMS['alpha_IT_forward']
+    # The cooling part (alpha_cool * P_Cool, net of the thermal rebound) is saved by simulate_dr.py as Q_Cool_shed_kW
+    # The ESS part is the per-slot dispatch saved by simulate_dr.py (Q_ESS_shed_kW / Q_ESS_up_kW)
     
     season_order = ['Spring', 'Summer', 'Fall', 'Winter']
     
@@ -188,14 +279,10 @@ def analyze_dr_final():
         if dr_type == 'Shed':
             mask = (df['season'] == season) & df['mask_shed']
             p_it = df.loc[mask, 'P_IT_kW']
-            p_cool = df.loc[mask, 'P_Cool_kW']
-            
-            # Alpha
-            a_cool = alpha_cool_summer if season == 'Summer' else alpha_cool_other
             
             it_dr = p_it * alpha_IT
-            cool_dr = p_cool * a_cool
-            ess_dr = Q_ESS_fixed # Scalar, implies mean is scalar
+            cool_dr = df.loc[mask, 'Q_Cool_shed_kW']
+            ess_dr = df.loc[mask, 'Q_ESS_shed_kW'].mean()
             
         else: # Up
             mask = (df['season'] == season) & df['mask_up']
@@ -203,7 +290,7 @@ def analyze_dr_final():
             
             it_dr = p_it * alpha_IT_forward
             cool_dr = p_it * 0 # No cooling in Up
-            ess_dr = Q_ESS_fixed
+            ess_dr = df.loc[mask, 'Q_ESS_up_kW'].mean()
         
         if p_it.empty:
             continue
@@ -224,89 +311,12 @@ def analyze_dr_final():
     # ==========================================
     # 4. Figures (1, 2, 3)
     # ==========================================
-    print("\n[4] Generating Figures...")
-    
-    # --- Figure 1: Seasonal Profile (Line + Area) ---
-    # We already did this via visualize_dr_profile.py
-    # Re-generating with consistent naming if needed or skip?
-    # User asked for "Figure 1", "Figure 2", "Figure 3". 
-    # Let's just create them specifically named 'final_figure_X.png'
-    
-    # Fig 1 loop
-    for season in ['Spring', 'Summer', 'Fall', 'Winter']:
-        subset = df[df['season'] == season]
-        if subset.empty: continue
-        hourly = subset.groupby('hour').mean(numeric_only=True)
-        
-        plt.figure(figsize=(10, 6))
-        plt.plot(hourly.index, hourly['P_Total_kW'], 'k-', lw=2, label='Total Load')
-        plt.plot(hourly.index, hourly['P_IT_kW'], 'b--', lw=1, label='IT Load')
-        plt.plot(hourly.index, hourly['P_Cool_kW'], 'c:', lw=1, label='Cooling Load')
-        
-        # Area
-        plt.fill_between(hourly.index, 0, hourly['Q_shed_kW'], color='salmon', alpha=0.3, label='Shed Pot')
-        if hourly['Q_up_kW'].sum() > 0:
-            # Shift Up potential for visibility? Or just plot from 0?
-            # User said "Area".
-             plt.fill_between(hourly.index, 0, hourly['Q_up_kW'], color='lightgreen', alpha=0.3, label='Up Pot')
-
-        plt.title(f'Figure 1. Seasonal Average Profile ({season})')
-        plt.legend(loc='upper right')
-        plt.xlabel('Hour')
-        plt.ylabel('kW')
-        plt.grid(True, alpha=0.5)
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/final_figure_1_profile_{season}.png', dpi=300)
-        
-    # --- Figure 2: Boxplot (Shed / Up Distribution) ---
-    # Merge Shed and Up into one long format for plotting?
-    # Or two subplots?
-    # User said: "Two separate boxplots or select one". 
-    # Let's do 2 Subplots side-by-side.
-    
-    fig, axes = plt.subplots(1, 2, figsize=(12, 6))
-    
-    # Shed
-    shed_data = df[df['mask_shed']]
-    sns.boxplot(data=shed_data, x='season', y='Q_shed_kW', order=season_order, ax=axes[0], palette='Reds')
-    axes[0].set_title('Shed Potential Distribution')
-    
-    # Up
-    up_data = df[df['mask_up']]
-    if not up_data.empty:
-        # Filter season order to only existing
-        up_seasons = [s for s in season_order if s in up_data['season'].unique()]
-        sns.boxplot(data=up_data, x='season', y='Q_up_kW', order=up_seasons, ax=axes[1], palette='Greens')
-    axes[1].set_title('Up Potential Distribution')
-    
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/final_figure_2_boxplot.png', dpi=300)
-    
-    # --- Figure 3: Stacked Bar Components ---
-    # Use comp_df
-    # We need to reshape for plotting
-    # Comp_df has 'Season', 'Type', 'IT', 'Cool..', 'ESS'
-    # Create a unique label 'Season-Type'
-    comp_df['Label'] = comp_df['Season'] + '\n(' + comp_df['Type'] + ')'
-    
-    # Plot
-    # Reorganize for stacked plot: index=Label, cols=[IT, Cooling, ESS]
-    plot_df = comp_df.set_index('Label')[['IT_DR (kW)', 'Cooling_DR (kW)', 'ESS_DR (kW)']]
-    
-    ax = plot_df.plot(kind='bar', stacked=True, figsize=(10, 6), colormap='viridis', alpha=0.8)
-    plt.title('Figure 3. DR Component Breakdown (Mean kW)')
-    plt.ylabel('Capacity (kW)')
-    plt.xticks(rotation=0)
-    plt.grid(axis='y', alpha=0.5)
-    
-    # Labels
-    for c in ax.containers:
-        ax.bar_label(c, fmt='%.0f', label_type='center', color='white', fontweight='bold')
-        
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/final_figure_3_components.png', dpi=300)
-    
-    print("\nAnalysis Complete. Figures saved to figures/final_figure_*.png")
+    if figures:
+        plot_figures(df, comp_df, season_order)
 
 if __name__ == "__main__":
-    analyze_dr_final()
+    parser = argparse.ArgumentParser(description='Final DR statistics, component breakdown and report figures.')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only write the CSV outputs (matplotlib/seaborn are never imported)')
+    args = parser.parse_args()
+    analyze_dr_final(not args.no_figures)
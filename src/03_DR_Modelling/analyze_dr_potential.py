@@ -1,16 +1,13 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
 import os
 import numpy as np
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif' # Avoid font issues
-# If Korean font issues persist, user might need to install NanumGothic etc, but let's stick to English labels or default.
-
-smp_file = 'data/smp_clean.csv'
-power_file = 'data/power_source_integrated.csv'
+smp_file = 'data/smp_clean'
+power_file = 'data/power_source_integrated'
 output_dir = 'figures/04_DR_Analysis'
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
@@ -25,10 +22,40 @@ def get_season(month):
     else:
         return 'Winter'
 
-def analyze_dr_potential():
+def plot_seasonal_profiles(df, metrics, seasons):
+    from common.plotting import plt, save_figure
+    # If Korean font issues persist, user might need to install NanumGothic etc, but let's stick to English labels or default.
+
+    print("\n--- Step 2: Generating Seasonal Average Curves ---")
+
+    # Create subplots for each metric
+    for metric in metrics:
+        plt.figure(figsize=(10, 6))
+        
+        for season in seasons:
+            if season not in df['Season'].unique():
+                continue
+            
+            subset = df[df['Season'] == season]
+            # Group by hour and mean
+            daily_profile = subset.groupby('hour')[metric].mean()
+            
+            plt.plot(daily_profile.index, daily_profile.values, marker='o', label=season, linewidth=2)
+            
+        plt.title(f'Seasonal Average Profile: {metric}', fontsize=16, fontweight='bold')
+        plt.xlabel('Hour of Day')
+        plt.ylabel(metric)
+        plt.xticks(range(0, 24))
+        plt.legend()
+        plt.grid(True, linestyle='--', alpha=0.7)
+        plt.tight_layout()
+        save_figure(f"{output_dir}/figure_seasonal_profile_{metric}.png")
+        print(f"Saved {output_dir}/figure_seasonal_profile_{metric}.png")
+
+def analyze_dr_potential(figures=True):
     print("Loading Data...")
-    df_smp = pd.read_csv(smp_file, parse_dates=['datetime'], index_col='datetime')
-    df_power = pd.read_csv(power_file, parse_dates=['datetime'], index_col='datetime')
+    df_smp = load_frame(smp_file)
+    df_power = load_frame(power_file)
     
     # Merge (Inner join to match timestamps)
     df = df_smp.join(df_power, how='inner')
@@ -52,35 +79,12 @@ def analyze_dr_potential():
     df['Season'] = df['month'].apply(get_season)
     
     # --- Step 2: Seasonal Average Curves ---
-    print("\n--- Step 2: Generating Seasonal Average Curves ---")
-    
     metrics = ['SMP', 'PV_total', 'Total_Generation']
     seasons = ['Spring', 'Summer', 'Autumn', 'Winter']
     
-    # Create subplots for each metric
-    for metric in metrics:
-        plt.figure(figsize=(10, 6))
-        
-        for season in seasons:
-            if season not in df['Season'].unique():
-                continue
-            
-            subset = df[df['Season'] == season]
-            # Group by hour and mean
-            daily_profile = subset.groupby('hour')[metric].mean()
-            
-            plt.plot(daily_profile.index, daily_profile.values, marker='o', label=season, linewidth=2)
-            
-        plt.title(f'Seasonal Average Profile: {metric}', fontsize=16, fontweight='bold')
-        plt.xlabel('Hour of Day')
-        plt.ylabel(metric)
-        plt.xticks(range(0, 24))
-        plt.legend()
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        plt.savefig(f"{output_dir}/figure_seasonal_profile_{metric}.png", dpi=300)
-        print(f"Saved {output_dir}/figure_seasonal_profile_{metric}.png")
-        
+    if figures:
+        plot_seasonal_profiles(df, metrics, seasons)
+
     # --- Step 3: DR Window Derivation ---
     print("\n--- Step 3: Deriving DR Windows ---")
     
@@ -152,4 +156,8 @@ def analyze_dr_potential():
         print("-" * 80)
 
 if __name__ == "__main__":
-    analyze_dr_potential()
+    parser = argparse.ArgumentParser(description='Seasonal SMP / PV / generation profiles and DR window derivation.')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only derive the DR windows (matplotlib/seaborn are never imported)')
+    args = parser.parse_args()
+    analyze_dr_potential(not args.no_figures)
@@ -1,22 +1,54 @@
-import pandas as pd
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-input_file = 'data/data_with_weather.csv'
+input_file = 'data/data_with_weather'
 output_dir = 'figures/05_Capacity_Planning'
 
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
 
-def estimate_rated_load():
+def plot_load_duration(loads, rated_load_n, p_peak, p_99):
+    from common.plotting import plt, save_figure
+
+    print("\nGenerating Load Duration Curve...")
+    
+    # Sort loads descending
+    sorted_loads = np.sort(loads)[::-1]
+    # X-axis: Percentage of time (0 to 100)
+    x_axis = np.linspace(0, 100, len(sorted_loads))
+    
+    plt.figure(figsize=(10, 6))
+    
+    # Plot LDC
+    plt.plot(x_axis, sorted_loads, color='#1f77b4', linewidth=2, label='Load Duration Curve')
+    
+    # Mark lines
+    plt.axhline(y=rated_load_n, color='red', linestyle='--', linewidth=1.5, label=f'Rated Load N (1.1xP99) = {rated_load_n:.0f} kW')
+    plt.axhline(y=p_peak, color='black', linestyle=':', label=f'Peak = {p_peak:.0f} kW')
+    plt.axhline(y=p_99, color='green', linestyle=':', label=f'P99 = {p_99:.0f} kW')
+    
+    plt.fill_between(x_axis, sorted_loads, alpha=0.1, color='#1f77b4')
+    
+    plt.title('Load Duration Curve (LDC) & Rated Load', fontsize=16, fontweight='bold')
+    plt.xlabel('Duration (%)')
+    plt.ylabel('Load (kW)')
+    plt.legend()
+    plt.grid(True, which='both', linestyle='--', alpha=0.7)
+    
+    # Text annotation for N
+    plt.text(5, rated_load_n + 50, f"Rated Load N\n{rated_load_n:.0f} kW", color='red', fontweight='bold')
+    
+    plt.tight_layout()
+    save_figure(f'{output_dir}/figure_load_duration_curve.png')
+    print(f"Saved {output_dir}/figure_load_duration_curve.png")
+
+def estimate_rated_load(figures=True):
     print("Loading data...")
-    df = pd.read_csv(input_file)
+    df = load_frame(input_file, columns=['measured_kWh'])
     
     # 1. Convert kWh to kW
     # Data is 15-min interval. Power (kW) = Energy (kWh) * (60/15) = kWh * 4
@@ -49,37 +81,12 @@ def estimate_rated_load():
     rated_load_n = n_scenario_a
     
     # 4. Load Duration Curve (LDC)
-    print("\nGenerating Load Duration Curve...")
-    
-    # Sort loads descending
-    sorted_loads = np.sort(loads)[::-1]
-    # X-axis: Percentage of time (0 to 100)
-    x_axis = np.linspace(0, 100, len(sorted_loads))
-    
-    plt.figure(figsize=(10, 6))
-    
-    # Plot LDC
-    plt.plot(x_axis, sorted_loads, color='#1f77b4', linewidth=2, label='Load Duration Curve')
-    
-    # Mark lines
-    plt.axhline(y=rated_load_n, color='red', linestyle='--', linewidth=1.5, label=f'Rated Load N (1.1xP99) = {rated_load_n:.0f} kW')
-    plt.axhline(y=p_peak, color='black', linestyle=':', label=f'Peak = {p_peak:.0f} kW')
-    plt.axhline(y=p_99, color='green', linestyle=':', label=f'P99 = {p_99:.0f} kW')
-    
-    plt.fill_between(x_axis, sorted_loads, alpha=0.1, color='#1f77b4')
-    
-    plt.title('Load Duration Curve (LDC) & Rated Load', fontsize=16, fontweight='bold')
-    plt.xlabel('Duration (%)')
-    plt.ylabel('Load (kW)')
-    plt.legend()
-    plt.grid(True, which='both', linestyle='--', alpha=0.7)
-    
-    # Text annotation for N
-    plt.text(5, rated_load_n + 50, f"Rated Load N\n{rated_load_n:.0f} kW", color='red', fontweight='bold')
-    
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/figure_load_duration_curve.png', dpi=300)
-    print(f"Saved {output_dir}/figure_load_duration_curve.png")
+    if figures:
+        plot_load_duration(loads, rated_load_n, p_peak, p_99)
 
 if __name__ == "__main__":
-    estimate_rated_load()
+    parser = argparse.ArgumentParser(description='Load statistics, rated load candidates and the load duration curve.')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only print the statistics (matplotlib/seaborn are never imported)')
+    args = parser.parse_args()
+    estimate_rated_load(not args.no_figures)
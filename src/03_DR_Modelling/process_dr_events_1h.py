@@ -1,15 +1,32 @@
-import pandas as pd
+import argparse
 import numpy as np
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame, save_frame
+from common.incremental import add_arguments, load_params, merge_into, recompute_start, save_params
 
-input_dr = 'data/dr_simulation_results.csv'
-input_smp = 'data/smp_clean.csv'
-output_file = 'data/dr_events_1h.csv'
+input_dr = 'data/dr_simulation_results'
+input_smp = 'data/smp_clean'
+output_file = 'data/dr_events_1h'
+PARAMS_NAME = 'process_dr_events_1h'
+
+def process_dr_events_1h(incremental=False, since=None):
+    # Incremental: restart at the hour of the last output row, since that
+    # hour may have been binned from an incomplete set of intervals
+    start = recompute_start(output_file, since=since, align='1h') if incremental else None
+    # ... from the start of that day: the rebound energy is charged per day (step 5)
+    start = start.floor('D') if start is not None else None
+    params = load_params(PARAMS_NAME) if start is not None else None
+    if incremental and params is None:
+        print("No existing output/Qmin. Running full event processing.")
+        start = None
 
-def process_dr_events_1h():
     print("Loading Data...")
-    df_dr = pd.read_csv(input_dr, parse_dates=['datetime'], index_col='datetime')
-    df_smp = pd.read_csv(input_smp, parse_dates=['datetime'], index_col='datetime')
+    df_dr = load_frame(input_dr, columns=['season', 'mask_shed', 'mask_up', 'Q_shed_kW', 'Q_up_kW',
+                                          'Q_ESS_shed_kW', 'Q_ESS_up_kW', 'Cool_rebound_kW', 'Cool_precool_kW'],
+                       since=start)
+    df_smp = load_frame(input_smp, since=start)
     
     # Merge SMP into DR df
     df = df_dr.join(df_smp, how='inner')
@@ -37,6 +54,10 @@ def process_dr_events_1h():
         'mask_up_int': 'mean',
         'Q_shed_kW': 'mean',
         'Q_up_kW': 'mean',
+        'Q_ESS_shed_kW': 'mean', # ESS part of Q (common/ess.py dispatch)
+        'Q_ESS_up_kW': 'mean',
+        'Cool_rebound_kW': 'mean', # Cooling rebound / pre-cool outside the windows (common/thermal.py)
+        'Cool_precool_kW': 'mean',
         'SMP': 'mean'
     }
     
@@ -44,7 +65,8 @@ def process_dr_events_1h():
     
     # Flatten MultiIndex columns
     # e.g. (mask_shed_int, count) -> n_intervals
-    df_1h.columns = ['season', 'n_intervals', 'active_ratio_shed', 'active_ratio_up', 'Q_shed_kW', 'Q_up_kW', 'SMP_hourly']
+    df_1h.columns = ['season', 'n_intervals', 'active_ratio_shed', 'active_ratio_up', 'Q_shed_kW', 'Q_up_kW',
+                     'Q_ESS_shed_kW', 'Q_ESS_up_kW', 'Cool_rebound_kW', 'Cool_precool_kW', 'SMP_hourly']
     
     # Drop rows with n_intervals == 0 (missing data)
     df_1h = df_1h[df_1h['n_intervals'] > 0].copy()
@@ -55,33 +77,39 @@ def process_dr_events_1h():
     # User said: "Mean of Q_shed_kW (season별)" as base for calculation.
     # Let's use the mean of Qs where there is *some* potential.
     
-    seasons = ['Spring', 'Summer', 'Fall', 'Winter']
-    qmin_map_shed = {}
-    qmin_map_up = {}
-    
-    print("\n[Qmin Calculation] (Target: 0.3 * Mean)")
-    
-    for season in seasons:
-        # SHED
-        # Filter: Season matches AND Potential > 0
-        mask_s = (df_1h['season'] == season) & (df_1h['Q_shed_kW'] > 0)
-        if mask_s.any():
-            mean_val = df_1h.loc[mask_s, 'Q_shed_kW'].mean()
-            qmin = 0.3 * mean_val
-        else:
-            qmin = 0.0
-        qmin_map_shed[season] = qmin
+    if params is None:
+        seasons = ['Spring', 'Summer', 'Fall', 'Winter']
+        qmin_map_shed = {}
+        qmin_map_up = {}
+    
+        print("\n[Qmin Calculation] (Target: 0.3 * Mean)")
+    
+        for season in seasons:
+            # SHED
+            # Filter: Season matches AND Potential > 0
+            mask_s = (df_1h['season'] == season) & (df_1h['Q_shed_kW'] > 0)
+            if mask_s.any():
+                mean_val = df_1h.loc[mask_s, 'Q_shed_kW'].mean()
+                qmin = 0.3 * mean_val
+            else:
+                qmin = 0.0
+            qmin_map_shed[season] = qmin
         
-        # UP
-        mask_u = (df_1h['season'] == season) & (df_1h['Q_up_kW'] > 0)
-        if mask_u.any():
-            mean_val = df_1h.loc[mask_u, 'Q_up_kW'].mean()
-            qmin = 0.3 * mean_val
-        else:
-            qmin = 0.0
-        qmin_map_up[season] = qmin
+            # UP
+            mask_u = (df_1h['season'] == season) & (df_1h['Q_up_kW'] > 0)
+            if mask_u.any():
+                mean_val = df_1h.loc[mask_u, 'Q_up_kW'].mean()
+                qmin = 0.3 * mean_val
+            else:
+                qmin = 0.0
+            qmin_map_up[season] = qmin
         
-        print(f"  {season}: Shed Qmin={qmin:.2f}, Up Qmin={qmin:.2f}")
+            print(f"  {season}: Shed Qmin={qmin:.2f}, Up Qmin={qmin:.2f}")
+        save_params(PARAMS_NAME, {'qmin_shed': qmin_map_shed, 'qmin_up': qmin_map_up})
+    else:
+        # Incremental: seasonal Qmin stays as fitted on the full history
+        qmin_map_shed, qmin_map_up = params['qmin_shed'], params['qmin_up']
+        print(f"\n[Qmin] Updating from {start} with stored thresholds")
 
     # 4. Define Events
     # Criteria 1: Completeness (active_ratio >= 1.0) -> User said "1.0 (Conservative)"
@@ -89,8 +117,8 @@ def process_dr_events_1h():
     
     # Vectorized Qmin using map
     # Handle NaN seasons if any
-    df_1h['Qmin_shed'] = df_1h['season'].map(qmin_map_shed).fillna(0)
-    df_1h['Qmin_up']   = df_1h['season'].map(qmin_map_up).fillna(0)
+    df_1h['Qmin_shed'] = df_1h['season'].astype(str).map(qmin_map_shed).fillna(0)
+    df_1h['Qmin_up']   = df_1h['season'].astype(str).map(qmin_map_up).fillna(0)
     
     # Logic
     # Shed Event
@@ -114,21 +142,40 @@ def process_dr_events_1h():
     # Or do we store Potential Energy for all, and 'is_event' filters it?
     # User said: "E_shed_kWh = Q_shed_kW * 1.0". 
     # Let's calculate for ALL rows (Potential), filtering happens in analysis.
-    df_1h['E_shed_kWh'] = df_1h['Q_shed_kW']
+    # Net energy: the cooling rebound and pre-cool energy of a day is charged to
+    # that day's shed window hours in proportion to their Q_shed (zero without
+    # the thermal model of simulate_dr.py, i.e. E_shed_kWh = Q_shed_kW).
+    overhead = df_1h['Cool_rebound_kW'] + df_1h['Cool_precool_kW'] # kWh per 1h row
+    day = df_1h.index.floor('D')
+    weight = df_1h['Q_shed_kW'].where(df_1h['active_ratio_shed'] > 0, 0.0).clip(lower=0)
+    day_overhead = overhead.groupby(day).transform('sum')
+    day_weight = weight.groupby(day).transform('sum')
+    df_1h['E_rebound_kWh'] = np.where(day_weight > 0, day_overhead * weight / day_weight.where(day_weight > 0, 1.0), 0.0)
+    unattributed = overhead[day_weight == 0].sum()
+    if unattributed != 0:
+        print(f"Rebound energy on days without shed windows (not charged): {unattributed:,.0f} kWh")
+    
+    df_1h['E_shed_kWh'] = df_1h['Q_shed_kW'] - df_1h['E_rebound_kWh']
     df_1h['E_up_kWh']   = df_1h['Q_up_kW']
     
     # 6. Save
     # Columns requested: datetime(index), season, type?? (We have shed/cols), Q, E, SMP, n, active, is_event
     cols = ['season', 'n_intervals', 'active_ratio_shed', 'active_ratio_up', 
             'Q_shed_kW', 'Q_up_kW', 'E_shed_kWh', 'E_up_kWh', 'SMP_hourly', 
-            'is_event_shed', 'is_event_up']
+            'is_event_shed', 'is_event_up', 'Q_ESS_shed_kW', 'Q_ESS_up_kW', 'E_rebound_kWh']
             
-    df_1h[cols].to_csv(output_file)
-    print(f"\nSaved standardized events to {output_file}")
+    if start is not None:
+        saved, _ = merge_into(output_file, df_1h[cols], start)
+    else:
+        saved = save_frame(df_1h[cols], output_file)
+    print(f"\nSaved standardized events to {saved}")
     
     # Summary
     print("\n[Event Summary]")
-    print(df_1h.groupby('season')[['is_event_shed', 'is_event_up']].sum())
+    print(df_1h.groupby('season', observed=True)[['is_event_shed', 'is_event_up']].sum())
 
 if __name__ == "__main__":
-    process_dr_events_1h()
+    parser = argparse.ArgumentParser(description='Aggregate DR potential into standardized 1-hour events.')
+    add_arguments(parser)
+    args = parser.parse_args()
+    process_dr_events_1h(args.incremental, args.since)
@@ -1,11 +1,14 @@
-import pandas as pd
 import numpy as np
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame
 
-input_file = 'data/dr_simulation_results.csv'
+input_file = 'data/dr_simulation_results'
 
 def qc_dr_results():
     print("Loading DR simulation results for QC...")
-    df = pd.read_csv(input_file, parse_dates=['datetime'], index_col='datetime')
+    df = load_frame(input_file)
     
     # Calculate Total Load for Sanity Check
     # Ensure columns exist
@@ -1,6 +1,9 @@
-import pandas as pd
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame
 
-input_file = 'data/power_source_integrated.csv'
+input_file = 'data/power_source_integrated'
 
 def get_season(month):
     if month in [3, 4, 5]:
@@ -14,7 +17,7 @@ def get_season(month):
 
 def rank_power_sources():
     print("Loading Data...")
-    df = pd.read_csv(input_file, parse_dates=['datetime'], index_col='datetime')
+    df = load_frame(input_file)
     
     # Define primary sources (Using PV_total instead of sub-components)
     sources = ['원자력', '유연탄', '가스', '신재생', '양수', '수력', '풍력', '유류', '국내탄', 'PV_total']
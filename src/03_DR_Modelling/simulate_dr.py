@@ -1,22 +1,41 @@
+import argparse
 import pandas as pd
 import numpy as np
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame, save_frame
+from common.incremental import add_arguments, merge_into, recompute_start, save_params
+from common.dr_windows import (DEFAULT_WINDOWS, DEFAULT_DAY_TYPES, calendar_codes, load_windows,
+                               policy_table, season_of, window_masks)
+from common.dr_sweep import DEFAULT_PARAMS
+from common.ess import add_ess_arguments, dispatch, ess_config
+from common.thermal import add_thermal_arguments, cooling_response, thermal_config
 
-input_file = 'data/data_decomposition.csv'
-output_file = 'data/dr_simulation_results.csv'
+input_file = 'data/data_decomposition'
+input_bootstrap = 'data/data_decomposition_bootstrap'  # decompose_load.py --bootstrap
+BANDS = [10, 50, 90]
+output_file = 'data/dr_simulation_results'
+PARAMS_NAME = 'simulate_dr'   # ESS settings of the output (read by common/dr_dispatch.py)
 
-def get_season(month):
-    if month in [3, 4, 5]:
-        return 'Spring'
-    elif month in [6, 7, 8]:
-        return 'Summer'
-    elif month in [9, 10, 11]:
-        return 'Fall' # User used "Fall" in request
-    else:
-        return 'Winter'
+def last_state(column, start):
+    """Last stored value of a state column (ESS SOC, cooling debt) before start (None if unknown)."""
+    existing = load_frame(output_file)
+    if column not in existing.columns:
+        return None
+    values = existing.loc[existing.index < start, column].dropna()
+    return values.iloc[-1] if len(values) else None
+
+def simulate_dr(incremental=False, since=None, bootstrap=False, windows=DEFAULT_WINDOWS,
+                day_types=DEFAULT_DAY_TYPES, ess=None, thermal=None):
+    # Every row only depends on its own interval and the carried ESS SOC /
+    # cooling debt, so no look-back is needed
+    start = recompute_start(output_file, since=since) if incremental else None
+    if incremental:
+        print(f"Incremental update from {start}" if start is not None else "No existing output. Running full simulation.")
 
-def simulate_dr():
     print("Loading decomposition data...")
-    df = pd.read_csv(input_file, parse_dates=['datetime'], index_col='datetime')
+    df = load_frame(input_file, columns=['IT', 'Cooling', 'Other'], since=start)
     
     # 1. Convert to kW (x4)
     # Columns in decomposition: 'IT_Load', 'Cooling_Load', 'Other_Load', 'measured_kWh', 'realtime_kWh', ...
@@ -34,97 +53,87 @@ def simulate_dr():
     # df['P_Total_kW'] = df['measured_kWh'] * 4
     
     # 2. Add Time Features
-    df['month'] = df.index.month
-    df['hour'] = df.index.hour
-    df['weekday'] = df.index.weekday # 0=Mon, 6=Sun
-    df['season'] = df['month'].apply(get_season)
+    df['season'] = season_of(df.index) # "Fall" as in the program rules
     
     # 3. Parameters
-    alpha_IT = 0.10
-    alpha_cool_summer = 0.15
-    alpha_cool_other = 0.10
-    alpha_IT_forward = 0.10
-    
-    Q_ESS_fixed_kW = 1250.0 # 1.25 MW
-    
-    # 4. Define Masks (Weekday Only: 0-4)
-    is_weekday = df['weekday'] < 5
-    
-    # Initialize Masks
-    df['mask_shed'] = False
-    df['mask_up'] = False
-    
-    # --- Summer ---
-    # Shed: 11-12, 13-17
-    # Up: None
-    mask_summer = (df['season'] == 'Summer') & is_weekday
-    summer_shed_hours = [11, 13, 14, 15, 16] # 11<=h<12, 13<=h<17 -> 13,14,15,16
-    df.loc[mask_summer & df['hour'].isin(summer_shed_hours), 'mask_shed'] = True
-    
-    # --- Fall ---
-    # Shed: None
-    # Up: 11-14 (11, 12, 13)
-    mask_fall = (df['season'] == 'Fall') & is_weekday
-    fall_up_hours = [11, 12, 13] # 11<=h<14
-    df.loc[mask_fall & df['hour'].isin(fall_up_hours), 'mask_up'] = True
-    
-    # --- Winter ---
-    # Shed: 08-12 (8,9,10,11), 15-16 (15)
-    # Up: 12-14 (12, 13)
-    mask_winter = (df['season'] == 'Winter') & is_weekday
-    winter_shed_hours = [8, 9, 10, 11, 15] 
-    winter_up_hours = [12, 13]
-    df.loc[mask_winter & df['hour'].isin(winter_shed_hours), 'mask_shed'] = True
-    df.loc[mask_winter & df['hour'].isin(winter_up_hours), 'mask_up'] = True
-
-    # --- Spring (New) ---
-    # Shed: 10 (10)
-    # Up: 12-15 (12, 13, 14)
-    mask_spring = (df['season'] == 'Spring') & is_weekday
-    spring_shed_hours = [10]
-    spring_up_hours = [12, 13, 14]
-    df.loc[mask_spring & df['hour'].isin(spring_shed_hours), 'mask_shed'] = True
-    df.loc[mask_spring & df['hour'].isin(spring_up_hours), 'mask_up'] = True
+    # Shared with the parameter sweep (common/dr_sweep.py)
+    alpha_IT = DEFAULT_PARAMS['alpha_IT']
+    alpha_cool_summer = DEFAULT_PARAMS['alpha_cool_summer']
+    alpha_cool_other = DEFAULT_PARAMS['alpha_cool_other']
+    alpha_IT_forward = DEFAULT_PARAMS['alpha_IT_forward']
+    
+    # 4. Define Masks
+    # The window policy (common/dr_windows.py, weekdays only by default) is a
+    # (season x day type x hour) lookup table gathered at every timestamp
+    table = policy_table(windows, day_types, shed_priority=False)
+    mask_shed, mask_up = window_masks(table, calendar_codes(df.index))
     
     # 5. Overlap Handling (Shed Priority)
     # If both True, set Up to False
-    overlap_mask = df['mask_shed'] & df['mask_up']
+    overlap_mask = mask_shed & mask_up
     if overlap_mask.sum() > 0:
         print(f"Overlap detected in {overlap_mask.sum()} timestamps. Prioritizing Shed.")
-        df.loc[overlap_mask, 'mask_up'] = False
+        mask_up = mask_up & ~mask_shed
+    df['mask_shed'] = mask_shed
+    df['mask_up'] = mask_up
+    
+    # ESS: per-slot dispatch with SOC carried between slots (common/ess.py).
+    # Without an energy capacity it delivers its power rating in every window slot.
+    ess = dict(ess or {})
+    if start is not None and ess.get('energy_kWh') is not None:
+        ess['soc_init'] = last_state('ESS_SOC_kWh', start)
+    ess_out = dispatch(mask_shed, mask_up, **ess)
+    save_params(PARAMS_NAME, {'ess': {k: v for k, v in ess.items() if k != 'soc_init'}})
+    df['Q_ESS_shed_kW'] = ess_out['shed_kW']
+    df['Q_ESS_up_kW'] = ess_out['up_kW']
+    df['ESS_SOC_kWh'] = ess_out['soc_kWh']
+    
+    # Cooling: alpha_cool * P_Cool in the shed window, net of the thermal-mass
+    # repayment when a time constant is given (common/thermal.py)
+    thermal = dict(thermal or {})
+    if start is not None and thermal.get('tau_h') is not None:
+        thermal['debt_init'] = last_state('Cool_debt_kWh', start) or 0.0
+    alpha_cool = np.where(df['season'] == 'Summer', alpha_cool_summer, alpha_cool_other) # Fall / Winter / Spring: 'other'
     
     # 6. Calculate Q (kW)
-    # Initialize
-    df['Q_shed_kW'] = 0.0
-    df['Q_up_kW'] = 0.0
-    
-    # -- Calc Shed --
-    # Q_shed = alpha_IT * P_IT + alpha_cool * P_Cool + Q_ESS
-    # Determine alpha_cool per row? Or vectorise by season.
-    
-    # Summer Shed
-    mask_s_shed = (df['season'] == 'Summer') & df['mask_shed']
-    df.loc[mask_s_shed, 'Q_shed_kW'] = (
-        alpha_IT * df.loc[mask_s_shed, 'P_IT_kW'] + 
-        alpha_cool_summer * df.loc[mask_s_shed, 'P_Cool_kW'] + 
-        Q_ESS_fixed_kW
-    )
-    
-    # Winter Shed (Fall has no shed, but logic applies generally for 'other')
-    mask_w_shed = (df['season'] != 'Summer') & df['mask_shed'] # Fall or Winter
-    df.loc[mask_w_shed, 'Q_shed_kW'] = (
-        alpha_IT * df.loc[mask_w_shed, 'P_IT_kW'] + 
-        alpha_cool_other * df.loc[mask_w_shed, 'P_Cool_kW'] + 
-        Q_ESS_fixed_kW
-    )
-    
-    # -- Calc Up --
-    # Q_up = alpha_IT_forward * P_IT + Q_ESS
-    mask_up_all = df['mask_up']
-    df.loc[mask_up_all, 'Q_up_kW'] = (
-        alpha_IT_forward * df.loc[mask_up_all, 'P_IT_kW'] + 
-        Q_ESS_fixed_kW
-    )
+    def calc_q(p_it, p_cool):
+        q_shed = pd.Series(0.0, index=df.index)
+        q_up = pd.Series(0.0, index=df.index)
+
+        # -- Calc Shed --
+        # Q_shed = alpha_IT * P_IT + Q_Cool (alpha_cool * P_Cool - rebound) + Q_ESS
+        cool = cooling_response(mask_shed, p_cool, alpha_cool, **thermal)
+        mask_shed_all = df['mask_shed']
+        q_shed[mask_shed_all] = (
+            alpha_IT * p_it[mask_shed_all] + 
+            cool['shed_kW'][mask_shed] + 
+            df.loc[mask_shed_all, 'Q_ESS_shed_kW']
+        )
+        
+        # -- Calc Up --
+        # Q_up = alpha_IT_forward * P_IT + Q_ESS
+        mask_up_all = df['mask_up']
+        q_up[mask_up_all] = (
+            alpha_IT_forward * p_it[mask_up_all] + 
+            df.loc[mask_up_all, 'Q_ESS_up_kW']
+        )
+        return q_shed, q_up, cool
+
+    df['Q_shed_kW'], df['Q_up_kW'], cool = calc_q(df['P_IT_kW'], df['P_Cool_kW'])
+    df['Q_Cool_shed_kW'] = cool['shed_kW']
+    df['Cool_rebound_kW'] = cool['rebound_kW']
+    df['Cool_precool_kW'] = cool['precool_kW']
+    df['Cool_debt_kWh'] = cool['debt_kWh']
+
+    # Bootstrap bands: the same Q from each consistent P10/P50/P90 decomposition
+    band_cols = []
+    if bootstrap:
+        bands = load_frame(input_bootstrap).reindex(df.index)
+        for q in BANDS:
+            q_shed, q_up, _ = calc_q(bands[f'IT_p{q}'] * 4, bands[f'Cooling_p{q}'] * 4)
+            df[f'Q_shed_kW_p{q}'] = q_shed
+            df[f'Q_up_kW_p{q}'] = q_up
+            band_cols += [f'Q_shed_kW_p{q}', f'Q_up_kW_p{q}']
     
     # 7. Sanity Checks
     print("\n--- Sanity Checks ---")
@@ -148,18 +157,55 @@ def simulate_dr():
         
         print(f"[{season}] Shed Count: {shed_count}, Mean Q_shed: {shed_mean:.2f} kW")
         print(f"[{season}] Up   Count: {up_count}, Mean Q_up:   {up_mean:.2f} kW")
+        if bootstrap:
+            band_means = [df.loc[s_mask & df['mask_shed'], f'Q_shed_kW_p{q}'].mean() for q in BANDS]
+            print(f"[{season}] Mean Q_shed bands: " + ", ".join(f"P{q}={m:.2f}" for q, m in zip(BANDS, band_means)) + " kW")
         
     # C. Overlap re-check
     final_overlap = (df['mask_shed'] & df['mask_up']).sum()
     print(f"\nFinal Overlap Count: {final_overlap} (Should be 0)")
     
+    # D. ESS contribution (below its power rating once the SOC runs out)
+    print(f"ESS Mean in Windows: Shed {df.loc[df['mask_shed'], 'Q_ESS_shed_kW'].mean():.2f} kW, "
+          f"Up {df.loc[df['mask_up'], 'Q_ESS_up_kW'].mean():.2f} kW")
+    if df['ESS_SOC_kWh'].notna().any():
+        print(f"ESS SOC range: {df['ESS_SOC_kWh'].min():.1f} - {df['ESS_SOC_kWh'].max():.1f} kWh")
+    
+    # E. Cooling rebound (energy in kWh over the simulated period)
+    if df['Cool_debt_kWh'].notna().any():
+        e_cool = df['Q_Cool_shed_kW'].sum() * 0.25
+        e_rebound = df['Cool_rebound_kW'].sum() * 0.25
+        e_precool = df['Cool_precool_kW'].sum() * 0.25
+        print(f"Cooling Shed {e_cool:,.0f} kWh (net in window), Rebound {e_rebound:,.0f} kWh, "
+              f"Pre-cool {e_precool:,.0f} kWh, Net {e_cool - e_rebound - e_precool:,.0f} kWh")
+    
     # 8. Save
     # Keep requested columns + datetime
-    cols_to_save = ['season', 'mask_shed', 'mask_up', 'Q_shed_kW', 'Q_up_kW', 'P_IT_kW', 'P_Cool_kW', 'P_Other_kW']
+    cols_to_save = ['season', 'mask_shed', 'mask_up', 'Q_shed_kW', 'Q_up_kW', 'P_IT_kW', 'P_Cool_kW', 'P_Other_kW',
+                    'Q_ESS_shed_kW', 'Q_ESS_up_kW', 'ESS_SOC_kWh',
+                    'Q_Cool_shed_kW', 'Cool_rebound_kW', 'Cool_precool_kW', 'Cool_debt_kWh'] + band_cols
     output_df = df[cols_to_save]
-    output_df.to_csv(output_file)
-    print(f"\nSaved results to {output_file}")
+    if start is not None:
+        saved, _ = merge_into(output_file, output_df, start)
+    else:
+        saved = save_frame(output_df, output_file)
+    print(f"\nSaved results to {saved}")
     print(output_df.head(10))
 
 if __name__ == "__main__":
-    simulate_dr()
+    parser = argparse.ArgumentParser(description='Simulate 15-min DR shed/up potential.')
+    add_arguments(parser)
+    add_ess_arguments(parser)
+    add_thermal_arguments(parser)
+    parser.add_argument('--bootstrap', action='store_true',
+                        help='Also write Q_shed/Q_up for the P10/P50/P90 bands of decompose_load.py --bootstrap')
+    parser.add_argument('--windows', default=None,
+                        help='JSON window policy (see common/dr_windows.load_windows) instead of DEFAULT_WINDOWS')
+    args = parser.parse_args()
+    if args.bootstrap and args.incremental:
+        parser.error('--bootstrap bands cover the full history; run without --incremental')
+    if args.precool_h > 0 and args.thermal_tau_h is None:
+        parser.error('--precool-h needs a thermal model (--thermal-tau-h)')
+    windows, day_types = load_windows(args.windows) if args.windows else (DEFAULT_WINDOWS, DEFAULT_DAY_TYPES)
+    simulate_dr(args.incremental, args.since, args.bootstrap, windows, day_types, ess_config(args),
+                thermal_config(args))
@@ -0,0 +1,52 @@
+import argparse
+import time
+import numpy as np
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.ess import C_RATE, ROUND_TRIP_EFF, sizing_table
+from common.storage import load_frame, save_frame
+
+input_file = 'data/dr_simulation_results'
+output_file = 'data/ess_sizing'
+
+# Default grid: 11 power ratings x 11 capacities = 121 sizings
+DEFAULT_POWER_KW = [float(p) for p in range(0, 2501, 250)]
+DEFAULT_ENERGY_KWH = [float(e) for e in range(0, 5001, 500)]
+
+def size_ess(power_kW=DEFAULT_POWER_KW, energy_kWh=DEFAULT_ENERGY_KWH, round_trip_eff=ROUND_TRIP_EFF,
+             c_rate=C_RATE, recharge_kW=None):
+    print("Loading DR simulation results...")
+    df = load_frame(input_file, columns=['season', 'mask_shed', 'mask_up'])
+
+    # Full power x energy grid
+    power, energy = [a.ravel() for a in np.meshgrid(power_kW, energy_kWh, indexing='ij')]
+    print(f"Dispatching {len(power):,} ESS sizings over {len(df):,} intervals...")
+    t0 = time.perf_counter()
+    res = sizing_table(df['mask_shed'], df['mask_up'], df['season'], power, energy,
+                       round_trip_eff=round_trip_eff, c_rate=c_rate, recharge_kW=recharge_kW)
+    print(f"Done in {time.perf_counter() - t0:.2f} s")
+
+    saved = save_frame(res, output_file, index=False)
+    print(f"Saved {len(res):,} rows to {saved}")
+
+    # Summer shed: mean ESS contribution per power (rows) and energy (columns)
+    view = res[res['season'] == 'Summer']
+    if not view.empty:
+        print("\n--- Summer Shed: mean ESS power in window [kW] (rows: kW, columns: kWh) ---")
+        print(view.pivot(index='power_kW', columns='energy_kWh', values='shed_mean_kW').round(1).to_string())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Evaluate the DR contribution of a grid of ESS power / energy sizings.')
+    parser.add_argument('--power-kw', type=float, nargs='+', default=DEFAULT_POWER_KW,
+                        help='ESS power ratings in kW (default 0-2500 step 250)')
+    parser.add_argument('--energy-kwh', type=float, nargs='+', default=DEFAULT_ENERGY_KWH,
+                        help='ESS energy capacities in kWh (default 0-5000 step 500)')
+    parser.add_argument('--eff', type=float, default=ROUND_TRIP_EFF,
+                        help=f'Round-trip efficiency (default {ROUND_TRIP_EFF:g})')
+    parser.add_argument('--c-rate', type=float, default=C_RATE,
+                        help=f'C-rate limit, power <= c_rate * kWh (default {C_RATE:g})')
+    parser.add_argument('--recharge-kw', type=float, default=None,
+                        help='Recharge power outside DR windows (default: the power limit)')
+    args = parser.parse_args()
+    size_ess(args.power_kw, args.energy_kwh, args.eff, args.c_rate, args.recharge_kw)
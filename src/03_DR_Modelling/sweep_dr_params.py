@@ -0,0 +1,57 @@
+import argparse
+import time
+import numpy as np
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.dr_sweep import DEFAULT_PARAMS, PARAM_NAMES, QUANTILE, param_grid, sweep
+from common.storage import load_frame, save_frame
+
+input_file = 'data/dr_simulation_results'
+output_file = 'data/dr_param_sweep'
+
+# Default grid: 5 x 7 x 5 x 5 x 11 = 9,625 parameter sets
+DEFAULT_GRID = {
+    'alpha_IT': [0.0, 0.05, 0.10, 0.15, 0.20],
+    'alpha_cool_summer': [0.0, 0.05, 0.10, 0.15, 0.20, 0.25, 0.30],
+    'alpha_cool_other': [0.0, 0.05, 0.10, 0.15, 0.20],
+    'alpha_IT_forward': [0.0, 0.05, 0.10, 0.15, 0.20],
+    'Q_ESS_kW': [float(q) for q in range(0, 2501, 250)],
+}
+
+def sweep_dr_params(grid=DEFAULT_GRID, quantile=QUANTILE):
+    print("Loading DR simulation results...")
+    df = load_frame(input_file, columns=['season', 'mask_shed', 'mask_up', 'P_IT_kW', 'P_Cool_kW'])
+
+    params = param_grid(**grid)
+    print(f"Sweeping {len(params):,} parameter sets over {len(df):,} intervals...")
+    t0 = time.perf_counter()
+    res = sweep(df, params, quantile=quantile)
+    print(f"Done in {time.perf_counter() - t0:.2f} s")
+
+    saved = save_frame(res, output_file, index=False)
+    print(f"Saved {len(res):,} rows to {saved}")
+
+    # Baseline (simulate_dr.py parameters) for reference
+    q_col = res.columns[-2]
+    base = np.all([np.isclose(res[name], DEFAULT_PARAMS[name]) for name in PARAM_NAMES], axis=0)
+    if base.any():
+        print("\n--- Baseline parameters ---")
+        print(res.loc[base, ['kind', 'season', 'intervals', 'mean_kW', q_col, 'events']].to_string(index=False))
+
+    # ESS sizing view: Summer shed potential per Q_ESS at the baseline alphas
+    alphas = np.all([np.isclose(res[name], DEFAULT_PARAMS[name]) for name in PARAM_NAMES[:-1]], axis=0)
+    view = res[alphas & (res['kind'] == 'shed') & (res['season'] == 'Summer')]
+    if not view.empty:
+        print("\n--- Summer Shed vs Q_ESS (baseline alphas) ---")
+        print(view[['Q_ESS_kW', 'mean_kW', q_col, 'events']].to_string(index=False))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Evaluate DR potential for a grid of alpha / ESS parameter sets.')
+    for name in PARAM_NAMES:
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=float, nargs='+',
+                            default=DEFAULT_GRID[name], help=f'Values of {name} (baseline {DEFAULT_PARAMS[name]})')
+    parser.add_argument('--quantile', type=float, default=QUANTILE,
+                        help='Upper quantile of the in-window 15-min potential (default 0.9)')
+    args = parser.parse_args()
+    sweep_dr_params({name: getattr(args, name) for name in PARAM_NAMES}, args.quantile)
@@ -1,12 +1,11 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.dr_sweep import DEFAULT_PARAMS
+from common.plotting import plt, save_figure
+from common.storage import load_frame
 
-input_file = 'data/dr_simulation_results.csv'
+input_file = 'data/dr_simulation_results'
 output_dir = 'figures/04_DR_Analysis'
 import os
 if not os.path.exists(output_dir):
@@ -14,7 +13,7 @@ if not os.path.exists(output_dir):
 
 def visualize_dr_components():
     print("Loading DR results...")
-    df = pd.read_csv(input_file, parse_dates=['datetime'], index_col='datetime')
+    df = load_frame(input_file, columns=['season', 'mask_shed', 'P_IT_kW', 'Q_Cool_shed_kW', 'Q_ESS_shed_kW'])
     
     # Filter for Shed Windows only
     shed_df = df[df['mask_shed'] == True].copy()
@@ -25,24 +24,17 @@ def visualize_dr_components():
         
     print(f"Analyzing {len(shed_df)} shed intervals...")
     
-    # Calculate Components based on parameters
-    # Alpha constants
-    alpha_IT = 0.10
-    alpha_cool_summer = 0.15
-    alpha_cool_other = 0.10
-    Q_ESS_fixed = 1250.0
+    # Calculate Components (as in simulate_dr.py)
+    alpha_IT = DEFAULT_PARAMS['alpha_IT']
     
     # 1. IT DR
     shed_df['DR_IT'] = shed_df['P_IT_kW'] * alpha_IT
     
-    # 2. Cooling DR
-    # Apply conditional alpha
-    # Make a series for alpha
-    alpha_cool_series = shed_df['season'].map(lambda x: alpha_cool_summer if x == 'Summer' else alpha_cool_other)
-    shed_df['DR_Cooling'] = shed_df['P_Cool_kW'] * alpha_cool_series
+    # 2. Cooling DR (alpha_cool * P_Cool, net of the thermal rebound)
+    shed_df['DR_Cooling'] = shed_df['Q_Cool_shed_kW']
     
-    # 3. ESS DR
-    shed_df['DR_ESS'] = Q_ESS_fixed
+    # 3. ESS DR (per-slot dispatch, common/ess.py)
+    shed_df['DR_ESS'] = shed_df['Q_ESS_shed_kW']
     
     # Group by Season and Mean
     # We want X-axis: Season (Summer, Fall, Winter)
@@ -50,7 +42,7 @@ def visualize_dr_components():
     # Let's see unique seasons
     print("Seasons in Shed Data:", shed_df['season'].unique())
     
-    seasonal_means = shed_df.groupby('season')[['DR_IT', 'DR_Cooling', 'DR_ESS']].mean()
+    seasonal_means = shed_df.groupby('season', observed=True)[['DR_IT', 'DR_Cooling', 'DR_ESS']].mean()
     
     # Reindex to ensure order (Summer, Fall, Winter) if possible, 
     # but strictly Fall is missing.
@@ -81,7 +73,7 @@ def visualize_dr_components():
         ax.bar_label(container, fmt='%.0f', label_type='center', color='white', fontsize=10, fontweight='bold')
         
     plt.tight_layout()
-    plt.savefig(f"{output_dir}/figure_dr_components_stacked.png", dpi=300)
+    save_figure(f"{output_dir}/figure_dr_components_stacked.png")
     print(f"Saved {output_dir}/figure_dr_components_stacked.png")
 
 if __name__ == "__main__":
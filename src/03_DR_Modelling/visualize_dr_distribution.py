@@ -1,20 +1,17 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.plotting import plt, sns, save_figure
+from common.storage import load_frame
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-input_file = 'data/dr_simulation_results.csv'
+input_file = 'data/dr_simulation_results'
 output_dir = 'figures/04_DR_Analysis'
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
 
 def visualize_dr_distribution():
     print("Loading DR results...")
-    df = pd.read_csv(input_file, parse_dates=['datetime'], index_col='datetime')
+    df = load_frame(input_file, columns=['season', 'mask_shed', 'mask_up', 'Q_shed_kW', 'Q_up_kW'])
     
     # Define order
     season_order = ['Spring', 'Summer', 'Fall', 'Winter']
@@ -39,7 +36,7 @@ def visualize_dr_distribution():
         # sns.stripplot(data=shed_data, x='season', y='Q_shed_kW', order=season_order, color='black', alpha=0.1, size=2)
         
         # Calculate stats for annotation
-        stats = shed_data.groupby('season')['Q_shed_kW'].agg(['mean', 'std'])
+        stats = shed_data.groupby('season', observed=True)['Q_shed_kW'].agg(['mean', 'std'])
         print("\n--- Shed Stats ---")
         print(stats)
         
@@ -50,7 +47,7 @@ def visualize_dr_distribution():
         plt.ylabel('Potential (kW)')
         plt.xlabel('Season')
         plt.tight_layout()
-        plt.savefig(f"{output_dir}/figure_dr_distribution_shed.png", dpi=300)
+        save_figure(f"{output_dir}/figure_dr_distribution_shed.png")
         print(f"Saved {output_dir}/figure_dr_distribution_shed.png")
     
     # --- Plot 2: Up Potential Distribution ---
@@ -58,7 +55,7 @@ def visualize_dr_distribution():
         plt.figure(figsize=(8, 6))
         sns.violinplot(data=up_data, x='season', y='Q_up_kW', order=season_order, palette='Greens', inner='quartile', alpha=0.6)
         
-        stats_up = up_data.groupby('season')['Q_up_kW'].agg(['mean', 'std'])
+        stats_up = up_data.groupby('season', observed=True)['Q_up_kW'].agg(['mean', 'std'])
         print("\n--- Up Stats ---")
         print(stats_up)
         
@@ -66,7 +63,7 @@ def visualize_dr_distribution():
         plt.ylabel('Potential (kW)')
         plt.xlabel('Season')
         plt.tight_layout()
-        plt.savefig(f"{output_dir}/figure_dr_distribution_up.png", dpi=300)
+        save_figure(f"{output_dir}/figure_dr_distribution_up.png")
         print(f"Saved {output_dir}/figure_dr_distribution_up.png")
 
 if __name__ == "__main__":
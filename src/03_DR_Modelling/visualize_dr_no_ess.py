@@ -1,13 +1,12 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.dr_sweep import DEFAULT_PARAMS
+from common.plotting import plt, save_figure
+from common.storage import load_frame
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-input_file = 'data/dr_simulation_results.csv'
+input_file = 'data/dr_simulation_results'
 output_dir = 'figures/04_DR_Analysis'
 
 # Ensure output dir exists (it should from previous step)
@@ -15,14 +14,13 @@ os.makedirs(output_dir, exist_ok=True)
 
 def visualize_dr_components_no_ess():
     print("Loading DR results...")
-    df = pd.read_csv(input_file, parse_dates=['datetime'], index_col='datetime')
+    df = load_frame(input_file, columns=['season', 'mask_shed', 'mask_up', 'P_IT_kW', 'Q_Cool_shed_kW'])
     
-    # Parameters
-    alpha_IT = 0.10
-    alpha_cool_summer = 0.15
-    alpha_cool_other = 0.10
-    alpha_IT_forward = 0.10
-    # Q_ESS_fixed = 1250.0  <-- Excluded
+    # Parameters (as in simulate_dr.py)
+    alpha_IT = DEFAULT_PARAMS['alpha_IT']
+    alpha_IT_forward = DEFAULT_PARAMS['alpha_IT_forward']
+    # Cooling: Q_Cool_shed_kW (alpha_cool * P_Cool, net of the thermal rebound)
+    # ESS dispatch (Q_ESS_shed_kW / Q_ESS_up_kW)  <-- Excluded
     
     comp_list = []
     
@@ -44,12 +42,9 @@ def visualize_dr_components_no_ess():
             if not mask.any(): continue
             
             p_it = df.loc[mask, 'P_IT_kW']
-            p_cool = df.loc[mask, 'P_Cool_kW']
-            
-            a_cool = alpha_cool_summer if season == 'Summer' else alpha_cool_other
             
             it_dr = p_it * alpha_IT
-            cool_dr = p_cool * a_cool
+            cool_dr = df.loc[mask, 'Q_Cool_shed_kW']
             
         else: # Up
             mask = (df['season'] == season) & df['mask_up']
@@ -95,7 +90,7 @@ def visualize_dr_components_no_ess():
 
     plt.tight_layout()
     filename = f"{output_dir}/final_figure_3_components_no_ess.png"
-    plt.savefig(filename, dpi=300)
+    save_figure(filename)
     print(f"Saved {filename}")
 
 if __name__ == "__main__":
@@ -1,25 +1,58 @@
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-input_dr = 'data/dr_simulation_results.csv'
-input_smp = 'data/smp_clean.csv'
+input_dr = 'data/dr_simulation_results'
+input_smp = 'data/smp_clean'
 output_dir = 'figures/06_Final_Report'
 output_data = 'data/revenue_results.csv'
 
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
 
-def analyze_revenue():
+def plot_sensitivity(res_df, base_rate_default):
+    from common.plotting import plt, save_figure
+
+    plt.figure(figsize=(10, 6))
+    
+    # Plot Total Revenue
+    plt.plot(res_df['Event_Hours'], res_df['Total_Revenue'] / 1e6, 'o-', linewidth=2, label='Total Revenue')
+    
+    # Stacked Area for Cap vs Energy?
+    # plt.stackplot(res_df['Event_Hours'], 
+    #               res_df['Cap_Revenue']/1e6, 
+    #               res_df['Energy_Revenue']/1e6, 
+    #               labels=['Capacity Payment', 'Energy Payment'], alpha=0.3)
+    
+    # Better: Line plot with components
+    plt.plot(res_df['Event_Hours'], res_df['Cap_Revenue'] / 1e6, '--', color='gray', label='Capacity Payment (Fixed)')
+    plt.plot(res_df['Event_Hours'], res_df['Energy_Revenue'] / 1e6, ':', color='green', label='Energy Payment (Variable)')
+
+    plt.title(f'Annual DR Revenue Sensitivity (Base Rate: {base_rate_default:,} KRW/kW)', fontsize=14, fontweight='bold')
+    plt.xlabel('Annual Event Hours (h)')
+    plt.ylabel('Revenue (Million KRW)')
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.legend()
+    
+    # Add labels
+    for i, row in res_df.iterrows():
+        if row['Event_Hours'] % 20 == 0: # Label every 20h
+            plt.text(row['Event_Hours'], row['Total_Revenue']/1e6 + 2, 
+                     f"{row['Total_Revenue']/1e6:.1f} M", ha='center', fontweight='bold')
+    
+    plt.tight_layout()
+    plot_file = f"{output_dir}/figure_revenue_sensitivity.png"
+    save_figure(plot_file)
+    print(f"Saved {plot_file}")
+
+def analyze_revenue(figures=True):
     print("Loading Data...")
-    df_dr = pd.read_csv(input_dr, parse_dates=['datetime'], index_col='datetime')
-    df_smp = pd.read_csv(input_smp, parse_dates=['datetime'], index_col='datetime')
+    df_dr = load_frame(input_dr, columns=['season', 'mask_shed', 'Q_shed_kW'])
+    df_smp = load_frame(input_smp)
     
     # Merge
     # DR results are 15-min. SMP is 15-min (resampled previously).
@@ -132,40 +165,13 @@ def analyze_revenue():
     res_df.to_csv(output_data, index=False)
     print(res_df)
     
-    # ---------------------------------------------------------
     # 4. Visualization (Sensitivity)
-    # ---------------------------------------------------------
-    plt.figure(figsize=(10, 6))
-    
-    # Plot Total Revenue
-    plt.plot(res_df['Event_Hours'], res_df['Total_Revenue'] / 1e6, 'o-', linewidth=2, label='Total Revenue')
-    
-    # Stacked Area for Cap vs Energy?
-    # plt.stackplot(res_df['Event_Hours'], 
-    #               res_df['Cap_Revenue']/1e6, 
-    #               res_df['Energy_Revenue']/1e6, 
-    #               labels=['Capacity Payment', 'Energy Payment'], alpha=0.3)
-    
-    # Better: Line plot with components
-    plt.plot(res_df['Event_Hours'], res_df['Cap_Revenue'] / 1e6, '--', color='gray', label='Capacity Payment (Fixed)')
-    plt.plot(res_df['Event_Hours'], res_df['Energy_Revenue'] / 1e6, ':', color='green', label='Energy Payment (Variable)')
-
-    plt.title(f'Annual DR Revenue Sensitivity (Base Rate: {base_rate_default:,} KRW/kW)', fontsize=14, fontweight='bold')
-    plt.xlabel('Annual Event Hours (h)')
-    plt.ylabel('Revenue (Million KRW)')
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend()
-    
-    # Add labels
-    for i, row in res_df.iterrows():
-        if row['Event_Hours'] % 20 == 0: # Label every 20h
-            plt.text(row['Event_Hours'], row['Total_Revenue']/1e6 + 2, 
-                     f"{row['Total_Revenue']/1e6:.1f} M", ha='center', fontweight='bold')
-    
-    plt.tight_layout()
-    plot_file = f"{output_dir}/figure_revenue_sensitivity.png"
-    plt.savefig(plot_file, dpi=300)
-    print(f"Saved {plot_file}")
+    if figures:
+        plot_sensitivity(res_df, base_rate_default)
 
 if __name__ == "__main__":
-    analyze_revenue()
+    parser = argparse.ArgumentParser(description='Annual DR revenue vs. event hours (capacity + energy payments).')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only write the CSV output (matplotlib/seaborn are never imported)')
+    args = parser.parse_args()
+    analyze_revenue(not args.no_figures)
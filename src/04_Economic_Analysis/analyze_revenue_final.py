@@ -1,15 +1,14 @@
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 import calendar
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame
+from common.dr_dispatch import add_dispatch_arguments, dispatch_config, event_values, solve
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-input_events = 'data/dr_events_1h.csv'
+input_events = 'data/dr_events_1h'
 output_dir = 'figures/06_Final_Report'
 output_csv = 'data/revenue_results_final.csv'
 
@@ -32,9 +31,34 @@ def get_weekdays_count(year, month):
             if week[i] != 0: count += 1
     return count
 
-def analyze_revenue_final():
+def plot_sensitivity(res_df, colors):
+    from common.plotting import plt, save_figure
+
+    plt.figure(figsize=(10, 6))
+    
+    pivot = res_df.pivot(index='Event_Hours', columns='Rate_Scenario', values='Total_Revenue')
+    
+    # Plot Lines
+    for scen in ['Low', 'Base', 'High']:
+        plt.plot(pivot.index, pivot[scen]/1e6, 'o-', linewidth=2, color=colors[scen], label=f'{scen} Rate Scenario')
+        
+    # Shade Range
+    plt.fill_between(pivot.index, pivot['Low']/1e6, pivot['High']/1e6, color='gray', alpha=0.15)
+    
+    plt.title('Annual DR Revenue Sensitivity (Final Monthly Detailed)', fontsize=14, fontweight='bold')
+    plt.xlabel('Annual Event Hours (h)')
+    plt.ylabel('Total Revenue (Million KRW)')
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.legend()
+    plt.tight_layout()
+    
+    plot_path = f"{output_dir}/figure_revenue_sensitivity_final.png"
+    save_figure(plot_path)
+    print(f"Saved {plot_path}")
+
+def analyze_revenue_final(figures=True, dispatch=None):
     print("Loading Standardized DR Events...")
-    df = pd.read_csv(input_events, parse_dates=['datetime'], index_col='datetime')
+    df = load_frame(input_events, columns=['is_event_shed', 'Q_shed_kW', 'E_shed_kWh', 'Q_ESS_shed_kW', 'SMP_hourly'])
     
     # Enable Month/Year access
     df['month'] = df.index.month
@@ -83,19 +107,20 @@ def analyze_revenue_final():
         
     print(f"Annual Capacity Revenue (Base): {total_rev_cap['Base']/1e6:,.2f} M KRW")
     
-    # 2. Energy Calculation (Top-N)
-    # Pre-calc revenue potential
-    shed_events = df[df['is_event_shed']].copy()
-    if not shed_events.empty:
-        shed_events['rev_per_hour'] = shed_events['E_shed_kWh'] * shed_events['SMP_hourly']
-    else:
-        shed_events['rev_per_hour'] = 0
+    # 2. Energy Calculation (Optimal Dispatch)
+    # Revenue-maximizing event hours (E_shed * SMP) under the daily event and
+    # event length limits, and with --ess-kwh the ESS energy shared by the
+    # hours of a day (common/dr_dispatch.py). One solve covers every budget.
+    event_hours_range = [0, 10, 20, 30, 40, 50, 60]
+    dispatch = dispatch or {}
+    value, ess_value = event_values(df, ess_limited=dispatch.get('ess_hours') is not None)
+    solution = solve(df.index, value, ess_value, df['is_event_shed'], max_hours=max(event_hours_range), **dispatch)
+    en_rev_by_hours = solution['revenue'][0]
         
     # 3. Create Scenarios
     # Varies: Rate Scenario (Low/Base/High) AND Event Hours (0..60)
     
     results = []
-    event_hours_range = [0, 10, 20, 30, 40, 50, 60]
     scenarios = ['Low', 'Base', 'High']
     colors = {'Low': 'gray', 'Base': '#1f77b4', 'High': 'red'}
     
@@ -103,11 +128,8 @@ def analyze_revenue_final():
         cap_rev = total_rev_cap[scen]
         
         for hrs in event_hours_range:
-            # Energy Rev Top-N
-            if hrs > 0 and not shed_events.empty:
-                en_rev = shed_events['rev_per_hour'].nlargest(hrs).sum()
-            else:
-                en_rev = 0
+            # Energy Rev of the optimal dispatch with at most hrs event hours
+            en_rev = en_rev_by_hours[hrs]
             
             results.append({
                 'Rate_Scenario': scen,
@@ -121,27 +143,17 @@ def analyze_revenue_final():
     res_df.to_csv(output_csv, index=False)
     
     # 4. Visualization
-    plt.figure(figsize=(10, 6))
-    
-    pivot = res_df.pivot(index='Event_Hours', columns='Rate_Scenario', values='Total_Revenue')
-    
-    # Plot Lines
-    for scen in ['Low', 'Base', 'High']:
-        plt.plot(pivot.index, pivot[scen]/1e6, 'o-', linewidth=2, color=colors[scen], label=f'{scen} Rate Scenario')
-        
-    # Shade Range
-    plt.fill_between(pivot.index, pivot['Low']/1e6, pivot['High']/1e6, color='gray', alpha=0.15)
-    
-    plt.title('Annual DR Revenue Sensitivity (Final Monthly Detailed)', fontsize=14, fontweight='bold')
-    plt.xlabel('Annual Event Hours (h)')
-    plt.ylabel('Total Revenue (Million KRW)')
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend()
-    plt.tight_layout()
-    
-    plot_path = f"{output_dir}/figure_revenue_sensitivity_final.png"
-    plt.savefig(plot_path, dpi=300)
-    print(f"Saved {plot_path}")
+    if figures:
+        plot_sensitivity(res_df, colors)
 
 if __name__ == "__main__":
-    analyze_revenue_final()
+    parser = argparse.ArgumentParser(description='Annual DR revenue per rate scenario from the 1-hour events.')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only write the CSV output (matplotlib/seaborn are never imported)')
+    add_dispatch_arguments(parser)
+    args = parser.parse_args()
+    try:
+        dispatch = dispatch_config(args)
+    except ValueError as e:
+        parser.error(str(e))
+    analyze_revenue_final(not args.no_figures, dispatch)
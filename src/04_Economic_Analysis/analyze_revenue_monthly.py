@@ -1,15 +1,13 @@
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 import calendar
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-input_file = 'data/dr_events_1h.csv'
+input_file = 'data/dr_events_1h'
 output_dir = 'figures/06_Final_Report'
 output_csv = 'data/revenue_capacity_monthly.csv'
 
@@ -46,9 +44,62 @@ def get_weekdays_count(year, month):
                 weekdays_count += 1
     return weekdays_count
 
-def analyze_revenue_monthly():
+def plot_figures(df_res, ann_low, ann_base, ann_high):
+    from common.plotting import plt, save_figure
+
+    # Fig 1: Monthly Unit Price (Band)
+    plt.figure(figsize=(10, 6))
+    x = range(len(df_res))
+    plt.plot(x, df_res['Rate_Base'], 'o-', color='navy', label='Base Rate')
+    plt.fill_between(x, df_res['Rate_Low'], df_res['Rate_High'], color='skyblue', alpha=0.4, label='Rate Range (Low-High)')
+    plt.xticks(x, df_res['Label'], rotation=45)
+    plt.title('Monthly Capacity Payment Rates (Unit Price)', fontsize=14, fontweight='bold')
+    plt.ylabel('Rate (KRW/kW-month)')
+    plt.legend()
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.tight_layout()
+    save_figure(f"{output_dir}/figure_monthly_cp_rates.png")
+    
+    # Fig 2: Monthly Revenue (Base Case)
+    plt.figure(figsize=(10, 6))
+    # Bar plot
+    bars = plt.bar(x, df_res['Rev_Base']/1e6, color='forestgreen', alpha=0.8)
+    plt.xticks(x, df_res['Label'], rotation=45)
+    plt.title('Monthly Capacity Revenue (Base Case: P90 Cap)', fontsize=14, fontweight='bold')
+    plt.ylabel('Revenue (Million KRW)')
+    plt.grid(True, axis='y', linestyle='--', alpha=0.6)
+    
+    # Add values
+    for rect in bars:
+        height = rect.get_height()
+        plt.text(rect.get_x() + rect.get_width()/2.0, height, f'{height:.1f}', ha='center', va='bottom')
+        
+    plt.tight_layout()
+    save_figure(f"{output_dir}/figure_monthly_cp_revenue.png")
+    
+    # Fig 3: Annual Comparison
+    plt.figure(figsize=(8, 6))
+    scenarios = ['Low', 'Base', 'High']
+    values = [ann_low/1e6, ann_base/1e6, ann_high/1e6]
+    colors = ['gray', 'navy', 'red']
+    
+    plt.bar(scenarios, values, color=colors, alpha=0.8, width=0.5)
+    plt.title('Annual Capacity Revenue Scenarios', fontsize=14, fontweight='bold')
+    plt.ylabel('Annual Revenue (Million KRW)')
+    
+    for i, v in enumerate(values):
+        plt.text(i, v, f'{v:.1f} M', ha='center', va='bottom', fontweight='bold', fontsize=12)
+        
+    plt.ylim(0, max(values)*1.15)
+    plt.grid(True, axis='y', linestyle='--', alpha=0.6)
+    plt.tight_layout()
+    save_figure(f"{output_dir}/figure_annual_cp_comparison.png")
+    
+    print("Figures saved.")
+
+def analyze_revenue_monthly(figures=True):
     print("Loading Data...")
-    df = pd.read_csv(input_file, parse_dates=['datetime'], index_col='datetime')
+    df = load_frame(input_file, columns=['is_event_shed', 'Q_shed_kW'])
     
     # Add weekday info (0=Mon, 6=Sun) just in case re-loading loses it (it shouldn't if datetime index)
     df['weekday'] = df.index.weekday
@@ -162,56 +213,12 @@ def analyze_revenue_monthly():
     print(f"  High Rate Scenario: {ann_high/1e6:,.2f} M KRW")
     
     # --- 6. Figures ---
-    
-    # Fig 1: Monthly Unit Price (Band)
-    plt.figure(figsize=(10, 6))
-    x = range(len(df_res))
-    plt.plot(x, df_res['Rate_Base'], 'o-', color='navy', label='Base Rate')
-    plt.fill_between(x, df_res['Rate_Low'], df_res['Rate_High'], color='skyblue', alpha=0.4, label='Rate Range (Low-High)')
-    plt.xticks(x, df_res['Label'], rotation=45)
-    plt.title('Monthly Capacity Payment Rates (Unit Price)', fontsize=14, fontweight='bold')
-    plt.ylabel('Rate (KRW/kW-month)')
-    plt.legend()
-    plt.grid(True, linestyle='--', alpha=0.6)
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/figure_monthly_cp_rates.png", dpi=300)
-    
-    # Fig 2: Monthly Revenue (Base Case)
-    plt.figure(figsize=(10, 6))
-    # Bar plot
-    bars = plt.bar(x, df_res['Rev_Base']/1e6, color='forestgreen', alpha=0.8)
-    plt.xticks(x, df_res['Label'], rotation=45)
-    plt.title('Monthly Capacity Revenue (Base Case: P90 Cap)', fontsize=14, fontweight='bold')
-    plt.ylabel('Revenue (Million KRW)')
-    plt.grid(True, axis='y', linestyle='--', alpha=0.6)
-    
-    # Add values
-    for rect in bars:
-        height = rect.get_height()
-        plt.text(rect.get_x() + rect.get_width()/2.0, height, f'{height:.1f}', ha='center', va='bottom')
-        
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/figure_monthly_cp_revenue.png", dpi=300)
-    
-    # Fig 3: Annual Comparison
-    plt.figure(figsize=(8, 6))
-    scenarios = ['Low', 'Base', 'High']
-    values = [ann_low/1e6, ann_base/1e6, ann_high/1e6]
-    colors = ['gray', 'navy', 'red']
-    
-    plt.bar(scenarios, values, color=colors, alpha=0.8, width=0.5)
-    plt.title('Annual Capacity Revenue Scenarios', fontsize=14, fontweight='bold')
-    plt.ylabel('Annual Revenue (Million KRW)')
-    
-    for i, v in enumerate(values):
-        plt.text(i, v, f'{v:.1f} M', ha='center', va='bottom', fontweight='bold', fontsize=12)
-        
-    plt.ylim(0, max(values)*1.15)
-    plt.grid(True, axis='y', linestyle='--', alpha=0.6)
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/figure_annual_cp_comparison.png", dpi=300)
-    
-    print("Figures saved.")
+    if figures:
+        plot_figures(df_res, ann_low, ann_base, ann_high)
 
 if __name__ == "__main__":
-    analyze_revenue_monthly()
+    parser = argparse.ArgumentParser(description='Monthly capacity payment revenue from the monthly rate table.')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only write the CSV output (matplotlib/seaborn are never imported)')
+    args = parser.parse_args()
+    analyze_revenue_monthly(not args.no_figures)
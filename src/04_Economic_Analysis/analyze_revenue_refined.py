@@ -1,40 +1,96 @@
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame
+from common.dr_dispatch import add_dispatch_arguments, dispatch_config, event_values, schedule, solve
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-input_file = 'data/dr_events_1h.csv'
+input_file = 'data/dr_events_1h'
 output_dir = 'figures/06_Final_Report'
 output_csv = 'data/revenue_results_refined.csv'
 
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import os
-
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
+def plot_figures(res_df, df, shed_events, dispatched_40):
+    from common.plotting import plt, sns, save_figure
 
-input_file = 'data/dr_events_1h.csv'
-output_dir = 'figures/06_Final_Report'
-output_csv = 'data/revenue_results_refined.csv'
-
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
+    # --- Figure A: Revenue Sensitivity (for BaseRate=40k only for clarity) ---
+    plt.figure(figsize=(10, 6))
+    
+    subset = res_df[res_df['Base_Rate'] == 40000]
+    pivot = subset.pivot(index='Event_Hours', columns='Scenario', values='Total_Revenue')
+    
+    # Plot Lines
+    plt.plot(pivot.index, pivot['Base (P90 Cap)']/1e6, 'o-', linewidth=2.5, color='#1f77b4', label='Base (P90 Cap) @ 40k')
+    plt.plot(pivot.index, pivot['Conservative (Mean Cap)']/1e6, 's--', linewidth=2, color='#7f7f7f', label='Conservative (Mean Cap) @ 40k')
+    
+    # Add Range Shading (Min/Max BaseRate for Base Scenario)
+    # Filter for Base Scenario across all rates
+    base_scen = res_df[res_df['Scenario'] == 'Base (P90 Cap)']
+    min_rev = base_scen.groupby('Event_Hours')['Total_Revenue'].min() / 1e6
+    max_rev = base_scen.groupby('Event_Hours')['Total_Revenue'].max() / 1e6
+    
+    plt.fill_between(pivot.index, min_rev, max_rev, color='#1f77b4', alpha=0.1, label='Base Rate Range (35k-45k)')
+    
+    plt.title('Annual DR Revenue Sensitivity (Optimal Dispatch Energy, Seasonal Cap)', fontsize=14, fontweight='bold')
+    plt.xlabel('Annual Event Hours (h)')
+    plt.ylabel('Total Revenue (Million KRW)')
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.legend()
+    plt.tight_layout()
+    save_figure(f"{output_dir}/figure_revenue_sensitivity_refined.png")
+    print(f"Saved {output_dir}/figure_revenue_sensitivity_refined.png")
+    
+    # --- Figure B: SMP Distribution (All vs Event vs 40h Dispatch) ---
+    plt.figure(figsize=(8, 6))
+    
+    data_all = df['SMP_hourly']
+    data_event = shed_events['SMP_hourly']
+    
+    # Optimal 40-hour dispatch - Represents "Realized Events"
+    data_dispatch = df.loc[dispatched_40, 'SMP_hourly']
+    
+    # Create DF for Boxplot
+    plot_data = pd.DataFrame({
+        'SMP': pd.concat([data_all, data_event, data_dispatch]),
+        'Group': ['All Hours'] * len(data_all) + 
+                 ['Potential Events'] * len(data_event) + 
+                 ['40h Dispatch'] * len(data_dispatch)
+    })
+    
+    sns.boxplot(x='Group', y='SMP', data=plot_data, palette=['lightgray', 'salmon', 'red'], width=0.5)
+    plt.title('SMP Distribution: Potential vs Actual Despatch Comparison', fontsize=14, fontweight='bold')
+    plt.ylabel('System Marginal Price (KRW/kWh)')
+    plt.grid(True, axis='y', linestyle='--', alpha=0.5)
+    
+    # Add text for Means
+    means = plot_data.groupby('Group')['SMP'].mean()
+    # Order: All, Potential, 40h Dispatch
+    # Map index to x-coord: All=0, Pot=1, Dispatch=2
+    # But groupby sorts alphabetically? No, order depends on data.
+    # Let's verify labels manually or just trust the plot order? 
+    # Boxplot order is strictly alphabetical unless specified.
+    # Specify order:
+    order_list = ['All Hours', 'Potential Events', '40h Dispatch']
+    
+    # Clear and redo with order
+    plt.clf()
+    sns.boxplot(x='Group', y='SMP', data=plot_data, order=order_list, palette=['lightgray', 'salmon', 'orangered'], width=0.5)
+    plt.title('SMP Distribution: Potential vs Actual Despatch Comparison', fontsize=14, fontweight='bold')
+    plt.ylabel('System Marginal Price (KRW/kWh)')
+    plt.grid(True, axis='y', linestyle='--', alpha=0.5)
+    
+    plt.tight_layout()
+    save_figure(f"{output_dir}/figure_smp_distribution_check.png")
+    print(f"Saved {output_dir}/figure_smp_distribution_check.png")
 
-def analyze_revenue_refined():
+def analyze_revenue_refined(figures=True, dispatch=None):
     print("Loading Standardized DR Events...")
-    df = pd.read_csv(input_file, parse_dates=['datetime'], index_col='datetime')
+    df = load_frame(input_file, columns=['season', 'is_event_shed', 'is_event_up', 'Q_shed_kW', 'E_shed_kWh',
+                                         'Q_ESS_shed_kW', 'SMP_hourly'])
     
     # 1. Safe Copy
     shed_events = df[df['is_event_shed']].copy()
@@ -43,12 +99,13 @@ def analyze_revenue_refined():
     print(f"Total Shed Events: {len(shed_events)}")
     print(f"Total Up Events:   {len(up_events)}")
     
-    # Pre-calculate Revenue Potential per Hour (for Top-N sorting)
-    # Energy Revenue = E(kWh) * SMP
-    if not shed_events.empty:
-        shed_events['rev_per_hour'] = shed_events['E_shed_kWh'] * shed_events['SMP_hourly']
-    else:
-        shed_events['rev_per_hour'] = 0
+    # Energy Revenue = E(kWh) * SMP of the dispatched hours: the revenue-maximizing
+    # schedule under the daily event / event length limits (common/dr_dispatch.py),
+    # solved once for every annual event-hour budget
+    event_hours_range = [0, 10, 20, 30, 40, 50, 60]
+    dispatch = dispatch or {}
+    value, ess_value = event_values(df, ess_limited=dispatch.get('ess_hours') is not None)
+    solution = solve(df.index, value, ess_value, df['is_event_shed'], max_hours=max(event_hours_range), **dispatch)
         
     # ==========================================
     # 2. Capacity Calculation (Seasonal Approach)
@@ -61,7 +118,7 @@ def analyze_revenue_refined():
         cap_mean = 0
     else:
         # Group by season
-        seasonal_stats = shed_events.groupby('season')['Q_shed_kW'].agg(['mean', lambda x: x.quantile(0.90)])
+        seasonal_stats = shed_events.groupby('season', observed=True)['Q_shed_kW'].agg(['mean', lambda x: x.quantile(0.90)])
         seasonal_stats.columns = ['Mean', 'P90']
         
         print("  Seasonal Stats:\n", seasonal_stats)
@@ -78,21 +135,17 @@ def analyze_revenue_refined():
     # 3. Revenue Scenarios (Loops)
     # ==========================================
     base_rate_range = [35000, 40000, 45000]
-    event_hours_range = [0, 10, 20, 30, 40, 50, 60]
     
     results = []
     
-    print("\n[2] Generating Scenarios (Top-N Energy + BaseRate Loop)...")
+    print("\n[2] Generating Scenarios (Optimal Dispatch Energy + BaseRate Loop)...")
     
     for base_rate in base_rate_range:
         for hrs in event_hours_range:
             
-            # --- Energy Revenue (Top-N) ---
-            # Sum of 'rev_per_hour' for the top 'hrs' events
-            if hrs > 0 and not shed_events.empty:
-                rev_en_shed = shed_events['rev_per_hour'].nlargest(hrs).sum()
-            else:
-                rev_en_shed = 0
+            # --- Energy Revenue (Optimal Dispatch) ---
+            # Best revenue with at most 'hrs' event hours
+            rev_en_shed = solution['revenue'][0, hrs]
                 
             rev_en_up = 0 # Explicitly 0 as requested for now
             
@@ -122,7 +175,7 @@ def analyze_revenue_refined():
                 'Scenario': 'Conservative (Mean Cap)',
                 'Capacity_KW': cap_mean,
                 'Revenue_Cap_Shed': rev_cap_cons,
-                'Revenue_En_Shed': rev_en_shed, # Energy rev assumes same Top-N performance
+                'Revenue_En_Shed': rev_en_shed, # Energy rev assumes the same dispatch
                 'Revenue_En_Up': rev_en_up,
                 'Total_Revenue': rev_cap_cons + rev_en_shed + rev_en_up
             })
@@ -131,84 +184,19 @@ def analyze_revenue_refined():
     res_df.to_csv(output_csv, index=False)
     print(res_df.head())
     
-    # ==========================================
     # 4. Figures
-    # ==========================================
-    
-    # --- Figure A: Revenue Sensitivity (for BaseRate=40k only for clarity) ---
-    plt.figure(figsize=(10, 6))
-    
-    subset = res_df[res_df['Base_Rate'] == 40000]
-    pivot = subset.pivot(index='Event_Hours', columns='Scenario', values='Total_Revenue')
-    
-    # Plot Lines
-    plt.plot(pivot.index, pivot['Base (P90 Cap)']/1e6, 'o-', linewidth=2.5, color='#1f77b4', label='Base (P90 Cap) @ 40k')
-    plt.plot(pivot.index, pivot['Conservative (Mean Cap)']/1e6, 's--', linewidth=2, color='#7f7f7f', label='Conservative (Mean Cap) @ 40k')
-    
-    # Add Range Shading (Min/Max BaseRate for Base Scenario)
-    # Filter for Base Scenario across all rates
-    base_scen = res_df[res_df['Scenario'] == 'Base (P90 Cap)']
-    min_rev = base_scen.groupby('Event_Hours')['Total_Revenue'].min() / 1e6
-    max_rev = base_scen.groupby('Event_Hours')['Total_Revenue'].max() / 1e6
-    
-    plt.fill_between(pivot.index, min_rev, max_rev, color='#1f77b4', alpha=0.1, label='Base Rate Range (35k-45k)')
-    
-    plt.title('Annual DR Revenue Sensitivity (Top-N Energy, Seasonal Cap)', fontsize=14, fontweight='bold')
-    plt.xlabel('Annual Event Hours (h)')
-    plt.ylabel('Total Revenue (Million KRW)')
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/figure_revenue_sensitivity_refined.png", dpi=300)
-    print(f"Saved {output_dir}/figure_revenue_sensitivity_refined.png")
-    
-    # --- Figure B: SMP Distribution (All vs Event vs Top-40) ---
-    plt.figure(figsize=(8, 6))
-    
-    data_all = df['SMP_hourly']
-    data_event = shed_events['SMP_hourly']
-    
-    # Top 40 Events (by Revenue Potential) - Represents "Realized Events"
-    if not shed_events.empty:
-        top_40_idx = shed_events.nlargest(40, 'rev_per_hour').index
-        data_top40 = df.loc[top_40_idx, 'SMP_hourly']
-    else:
-        data_top40 = pd.Series([], dtype=float)
-    
-    # Create DF for Boxplot
-    plot_data = pd.DataFrame({
-        'SMP': pd.concat([data_all, data_event, data_top40]),
-        'Group': ['All Hours'] * len(data_all) + 
-                 ['Potential Events'] * len(data_event) + 
-                 ['Top 40 Despatch'] * len(data_top40)
-    })
-    
-    sns.boxplot(x='Group', y='SMP', data=plot_data, palette=['lightgray', 'salmon', 'red'], width=0.5)
-    plt.title('SMP Distribution: Potential vs Actual Despatch Comparison', fontsize=14, fontweight='bold')
-    plt.ylabel('System Marginal Price (KRW/kWh)')
-    plt.grid(True, axis='y', linestyle='--', alpha=0.5)
-    
-    # Add text for Means
-    means = plot_data.groupby('Group')['SMP'].mean()
-    # Order: All, Potential, Top 40
-    # Map index to x-coord: All=0, Pot=1, Top=2
-    # But groupby sorts alphabetically? No, order depends on data.
-    # Let's verify labels manually or just trust the plot order? 
-    # Boxplot order is strictly alphabetical unless specified.
-    # Specify order:
-    order_list = ['All Hours', 'Potential Events', 'Top 40 Despatch']
-    
-    # Clear and redo with order
-    plt.clf()
-    sns.boxplot(x='Group', y='SMP', data=plot_data, order=order_list, palette=['lightgray', 'salmon', 'orangered'], width=0.5)
-    plt.title('SMP Distribution: Potential vs Actual Despatch Comparison', fontsize=14, fontweight='bold')
-    plt.ylabel('System Marginal Price (KRW/kWh)')
-    plt.grid(True, axis='y', linestyle='--', alpha=0.5)
-    
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/figure_smp_distribution_check.png", dpi=300)
-    print(f"Saved {output_dir}/figure_smp_distribution_check.png")
+    if figures:
+        plot_figures(res_df, df, shed_events, schedule(solution, 40))
 
 if __name__ == "__main__":
-    analyze_revenue_refined()
+    parser = argparse.ArgumentParser(description='Refined DR revenue: seasonal capacity and optimally dispatched energy payments.')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only write the CSV output (matplotlib/seaborn are never imported)')
+    add_dispatch_arguments(parser)
+    args = parser.parse_args()
+    try:
+        dispatch = dispatch_config(args)
+    except ValueError as e:
+        parser.error(str(e))
+    analyze_revenue_refined(not args.no_figures, dispatch)
 
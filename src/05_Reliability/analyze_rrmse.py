@@ -1,14 +1,12 @@
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame
 
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-input_file = 'data/dr_events_1h.csv'
+input_file = 'data/dr_events_1h'
 output_dir = 'figures/06_Final_Report'
 output_csv = 'data/reliability_metrics.csv'
 
@@ -55,9 +53,32 @@ def calculate_metrics(A_t, C_t, name="Metric"):
         'Expected_Shortfall_kW': expected_shortfall
     }
 
-def analyze_rrmse():
+def plot_distribution(total_resource):
+    from common.plotting import plt, sns, save_figure
+
+    # Plot Total Resource Actual vs Global P90
+    plt.figure(figsize=(10, 6))
+    
+    # Plot Histogram of Actual Capacity
+    sns.histplot(total_resource, bins=30, kde=True, color='skyblue', label='Actual Capacity (A_t)')
+    
+    # Plot Committment Line (Global P90)
+    C_global = total_resource.quantile(0.90)
+    plt.axvline(C_global, color='red', linestyle='--', linewidth=2, label=f'Committed (P90): {C_global:.1f} kW')
+    
+    plt.title('Reliability Check: Actual Capacity vs Committed (Total Resource)', fontsize=14, fontweight='bold')
+    plt.xlabel('Available Capacity (kW)')
+    plt.ylabel('Frequency (Event Hours)')
+    plt.legend()
+    plt.grid(True, linestyle='--', alpha=0.6)
+    
+    fig_path = f"{output_dir}/figure_reliability_distribution.png"
+    save_figure(fig_path)
+    print(f"Saved {fig_path}")
+
+def analyze_rrmse(figures=True):
     print("Loading DR Events...")
-    df = pd.read_csv(input_file, parse_dates=['datetime'], index_col='datetime')
+    df = load_frame(input_file, columns=['season', 'is_event_shed', 'Q_shed_kW', 'Q_ESS_shed_kW'])
     
     # Add weekday info
     df['weekday'] = df.index.weekday
@@ -74,11 +95,11 @@ def analyze_rrmse():
 
     # --- Analysis Targets ---
     # 1. Total Resource (A_t = Q_shed_kW)
-    # 2. No-ESS Resource (A_t = Q_shed_kW - 1250)
+    # 2. No-ESS Resource (A_t = Q_shed_kW - ESS dispatch of the hour)
     
     targets = {
         'Total_Resource': events['Q_shed_kW'],
-        'No_ESS_Resource': events['Q_shed_kW'] - 1250.0
+        'No_ESS_Resource': events['Q_shed_kW'] - events['Q_ESS_shed_kW']
     }
     
     metrics_list = []
@@ -94,8 +115,8 @@ def analyze_rrmse():
         
         # Scenario 2: Seasonal P90
         # Calculate P90 per season, then map back to events
-        season_p90_map = A_t.groupby(events['season']).quantile(0.90)
-        C_seasonal = events['season'].map(season_p90_map)
+        season_p90_map = A_t.groupby(events['season'], observed=True).quantile(0.90)
+        C_seasonal = events['season'].astype(str).map(season_p90_map)
         
         m2 = calculate_metrics(A_t, C_seasonal, f"{label}_Seasonal_P90")
         metrics_list.append(m2)
@@ -109,25 +130,12 @@ def analyze_rrmse():
     print(df_metrics[['Description', 'RRMSE', 'Prob_Shortfall_Strict', 'Prob_Shortfall_Tol_5%']])
     
     # --- Figures: Distribution ---
-    # Plot Total Resource Actual vs Global P90
-    plt.figure(figsize=(10, 6))
-    
-    # Plot Histogram of Actual Capacity
-    sns.histplot(targets['Total_Resource'], bins=30, kde=True, color='skyblue', label='Actual Capacity (A_t)')
-    
-    # Plot Committment Line (Global P90)
-    C_global = targets['Total_Resource'].quantile(0.90)
-    plt.axvline(C_global, color='red', linestyle='--', linewidth=2, label=f'Committed (P90): {C_global:.1f} kW')
-    
-    plt.title('Reliability Check: Actual Capacity vs Committed (Total Resource)', fontsize=14, fontweight='bold')
-    plt.xlabel('Available Capacity (kW)')
-    plt.ylabel('Frequency (Event Hours)')
-    plt.legend()
-    plt.grid(True, linestyle='--', alpha=0.6)
-    
-    fig_path = f"{output_dir}/figure_reliability_distribution.png"
-    plt.savefig(fig_path, dpi=300)
-    print(f"Saved {fig_path}")
+    if figures:
+        plot_distribution(targets['Total_Resource'])
 
 if __name__ == "__main__":
-    analyze_rrmse()
+    parser = argparse.ArgumentParser(description='RRMSE and shortfall probability of the committed DR capacity.')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only write the CSV output (matplotlib/seaborn are never imported)')
+    args = parser.parse_args()
+    analyze_rrmse(not args.no_figures)
@@ -1,12 +1,9 @@
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
 output_dir = 'figures/06_Final_Report'
 output_csv = 'data/dcf_30y_projection.csv'
@@ -62,7 +59,59 @@ def calculate_irr(cf_stream):
         pass
     return np.nan
 
-def analyze_dcf():
+def plot_figures(df, payback_years):
+    from common.plotting import plt, save_figure
+
+    # Fig 1: Cash Flow Waterfall / Bar & Line
+    plt.figure(figsize=(12, 6))
+    
+    years_arr = df['Year']
+    
+    # Plot Net Cash Flow Bars
+    # Color: Blue for positive, Red for negative
+    colors = ['firebrick' if cf < 0 else 'forestgreen' for cf in df['CF_Net']]
+    plt.bar(years_arr, df['CF_Net']/1e6, color=colors, alpha=0.6, label='Net Cash Flow')
+    
+    # Plot Cumulative Discounted CF Line
+    plt.plot(years_arr, df['Cumulative_DCF']/1e6, color='navy', linewidth=2.5, marker='o', markersize=4, label='Cumulative Discounted CF')
+    
+    plt.axhline(0, color='black', linewidth=0.8)
+    plt.title('30-Year Cash Flow Projection & Break-even', fontsize=14, fontweight='bold')
+    plt.xlabel('Year')
+    plt.ylabel('Amount (Million KRW)')
+    plt.legend()
+    plt.grid(True, linestyle='--', alpha=0.6)
+    
+    # Mark payback
+    if not np.isnan(payback_years):
+        plt.axvline(payback_years, color='orange', linestyle='--', alpha=0.8)
+        plt.text(payback_years+0.5, df['Cumulative_DCF'].max()/1e6 * 0.5, f'Payback: Year {payback_years}', color='orange', fontweight='bold')
+        
+    plt.tight_layout()
+    save_figure(f"{output_dir}/figure_dcf_cashflow.png")
+    
+    # Fig 2: Revenue Composition Area Chart
+    # Stacked Area: Cap vs En
+    plt.figure(figsize=(10, 6))
+    
+    # Only years 1-30
+    df_op = df[df['Year'] >= 1]
+    x = df_op['Year']
+    
+    plt.stackplot(x, df_op['Rev_Cap']/1e6, df_op['Rev_En']/1e6, labels=['Capacity Revenue', 'Energy Revenue'], colors=['#1f77b4', '#ff7f0e'], alpha=0.8)
+    
+    plt.title('Projected Annual Revenue Composition (30 Years)', fontsize=14, fontweight='bold')
+    plt.xlabel('Year')
+    plt.ylabel('Revenue (Million KRW)')
+    plt.legend(loc='upper left')
+    plt.grid(True, linestyle='--', alpha=0.6)
+    
+    plt.tight_layout()
+    save_figure(f"{output_dir}/figure_dcf_revenue_composition.png")
+    
+    print("Figures saved.")
+
+def analyze_dcf(figures=True):
     print("Starting DCF Analysis (30 Years)...")
     
     # --- 2. Cash Flow Projection ---
@@ -170,55 +219,12 @@ def analyze_dcf():
     summary.to_csv(output_summary_csv, index=False)
     
     # --- 4. Figures ---
-    
-    # Fig 1: Cash Flow Waterfall / Bar & Line
-    plt.figure(figsize=(12, 6))
-    
-    years_arr = df['Year']
-    
-    # Plot Net Cash Flow Bars
-    # Color: Blue for positive, Red for negative
-    colors = ['firebrick' if cf < 0 else 'forestgreen' for cf in df['CF_Net']]
-    plt.bar(years_arr, df['CF_Net']/1e6, color=colors, alpha=0.6, label='Net Cash Flow')
-    
-    # Plot Cumulative Discounted CF Line
-    plt.plot(years_arr, df['Cumulative_DCF']/1e6, color='navy', linewidth=2.5, marker='o', markersize=4, label='Cumulative Discounted CF')
-    
-    plt.axhline(0, color='black', linewidth=0.8)
-    plt.title('30-Year Cash Flow Projection & Break-even', fontsize=14, fontweight='bold')
-    plt.xlabel('Year')
-    plt.ylabel('Amount (Million KRW)')
-    plt.legend()
-    plt.grid(True, linestyle='--', alpha=0.6)
-    
-    # Mark payback
-    if not np.isnan(payback_years):
-        plt.axvline(payback_years, color='orange', linestyle='--', alpha=0.8)
-        plt.text(payback_years+0.5, df['Cumulative_DCF'].max()/1e6 * 0.5, f'Payback: Year {payback_years}', color='orange', fontweight='bold')
-        
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/figure_dcf_cashflow.png", dpi=300)
-    
-    # Fig 2: Revenue Composition Area Chart
-    # Stacked Area: Cap vs En
-    plt.figure(figsize=(10, 6))
-    
-    # Only years 1-30
-    df_op = df[df['Year'] >= 1]
-    x = df_op['Year']
-    
-    plt.stackplot(x, df_op['Rev_Cap']/1e6, df_op['Rev_En']/1e6, labels=['Capacity Revenue', 'Energy Revenue'], colors=['#1f77b4', '#ff7f0e'], alpha=0.8)
-    
-    plt.title('Projected Annual Revenue Composition (30 Years)', fontsize=14, fontweight='bold')
-    plt.xlabel('Year')
-    plt.ylabel('Revenue (Million KRW)')
-    plt.legend(loc='upper left')
-    plt.grid(True, linestyle='--', alpha=0.6)
-    
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/figure_dcf_revenue_composition.png", dpi=300)
-    
-    print("Figures saved.")
+    if figures:
+        plot_figures(df, payback_years)
 
 if __name__ == "__main__":
-    analyze_dcf()
+    parser = argparse.ArgumentParser(description='30-year DCF projection (NPV, IRR, discounted payback).')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only write the CSV outputs (matplotlib/seaborn are never imported)')
+    args = parser.parse_args()
+    analyze_dcf(not args.no_figures)
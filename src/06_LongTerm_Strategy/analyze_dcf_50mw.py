@@ -1,12 +1,9 @@
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
 output_dir = 'figures/06_Final_Report'
 output_csv = 'data/dcf_30y_projection_50mw.csv'
@@ -49,7 +46,33 @@ g_cap = 0.02
 g_en  = -0.01
 fee_aggregator = 0.10
 
-def analyze_dcf_50mw():
+def plot_cashflow(df, payback_years):
+    from common.plotting import plt, save_figure
+
+    # Cash Flow Plot (50MW)
+    plt.figure(figsize=(12, 6))
+    years_arr = df['Year']
+    
+    colors = ['firebrick' if cf < 0 else 'forestgreen' for cf in df['CF_Net']]
+    plt.bar(years_arr, df['CF_Net']/1e8, color=colors, alpha=0.6, label='Net Cash Flow')
+    plt.plot(years_arr, df['Cumulative_DCF']/1e8, color='navy', linewidth=2.5, marker='o', markersize=4, label='Cumulative Discounted CF')
+    
+    plt.axhline(0, color='black', linewidth=0.8)
+    plt.title('30-Year Cash Flow Projection (50MW Hyperscale)', fontsize=14, fontweight='bold')
+    plt.xlabel('Year')
+    plt.ylabel('Amount (100 Million KRW)') # Unit adjusted to 'Eok'
+    plt.legend()
+    plt.grid(True, linestyle='--', alpha=0.6)
+    
+    if not np.isnan(payback_years):
+        plt.axvline(payback_years, color='orange', linestyle='--', alpha=0.8)
+        plt.text(payback_years+0.5, df['Cumulative_DCF'].max()/1e8 * 0.5, f'Payback: Year {payback_years}', color='orange', fontweight='bold')
+        
+    plt.tight_layout()
+    save_figure(f"{output_dir}/figure_dcf_cashflow_50mw.png")
+    print("Figures saved.")
+
+def analyze_dcf_50mw(figures=True):
     print(f"Starting DCF Analysis (50MW Scale-up)...")
     print(f"  Scale Factor (Load): {scale_load:.2f}x")
     print(f"  Scale Factor (ESS):  {ess_scale:.2f}x")
@@ -134,28 +157,12 @@ def analyze_dcf_50mw():
     df.to_csv(output_csv, index=False)
     
     # --- 4. Figures ---
-    # Cash Flow Plot (50MW)
-    plt.figure(figsize=(12, 6))
-    years_arr = df['Year']
-    
-    colors = ['firebrick' if cf < 0 else 'forestgreen' for cf in df['CF_Net']]
-    plt.bar(years_arr, df['CF_Net']/1e8, color=colors, alpha=0.6, label='Net Cash Flow')
-    plt.plot(years_arr, df['Cumulative_DCF']/1e8, color='navy', linewidth=2.5, marker='o', markersize=4, label='Cumulative Discounted CF')
-    
-    plt.axhline(0, color='black', linewidth=0.8)
-    plt.title('30-Year Cash Flow Projection (50MW Hyperscale)', fontsize=14, fontweight='bold')
-    plt.xlabel('Year')
-    plt.ylabel('Amount (100 Million KRW)') # Unit adjusted to 'Eok'
-    plt.legend()
-    plt.grid(True, linestyle='--', alpha=0.6)
-    
-    if not np.isnan(payback_years):
-        plt.axvline(payback_years, color='orange', linestyle='--', alpha=0.8)
-        plt.text(payback_years+0.5, df['Cumulative_DCF'].max()/1e8 * 0.5, f'Payback: Year {payback_years}', color='orange', fontweight='bold')
-        
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/figure_dcf_cashflow_50mw.png", dpi=300)
-    print("Figures saved.")
+    if figures:
+        plot_cashflow(df, payback_years)
 
 if __name__ == "__main__":
-    analyze_dcf_50mw()
+    parser = argparse.ArgumentParser(description='30-year DCF projection for the 50 MW hyperscale case.')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only write the CSV output (matplotlib/seaborn are never imported)')
+    args = parser.parse_args()
+    analyze_dcf_50mw(not args.no_figures)
@@ -1,12 +1,9 @@
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-
-# Set style
-sns.set_theme(style="whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
 output_dir = 'figures/06_Final_Report'
 output_csv = 'data/dcf_sensitivity_results.csv'
@@ -87,7 +84,74 @@ def calculate_dcf_npv(params):
         
     return npv
 
-def analyze_sensitivity():
+def plot_tornado(df, base_npv):
+    from common.plotting import plt, save_figure
+
+    plt.figure(figsize=(10, 8))
+    
+    # Center line = Base NPV
+    base_line = base_npv
+    
+    y = np.arange(len(df))
+    
+    # For each var, define 'Left' bar and 'Right' bar relative to Base
+    # Left Bar: Min(NPV) to Base
+    # Right Bar: Base to Max(NPV)
+    # Color logic: 
+    # If High Input gives High NPV -> Positive Corr (Blue High, Red Low)
+    # If High Input gives Low NPV -> Negative Corr (Red High, Blue Low)
+    
+    for i, row in df.iterrows():
+        # Identify Low/High Input NPVs
+        val_low = row['NPV_Low_Input'] # Result of Low Input
+        val_high = row['NPV_High_Input'] # Result of High Input
+        
+        # Standardize for color/side:
+        # Left Bar: Min -> Base
+        # Right Bar: Base -> Max
+        min_v = min(val_low, val_high)
+        max_v = max(val_low, val_high)
+        
+        # Determine labels
+        # If High Input gave Max NPV (Positive Corr): Right=HighLbl, Left=LowLbl
+        # If High Input gave Min NPV (Negative Corr): Right=LowLbl, Left=HighLbl
+        
+        if val_high > val_low: # Positive Corr
+            right_lbl = row['High_Label']
+            left_lbl  = row['Low_Label']
+        else: # Negative Corr (e.g. Cost)
+            right_lbl = row['Low_Label'] # Low Input (Low Cost) -> High NPV
+            left_lbl  = row['High_Label'] # High Input (High Cost) -> Low NPV
+            
+        # Draw Bars
+        # Left (Red-ish usually for downside, but here let's use colors for Input Type?)
+        # Convention: Tornado often colored by sensitivity or unified.
+        # Let's use: Blue for "Result > Base", Red for "Result < Base"
+        
+        # Left Bar (Min to Base) - Result < Base (Red)
+        plt.barh(i, base_line - min_v, left=min_v, color='salmon', alpha=0.9)
+        plt.text(min_v - 2e6, i, left_lbl, ha='right', va='center', fontsize=9)
+        
+        # Right Bar (Base to Max) - Result > Base (Blue)
+        plt.barh(i, max_v - base_line, left=base_line, color='skyblue', alpha=0.9)
+        plt.text(max_v + 2e6, i, right_lbl, ha='left', va='center', fontsize=9)
+            
+    plt.yticks(y, df['Variable'])
+    plt.axvline(base_line, color='black', linestyle='--', linewidth=1)
+    
+    # Label Base NPV line
+    plt.text(base_line, len(df)-0.5, f'Base NPV: {base_line/1e6:,.1f}M', ha='center', va='bottom', fontweight='bold')
+    
+    plt.xlabel('NPV (KRW)')
+    plt.title('Tornado Analysis: NPV Sensitivity (30y DCF)', fontsize=14, fontweight='bold')
+    
+    # Format X axis millions
+    plt.grid(True, linestyle='--', alpha=0.5)
+    plt.tight_layout()
+    save_figure(f"{output_dir}/figure_dcf_tornado.png")
+    print("Saved Tornado Chart.")
+
+def analyze_sensitivity(figures=True):
     print("Starting Sensitivity Analysis (OAT - 9 Drivers)...")
     
     # Define Variables (Label, ParamKey, Low, Base, High, LowLabel, HighLabel)
@@ -162,69 +226,12 @@ def analyze_sensitivity():
     print(df.sort_values('Range_Width', ascending=False)[['Variable', 'Range_Width']].head())
     
     # --- Tornado Chart ---
-    plt.figure(figsize=(10, 8))
-    
-    # Center line = Base NPV
-    base_line = base_npv
-    
-    y = np.arange(len(df))
-    
-    # For each var, define 'Left' bar and 'Right' bar relative to Base
-    # Left Bar: Min(NPV) to Base
-    # Right Bar: Base to Max(NPV)
-    # Color logic: 
-    # If High Input gives High NPV -> Positive Corr (Blue High, Red Low)
-    # If High Input gives Low NPV -> Negative Corr (Red High, Blue Low)
-    
-    for i, row in df.iterrows():
-        # Identify Low/High Input NPVs
-        val_low = row['NPV_Low_Input'] # Result of Low Input
-        val_high = row['NPV_High_Input'] # Result of High Input
-        
-        # Standardize for color/side:
-        # Left Bar: Min -> Base
-        # Right Bar: Base -> Max
-        min_v = min(val_low, val_high)
-        max_v = max(val_low, val_high)
-        
-        # Determine labels
-        # If High Input gave Max NPV (Positive Corr): Right=HighLbl, Left=LowLbl
-        # If High Input gave Min NPV (Negative Corr): Right=LowLbl, Left=HighLbl
-        
-        if val_high > val_low: # Positive Corr
-            right_lbl = row['High_Label']
-            left_lbl  = row['Low_Label']
-        else: # Negative Corr (e.g. Cost)
-            right_lbl = row['Low_Label'] # Low Input (Low Cost) -> High NPV
-            left_lbl  = row['High_Label'] # High Input (High Cost) -> Low NPV
-            
-        # Draw Bars
-        # Left (Red-ish usually for downside, but here let's use colors for Input Type?)
-        # Convention: Tornado often colored by sensitivity or unified.
-        # Let's use: Blue for "Result > Base", Red for "Result < Base"
-        
-        # Left Bar (Min to Base) - Result < Base (Red)
-        plt.barh(i, base_line - min_v, left=min_v, color='salmon', alpha=0.9)
-        plt.text(min_v - 2e6, i, left_lbl, ha='right', va='center', fontsize=9)
-        
-        # Right Bar (Base to Max) - Result > Base (Blue)
-        plt.barh(i, max_v - base_line, left=base_line, color='skyblue', alpha=0.9)
-        plt.text(max_v + 2e6, i, right_lbl, ha='left', va='center', fontsize=9)
-            
-    plt.yticks(y, df['Variable'])
-    plt.axvline(base_line, color='black', linestyle='--', linewidth=1)
-    
-    # Label Base NPV line
-    plt.text(base_line, len(df)-0.5, f'Base NPV: {base_line/1e6:,.1f}M', ha='center', va='bottom', fontweight='bold')
-    
-    plt.xlabel('NPV (KRW)')
-    plt.title('Tornado Analysis: NPV Sensitivity (30y DCF)', fontsize=14, fontweight='bold')
-    
-    # Format X axis millions
-    plt.grid(True, linestyle='--', alpha=0.5)
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/figure_dcf_tornado.png", dpi=300)
-    print("Saved Tornado Chart.")
+    if figures:
+        plot_tornado(df, base_npv)
 
 if __name__ == "__main__":
-    analyze_sensitivity()
+    parser = argparse.ArgumentParser(description='One-at-a-time NPV sensitivity of the 30-year DCF (tornado chart).')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Only write the CSV output (matplotlib/seaborn are never imported)')
+    args = parser.parse_args()
+    analyze_sensitivity(not args.no_figures)
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark: DR window masks built with per-season df.loc/isin assignments
+(the old simulate_dr.py) vs. one table gather for a stack of policies
+(common.dr_windows.window_masks).
+
+    python src/common/bench_dr_windows.py                    # 10, 100, 1000 random policies
+    python src/common/bench_dr_windows.py --policies 500 --repeat 5
+
+Candidate policies are random weekday shed/up hours per season; every policy
+is scored by its number of shed and up intervals over one year of 15-min data.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.dr_windows import (SEASONS, KINDS, HOURS, calendar_codes, policy_table, season_of,
+                               window_masks)
+
+def random_windows(rng, p_hour=0.1):
+    """A random policy: every (season, kind, hour) is in the window with probability p_hour."""
+    return {season: {kind: list(np.flatnonzero(rng.random(HOURS) < p_hour)) for kind in KINDS}
+            for season in SEASONS}
+
+def via_loc(index, windows_list):
+    """Old path: pandas masks per season and kind, one policy at a time."""
+    df = pd.DataFrame(index=index)
+    df['hour'] = index.hour
+    df['season'] = season_of(index)
+    is_weekday = index.weekday < 5
+    shed, up = [], []
+    for windows in windows_list:
+        df['mask_shed'] = False
+        df['mask_up'] = False
+        for season, kinds in windows.items():
+            mask_season = (df['season'] == season) & is_weekday
+            df.loc[mask_season & df['hour'].isin(kinds['shed']), 'mask_shed'] = True
+            df.loc[mask_season & df['hour'].isin(kinds['up']), 'mask_up'] = True
+        df.loc[df['mask_shed'] & df['mask_up'], 'mask_up'] = False
+        shed.append(df['mask_shed'].sum())
+        up.append(df['mask_up'].sum())
+    return np.array(shed), np.array(up)
+
+def via_table(index, windows_list):
+    """Table path: stack the policies and gather all masks at once."""
+    tables = np.stack([policy_table(windows) for windows in windows_list])
+    shed, up = window_masks(tables, calendar_codes(index))
+    return shed.sum(axis=1), up.sum(axis=1)
+
+def best_of(func, index, windows_list, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(index, windows_list)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark DR window mask construction for many policies.')
+    parser.add_argument('--policies', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    index = pd.date_range('2024-06-01 00:15', '2025-06-01 00:00', freq='15min')
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{len(index):,} intervals")
+    print(f"{'policies':>9} {'loc [s]':>9} {'table [s]':>10} {'policies/s':>11} {'speedup':>8}")
+    for n in args.policies:
+        windows_list = [random_windows(rng) for _ in range(n)]
+        t_table, fast = best_of(via_table, index, windows_list, args.repeat)
+        t_loc, slow = best_of(via_loc, index, windows_list, 1 if n > 100 else args.repeat)
+        assert all((a == b).all() for a, b in zip(slow, fast)), "Results differ"
+        print(f"{n:>9,} {t_loc:>9.3f} {t_table:>10.4f} {n / t_table:>11,.0f} {t_loc / t_table:>7.1f}x")
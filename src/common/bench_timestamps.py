@@ -0,0 +1,68 @@
+"""
+Micro-benchmark: string/zfill + pd.to_datetime vs. common.timestamps.build_datetime.
+
+    python src/common/bench_timestamps.py                  # 1M and 100M rows
+    python src/common/bench_timestamps.py --rows 1000000 --repeat 5
+
+At 100M rows the integer path needs ~6 GB of memory and the string path several
+times that; use --max-string-rows to skip the string path above a size.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.timestamps import build_datetime
+
+def make_columns(n_rows, start='2024-06-01'):
+    """Consecutive 15-min intervals as int32 date/hour/minute columns."""
+    n_days = -(-n_rows // 96)
+    days = pd.date_range(start, periods=n_days, freq='D')
+    dates = (days.year * 10000 + days.month * 100 + days.day).values.astype(np.int32)
+    slots = np.arange(96, dtype=np.int32)
+    return pd.DataFrame({'date': np.repeat(dates, 96)[:n_rows],
+                         'hour': np.tile(slots // 4, n_days)[:n_rows],
+                         'minute': np.tile(slots % 4 * 15, n_days)[:n_rows]})
+
+def via_strings(df):
+    return pd.to_datetime(df['date'].astype(str) + ' ' +
+                          df['hour'].astype(str).str.zfill(2) + ':' +
+                          df['minute'].astype(str).str.zfill(2))
+
+def via_integers(df):
+    return build_datetime(df['date'], df['hour'], df['minute'])
+
+def best_of(func, df, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark datetime construction from date/hour/minute.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 100_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-string-rows', type=int, default=None,
+                        help='Skip the string path for larger inputs')
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'strings [s]':>12} {'integers [s]':>13} {'speedup':>8}")
+    for n_rows in args.rows:
+        df = make_columns(n_rows)
+        t_int, fast = best_of(via_integers, df, args.repeat)
+
+        if args.max_string_rows is not None and n_rows > args.max_string_rows:
+            print(f"{n_rows:>12,} {'skipped':>12} {t_int:>13.3f} {'-':>8}")
+            continue
+
+        # The string path is slow enough that one run is representative
+        t_str, slow = best_of(via_strings, df, 1 if n_rows > 10_000_000 else args.repeat)
+        assert (slow.values == fast).all(), "Results differ"
+        print(f"{n_rows:>12,} {t_str:>12.3f} {t_int:>13.3f} {t_str / t_int:>7.1f}x")
+        del df, fast, slow
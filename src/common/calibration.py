@@ -0,0 +1,105 @@
+"""
+PUE calibration of the Other/IT ratio k per period.
+
+With Cooling fixed by the regression, IT = (Total - Cooling) / (1 + k), so a
+period with target PUE P needs
+
+    k_p = P_p * (1 - Cooling_p / Total_p) - 1
+
+All periods are reduced in one pass (np.bincount over integer period codes).
+The raw k_p are floored at 0 and then smoothed along time by penalized least
+squares,
+
+    min  sum_p w_p (k_p - raw_p)^2 + smoothing * sum_p (k_{p+1} - k_p)^2
+
+a symmetric tridiagonal system solved in O(periods). Its matrix is an
+M-matrix, so the inverse is entrywise non-negative and the smoothed k stays
+>= 0 without an active-set loop.
+"""
+import numpy as np
+
+PERIODS = ['year', 'season', 'month']
+SEASON_NAMES = ['Winter', 'Spring', 'Summer', 'Fall']   # Block (year * 12 + month - 3) // 3, mod 4
+
+def period_codes(index, period):
+    """
+    Integer code and label per timestamp. Seasons are contiguous Dec-Feb /
+    Mar-May / Jun-Aug / Sep-Nov blocks, so December joins the next winter.
+    """
+    months = index.year.values * 12 + index.month.values
+    if period == 'month':
+        codes = months
+        labels = lambda c: f"{(c - 1) // 12}-{(c - 1) % 12 + 1:02d}"
+    elif period == 'season':
+        codes = (months - 3) // 3
+        # Label a season block by the year of its last month (Winter 2025 = Dec 2024 - Feb 2025)
+        labels = lambda c: f"{(c * 3 + 5) // 12}-{SEASON_NAMES[(c + 1) % 4]}"
+    elif period == 'year':
+        codes = np.zeros(len(index), dtype=np.int64)
+        labels = lambda c: 'all'
+    else:
+        raise ValueError(f"Unknown calibration period {period!r} (expected one of {PERIODS})")
+    uniques, inverse = np.unique(codes, return_inverse=True)
+    return inverse, [labels(c) for c in uniques]
+
+def period_targets(labels, targets, default):
+    """
+    Target PUE per period label: the exact label ('2025-Summer', '2024-07'),
+    else its season or month ('Summer', 7), else default.
+    """
+    out = []
+    for label in labels:
+        key = label.split('-', 1)[-1]
+        value = targets.get(label, targets.get(key, default))
+        if key.isdigit():
+            value = targets.get(label, targets.get(int(key), value))
+        out.append(float(value))
+    return np.array(out)
+
+def smooth_nonnegative(raw, weights, smoothing):
+    """Penalized least-squares smoothing of raw (floored at 0) along the periods."""
+    raw = np.maximum(raw, 0.0)
+    n = len(raw)
+    if smoothing <= 0 or n < 2:
+        return raw
+    from scipy.linalg import solveh_banded   # Only needed here; keeps the annual path free of scipy
+    # Upper banded form of diag(w) + smoothing * D'D (D = first differences)
+    diag = weights + smoothing * np.r_[1.0, np.full(n - 2, 2.0), 1.0]
+    off = np.r_[0.0, np.full(n - 1, -smoothing)]
+    return solveh_banded(np.vstack([off, diag]), weights * raw)
+
+def solve_k(total, cooling, codes, pue, smoothing=0.0, metered=None):
+    """
+    k per period from per-sample total and cooling energy.
+
+    pue:     target PUE per period
+    metered: optional metered PUE per sample (NaN where not metered); a period
+             with readings uses its energy-weighted PUE, sum(total) /
+             sum(total / pue), instead of the target
+    Returns (k, raw_k, cooling_ratio, period_pue) arrays per period.
+    """
+    n_periods = len(pue)
+    total_p = np.bincount(codes, weights=total, minlength=n_periods)
+    cooling_p = np.bincount(codes, weights=cooling, minlength=n_periods)
+    pue = np.asarray(pue, dtype=float)
+    if metered is not None:
+        read = np.isfinite(metered) & (metered > 0)
+        read_total = np.bincount(codes, weights=np.where(read, total, 0.0), minlength=n_periods)
+        read_it = np.bincount(codes, weights=np.where(read, total / np.where(read, metered, 1.0), 0.0),
+                              minlength=n_periods)
+        pue = np.where(read_it > 0, read_total / np.where(read_it > 0, read_it, 1.0), pue)
+    ratio = cooling_p / total_p
+    raw = pue * (1 - ratio) - 1
+    # Weight each period by its share of the energy, so short periods bend more
+    weights = total_p / total_p.sum() * n_periods
+    return smooth_nonnegative(raw, weights, smoothing), raw, ratio, pue
+
+def k_per_sample(index, k_by_label, period):
+    """
+    Broadcast stored per-period k (label -> k, in time order) onto timestamps.
+    Periods without a stored k (new months in incremental runs) take the
+    latest stored k.
+    """
+    codes, labels = period_codes(index, period)
+    latest = list(k_by_label.values())[-1]
+    return np.array([k_by_label.get(label, latest) for label in labels])[codes]
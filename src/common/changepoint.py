@@ -0,0 +1,390 @@
+"""
+Closed-form change-point regression (ASHRAE 3P/4P/5P models).
+
+Models, with x the weather variable (enthalpy) and h+(t) = max(0, x - t),
+h-(t) = max(0, t - x):
+
+    3PC  y = b0 + bc * h+(tc)                    cooling only
+    3PH  y = b0 + bh * h-(th)                    heating only
+    4P   y = b0 + bh * h-(t) + bc * h+(t)        one breakpoint, two slopes
+    5P   y = b0 + bh * h-(th) + bc * h+(tc)      th < tc, flat band in between
+
+The data is sorted by x once. Only samples below th contribute to h- and
+only samples above tc to h+, so the regression sums for every candidate
+breakpoint come from prefix/suffix sums indexed with searchsorted:
+
+    sum h+   = sum(x_i) - m t                    (the m samples with x_i > t)
+    sum h+^2 = sum(x_i^2) - 2 t sum(x_i) + m t^2
+    sum h+ y = sum(x_i y_i) - t sum(y_i)
+
+and symmetrically for h-. The two hinges never overlap (th <= tc), so their
+cross product sums to zero and every (th, tc) pair of the 2D 5P grid is a
+closed-form 2x2 solve, evaluated for the whole grid in one array expression.
+"""
+import numpy as np
+
+MODELS = ['3PC', '3PH', '4P', '5P']
+N_PARAMS = {'3PC': 3, '3PH': 3, '4P': 4, '5P': 5}   # Breakpoints count as parameters
+MIN_SEGMENT = 0.02   # Minimum share of samples on the active side of each hinge
+TIE_R2 = 1e-9        # R^2 difference treated as a tie by rolling_hinge_fit
+
+def sort_by(x, y):
+    """Sort once by x; returns (x_sorted, y_sorted) as float64."""
+    order = np.argsort(x, kind='stable')
+    return np.asarray(x, dtype=float)[order], np.asarray(y, dtype=float)[order]
+
+def _sums(x, y, w=None):
+    """
+    Prefix sums of the centered data (prefix[..., i] = sum of the first i samples).
+
+    w: optional sample weights, shape (n,) or (B, n) for B weighted fits at
+    once (e.g. bootstrap resample counts); all sums then carry a leading B axis.
+    x and y may also be (B, n), each row sorted, for B different data sets.
+    """
+    if w is None and x.ndim == 1:
+        w = np.ones_like(x)
+        n, x0, y0 = float(len(x)), x.mean(), y.mean()
+    else:
+        if w is None:
+            w = np.ones_like(x)
+        n = w.sum(axis=-1, keepdims=True)
+        x0 = (w * x).sum(axis=-1, keepdims=True) / n
+        y0 = (w * y).sum(axis=-1, keepdims=True) / n
+    xc, yc = x - x0, y - y0
+    def prefix(a):
+        return np.concatenate([np.zeros(a.shape[:-1] + (1,)), np.cumsum(a, axis=-1)], axis=-1)
+    return {'x': x, 'n': n, 'x0': x0, 'y0': y0, 'syy': (w * yc * yc).sum(axis=-1, keepdims=np.ndim(n) > 0),
+            'pw': prefix(w), 'px': prefix(w * xc), 'pxx': prefix(w * xc * xc),
+            'pxy': prefix(w * xc * yc), 'py': prefix(w * yc)}
+
+def _search(x, t, side):
+    """searchsorted of the thresholds in x, or in every row of a row-sorted (B, n) x."""
+    if x.ndim == 1:
+        return np.searchsorted(x, t, side=side)
+    # Shift every row into its own disjoint range so one flat search covers all rows
+    lo = min(x.min(), t.min())
+    span = max(x.max(), t.max()) - lo + 1
+    offset = np.arange(len(x))[:, None] * span
+    i = np.searchsorted((x - lo + offset).ravel(), (t - lo + offset).ravel(), side=side)
+    return i.reshape(len(x), len(t)) - np.arange(len(x))[:, None] * x.shape[1]
+
+def _at(p, i):
+    """p[..., i] for a shared index vector i or per-row indices i of shape (B, T)."""
+    if i.ndim == 1:
+        return p[..., i]
+    return np.take_along_axis(p, i, axis=-1)
+
+def _right(s, t):
+    """(m, S, SS, SY) of h+(t) = max(0, x - t) for an array of thresholds."""
+    i = _search(s['x'], t, 'right')                # First sample with x > t
+    tc = t - s['x0']
+    m, px, pxx, pxy, py = (s[k][..., -1:] - _at(s[k], i) for k in ['pw', 'px', 'pxx', 'pxy', 'py'])
+    return m, px - m * tc, pxx - 2 * tc * px + m * tc ** 2, pxy - tc * py
+
+def _left(s, t):
+    """(m, S, SS, SY) of h-(t) = max(0, t - x) for an array of thresholds."""
+    i = _search(s['x'], t, 'left')                 # Samples with x < t
+    tc = t - s['x0']
+    m, px, pxx, pxy, py = (_at(s[k], i) for k in ['pw', 'px', 'pxx', 'pxy', 'py'])
+    return m, m * tc - px, pxx - 2 * tc * px + m * tc ** 2, tc * py - pxy
+
+def _one_hinge(s, hinge):
+    m, S, SS, SY = hinge
+    n = s['n']
+    var = SS - S ** 2 / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(var > 0, SY / var, 0.0)
+    sse = s['syy'] - slope * SY
+    b0 = s['y0'] - slope * S / n
+    valid = (var > 0) & (slope > 0) & (m >= MIN_SEGMENT * n)
+    return np.where(valid, sse, np.inf), b0, slope
+
+def _two_hinges(s, left, right):
+    """Joint fit of b0 + bh*h- + bc*h+ for broadcastable left/right hinge sums."""
+    ml, Sl, SSl, SYl = left
+    mr, Sr, SSr, SYr = right
+    n = s['n']
+    v_ll = SSl - Sl ** 2 / n
+    v_rr = SSr - Sr ** 2 / n
+    v_lr = -Sl * Sr / n                             # Hinges are disjoint: sum h- h+ = 0
+    det = v_ll * v_rr - v_lr ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bh = (SYl * v_rr - SYr * v_lr) / det
+        bc = (SYr * v_ll - SYl * v_lr) / det
+    sse = s['syy'] - (bh * SYl + bc * SYr)
+    b0 = s['y0'] - (bh * Sl + bc * Sr) / n
+    valid = (det > 0) & (bh > 0) & (bc > 0) & (ml >= MIN_SEGMENT * n) & (mr >= MIN_SEGMENT * n)
+    return np.where(valid, sse, np.inf), b0, bh, bc
+
+def _grid(s, left, right):
+    """5P: (th, tc) grid on the last two axes (th < tc enforced by the caller)."""
+    lifted = dict(s, **{k: np.expand_dims(s[k], -1) for k in ['n', 'y0', 'syy']})
+    L = tuple(a[..., :, None] for a in left)
+    R = tuple(a[..., None, :] for a in right)
+    return _two_hinges(lifted, L, R)
+
+def _result(model, n, syy, sse, b0, bh=0.0, bc=0.0, th=None, tc=None):
+    k = N_PARAMS[model]
+    sse = max(float(sse), 1e-12)
+    return {
+        'model': model, 'intercept': float(b0),
+        'heating_slope': float(bh), 'heating_break': None if th is None else float(th),
+        'cooling_slope': float(bc), 'cooling_break': None if tc is None else float(tc),
+        'n': int(n), 'sse': sse, 'r2': 1 - sse / syy if syy > 0 else 0.0,
+        'aic': n * np.log(sse / n) + 2 * k,
+        'bic': n * np.log(sse / n) + k * np.log(n),
+    }
+
+def fit_models(x, y, breakpoints, models=MODELS):
+    """
+    Fit every requested change-point model over the candidate breakpoints.
+
+    Returns {model: fit} with the best breakpoint(s) per model; models with
+    no valid fit (e.g. no positive slope) are left out.
+    """
+    x, y = sort_by(x, y)
+    s = _sums(x, y)
+    t = np.asarray(breakpoints, dtype=float)
+    n, syy = s['n'], s['syy']
+    fits = {}
+
+    right, left = _right(s, t), _left(s, t)
+
+    if '3PC' in models:
+        sse, b0, bc = _one_hinge(s, right)
+        i = int(np.argmin(sse))
+        if np.isfinite(sse[i]):
+            fits['3PC'] = _result('3PC', n, syy, sse[i], b0[i], bc=bc[i], tc=t[i])
+
+    if '3PH' in models:
+        sse, b0, bh = _one_hinge(s, left)
+        i = int(np.argmin(sse))
+        if np.isfinite(sse[i]):
+            fits['3PH'] = _result('3PH', n, syy, sse[i], b0[i], bh=bh[i], th=t[i])
+
+    if '4P' in models:
+        sse, b0, bh, bc = _two_hinges(s, left, right)
+        i = int(np.argmin(sse))
+        if np.isfinite(sse[i]):
+            fits['4P'] = _result('4P', n, syy, sse[i], b0[i], bh[i], bc[i], t[i], t[i])
+
+    if '5P' in models:
+        # Whole (th, tc) grid at once: th along axis 0, tc along axis 1
+        sse, b0, bh, bc = _grid(s, left, right)
+        sse = np.where(t[:, None] < t[None, :], sse, np.inf)
+        i, j = np.unravel_index(int(np.argmin(sse)), sse.shape)
+        if np.isfinite(sse[i, j]):
+            fits['5P'] = _result('5P', n, syy, sse[i, j], b0[i, j], bh[i, j], bc[i, j], t[i], t[j])
+
+    return fits
+
+def select_model(fits, criterion='bic'):
+    """Fit with the lowest information criterion ('aic' or 'bic')."""
+    return min(fits.values(), key=lambda f: f[criterion])
+
+def _information(criterion, n, sse, k):
+    with np.errstate(divide='ignore'):
+        ll = n * np.log(np.maximum(sse, 1e-12) / n)
+    penalty = 2 * k if criterion == 'aic' else k * np.log(n)
+    return np.where(np.isfinite(sse), ll + penalty, np.inf)
+
+def fit_models_batch(x, y, weights, breakpoints, models=MODELS, criterion='bic'):
+    """
+    Fit and select change-point models for B data sets or weightings at once.
+
+    x, y:    (n,) shared by all fits, or (B, n) with one data set per row
+             (e.g. one site per row of a panel)
+    weights: (B, n) sample weights, e.g. bootstrap resample counts or 0 for
+             missing samples; None for unit weights with (B, n) data
+    The data is sorted once and every model is a batched closed-form solve
+    over the (B, breakpoints) or (B, th, tc) grid, so there is no per-fit loop.
+
+    Returns a dict of (B,) arrays: model (name, 'none' without a valid fit),
+    intercept, heating_slope, heating_break, cooling_slope, cooling_break
+    (breaks are NaN for an absent hinge).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    w = None if weights is None else np.asarray(weights, dtype=float)
+    order = np.argsort(x, axis=-1, kind='stable')
+    if x.ndim == 1:
+        x, y = x[order], y[order]
+        w = w[:, order]
+    else:
+        x, y = np.take_along_axis(x, order, -1), np.take_along_axis(y, order, -1)
+        if w is not None:
+            w = np.take_along_axis(w, order, -1)
+    s = _sums(x, y, w)
+    t = np.asarray(breakpoints, dtype=float)
+    n = s['n'][:, 0]
+    B = len(n)
+    right, left = _right(s, t), _left(s, t)
+    rows = np.arange(B)
+    nan = np.full(B, np.nan)
+    zero = np.zeros(B)
+
+    # Per model: (sse, b0, bh, bc, th, tc), each (B,) at the best breakpoint(s)
+    best = {}
+    if '3PC' in models:
+        sse, b0, bc = _one_hinge(s, right)
+        i = np.argmin(sse, axis=-1)
+        best['3PC'] = (sse[rows, i], b0[rows, i], zero, bc[rows, i], nan, t[i])
+    if '3PH' in models:
+        sse, b0, bh = _one_hinge(s, left)
+        i = np.argmin(sse, axis=-1)
+        best['3PH'] = (sse[rows, i], b0[rows, i], bh[rows, i], zero, t[i], nan)
+    if '4P' in models:
+        sse, b0, bh, bc = _two_hinges(s, left, right)
+        i = np.argmin(sse, axis=-1)
+        best['4P'] = (sse[rows, i], b0[rows, i], bh[rows, i], bc[rows, i], t[i], t[i])
+    if '5P' in models:
+        sse, b0, bh, bc = _grid(s, left, right)
+        sse = np.where(t[:, None] < t[None, :], sse, np.inf).reshape(B, -1)
+        flat = np.argmin(sse, axis=-1)
+        i, j = np.unravel_index(flat, (len(t), len(t)))
+        best['5P'] = (sse[rows, flat], b0.reshape(B, -1)[rows, flat], bh.reshape(B, -1)[rows, flat],
+                      bc.reshape(B, -1)[rows, flat], t[i], t[j])
+
+    names = list(best)
+    ic = np.array([_information(criterion, n, best[m][0], N_PARAMS[m]) for m in names])
+    pick = np.argmin(ic, axis=0)
+    found = np.isfinite(ic[pick, rows])
+    out = {key: np.array([best[m][k] for m in names])[pick, rows]
+           for k, key in enumerate(['sse', 'intercept', 'heating_slope', 'cooling_slope',
+                                    'heating_break', 'cooling_break'])}
+    del out['sse']
+    out['model'] = np.where(found, np.array(names, dtype=object)[pick], 'none')
+    for key in ['heating_slope', 'cooling_slope']:
+        out[key] = np.where(found, out[key], 0.0)
+    for key in ['heating_break', 'cooling_break']:
+        out[key] = np.where(found, out[key], np.nan)
+    # Without a valid fit the replicate's weighted mean is the whole load
+    out['intercept'] = np.where(found, out['intercept'], s['y0'][:, 0])
+    return out
+
+def batch_weather_terms(fits, x):
+    """
+    (heating, cooling) hinge contributions, shape (B, n), of fit_models_batch
+    results at x of shape (n,) or (B, n).
+    """
+    x = np.asarray(x, dtype=float)
+    if x.ndim == 1:
+        x = x[None, :]
+    th = fits['heating_break'][:, None]
+    tc = fits['cooling_break'][:, None]
+    heating = np.where(np.isnan(th), 0.0, fits['heating_slope'][:, None] * np.maximum(0, np.nan_to_num(th) - x))
+    cooling = np.where(np.isnan(tc), 0.0, fits['cooling_slope'][:, None] * np.maximum(0, x - np.nan_to_num(tc)))
+    return heating, cooling
+
+def weather_terms(fit, x):
+    """(heating, cooling) hinge contributions of a fitted model at x."""
+    x = np.asarray(x, dtype=float)
+    heating = np.zeros_like(x)
+    cooling = np.zeros_like(x)
+    if fit['heating_break'] is not None:
+        heating = fit['heating_slope'] * np.maximum(0, fit['heating_break'] - x)
+    if fit['cooling_break'] is not None:
+        cooling = fit['cooling_slope'] * np.maximum(0, x - fit['cooling_break'])
+    return heating, cooling
+
+def predict(fit, x):
+    heating, cooling = weather_terms(fit, x)
+    return fit['intercept'] + heating + cooling
+
+def hinge_fit(x, y, thresholds, presorted=False):
+    """
+    Least-squares fit of y = b0 + b1 * max(0, x - t) for every t in thresholds,
+    without sign constraints. Returns (r2, slope, intercept) arrays.
+    """
+    if not presorted:
+        x, y = sort_by(x, y)
+    s = _sums(x, y)
+    m, S, SS, SY = _right(s, np.asarray(thresholds, dtype=float))
+    var = SS - S ** 2 / s['n']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(var > 0, SY / var, 0.0)
+        r2 = np.where((var > 0) & (s['syy'] > 0), slope * SY / s['syy'], 0.0)
+    return r2, slope, s['y0'] - slope * S / s['n']
+
+def best_threshold(x, y, thresholds):
+    """Threshold with the highest R^2 (first one on ties) and its 3PC fit."""
+    r2, slope, intercept = hinge_fit(x, y, thresholds)
+    i = int(np.argmax(r2))
+    return thresholds[i], r2[i], slope[i], intercept[i]
+
+def _window_sums(a, start, end):
+    """Trailing-window sums of a along axis 0: samples start[i]..end[i]-1 for every i."""
+    c = np.concatenate([np.zeros((1,) + a.shape[1:]), np.cumsum(a, axis=0)])
+    return c[end] - c[start]
+
+def rolling_hinge_fit(times, x, y, thresholds, window, block=32):
+    """
+    3PC fit of y = b0 + b1 * max(0, x - t) on a trailing time window ending
+    at every sample, with t chosen per window by the highest R^2.
+
+    times:  int64 nanoseconds (ascending); window: window length in ns
+    The window sums (n, sum h, sum h^2, sum h*y per threshold, plus sum y and
+    sum y^2) are differences of running sums: each sample enters and leaves
+    the window once, so a year of coefficients costs O(n * thresholds) with no
+    per-window refit. Thresholds are processed in blocks to bound memory.
+
+    Returns a dict of per-sample arrays: threshold (NaN when no threshold has
+    a positive slope), slope, intercept, r2 and samples (window size).
+    """
+    times = np.asarray(times, dtype=np.int64)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    t = np.asarray(thresholds, dtype=float)
+    n = len(x)
+
+    end = np.arange(1, n + 1)
+    start = np.searchsorted(times, times - window, side='right')
+    m = (end - start).astype(float)
+
+    y0 = y.mean()
+    yc = y - y0
+    Sy = _window_sums(yc, start, end)
+    Syy = _window_sums(yc * yc, start, end)
+    vy = Syy - Sy ** 2 / m
+
+    best_r2 = np.full(n, -np.inf)
+    best_t = np.full(n, np.nan)
+    best_slope = np.zeros(n)
+    best_S = np.zeros(n)
+    rows = np.arange(n)
+    for b in range(0, len(t), block):
+        tb = t[b:b + block]
+        h = np.maximum(0, x[:, None] - tb[None, :])
+        S = _window_sums(h, start, end)
+        SS = _window_sums(h * h, start, end)
+        SY = _window_sums(h * yc[:, None], start, end)
+        active = _window_sums((h > 0).astype(float), start, end)
+        del h
+
+        var = SS - S ** 2 / m[:, None]
+        cov = SY - S * (Sy / m)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = cov / var
+            r2 = cov ** 2 / (var * vy[:, None])
+        valid = (var > 1e-9) & (vy[:, None] > 0) & (slope > 0) & (active >= MIN_SEGMENT * m[:, None])
+        r2 = np.where(valid, r2, -np.inf)
+
+        # Ties (every window sample above several thresholds fits the same line)
+        # go to the highest threshold, i.e. the least load attributed to weather
+        top = r2.max(axis=1)
+        j = r2.shape[1] - 1 - np.argmax((r2 >= top[:, None] - TIE_R2)[:, ::-1], axis=1)
+        r2_j = r2[rows, j]
+        better = np.isfinite(r2_j) & (r2_j >= best_r2 - TIE_R2)
+        best_r2[better] = r2_j[better]
+        best_t[better] = tb[j[better]]
+        best_slope[better] = slope[rows, j][better]
+        best_S[better] = S[rows, j][better]
+
+    found = np.isfinite(best_r2)
+    return {
+        'threshold': best_t,
+        'slope': best_slope,
+        'intercept': y0 + (Sy - best_slope * best_S) / m,
+        'r2': np.where(found, best_r2, 0.0),
+        'samples': (end - start),
+    }
@@ -0,0 +1,249 @@
+"""
+Revenue-maximizing DR dispatch under program limits.
+
+The revenue scripts used to take the N hours with the largest E_shed * SMP
+(nlargest), regardless of how the hours fall. Here the dispatched hours
+must also respect
+
+    max_daily_events    events (runs of consecutive dispatched hours) per day
+    max_event_hours     hours per event
+    ess_hours           ESS energy per day in full-power hours (None: no limit),
+                        shared by the day's dispatched hours
+
+The ESS starts every day full (recharged outside the windows, as in
+common/ess.py). With a limit, every dispatched hour gets the ESS fully,
+partly (one fractional hour per day) or not at all. Without one, the ESS
+part is always delivered.
+
+The ESS power, efficiency and C-rate come from the settings simulate_dr.py
+stored with its output (data/params/simulate_dr.json), so Q_ESS_shed_kW and
+ess_hours describe the same ESS. A simulation that already ran with
+--ess-kwh has SOC-limited Q_ESS_shed_kW; limiting it again here is refused.
+
+solve() works in two exact steps:
+
+1. A DP over the 24 hours of every day, vectorized over all days and
+   scenarios. Its state is (hours used, current event length, events
+   started, full ESS hours used, fractional ESS hour used), and it gives
+   the best day revenue for every number of dispatched hours k.
+2. A knapsack over the days, which gives the best annual revenue for every
+   hour budget n = 0..max_hours at once.
+
+Every line of a revenue-vs-event-hours table therefore comes from one
+solve. schedule() recovers the dispatched hours of one budget.
+"""
+import numpy as np
+import pandas as pd
+
+from common.ess import C_RATE, ESS_POWER_KW, ROUND_TRIP_EFF, SOC_MAX, SOC_MIN
+from common.incremental import load_params
+
+MAX_HOURS = 60            # Annual event hours (largest budget of the revenue tables)
+MAX_DAILY_EVENTS = 1
+MAX_EVENT_HOURS = 4
+HOURS = 24
+SIMULATION_PARAMS = 'simulate_dr'   # ESS settings behind Q_ESS_shed_kW
+
+def add_dispatch_arguments(parser):
+    parser.add_argument('--max-daily-events', type=int, default=MAX_DAILY_EVENTS,
+                        help=f'DR events per day (default {MAX_DAILY_EVENTS})')
+    parser.add_argument('--max-event-hours', type=int, default=MAX_EVENT_HOURS,
+                        help=f'Consecutive hours per event (default {MAX_EVENT_HOURS})')
+    parser.add_argument('--ess-kwh', type=float, default=None,
+                        help='ESS energy capacity in kWh shared by the hours of a day (default: unlimited)')
+    parser.add_argument('--ess-kw', type=float, default=None,
+                        help='ESS power rating in kW for --ess-kwh (default: the simulate_dr.py rating)')
+
+def dispatch_config(args):
+    """
+    solve() keyword arguments from the add_dispatch_arguments options.
+
+    Raises ValueError when they contradict the ESS of the simulation behind
+    Q_ESS_shed_kW (already energy-limited, or simulated at another rating).
+    """
+    simulated = (load_params(SIMULATION_PARAMS) or {}).get('ess', {})
+    power_kW = simulated.get('power_kW', ESS_POWER_KW)
+    if args.ess_kwh is not None and simulated.get('energy_kWh') is not None:
+        raise ValueError(f"Q_ESS_shed_kW already comes from a {simulated['energy_kWh']:g} kWh ESS "
+                         f"(simulate_dr.py --ess-kwh); drop --ess-kwh or rerun simulate_dr.py without it")
+    if args.ess_kw is not None and args.ess_kw != power_kW:
+        raise ValueError(f"Q_ESS_shed_kW was simulated at {power_kW:g} kW; "
+                         f"rerun simulate_dr.py --ess-kw {args.ess_kw:g} first")
+    return {'max_daily_events': args.max_daily_events, 'max_event_hours': args.max_event_hours,
+            'ess_hours': ess_hours(args.ess_kwh, power_kW,
+                                   simulated.get('round_trip_eff', ROUND_TRIP_EFF),
+                                   simulated.get('c_rate', C_RATE))}
+
+def ess_hours(energy_kWh, power_kW=ESS_POWER_KW, round_trip_eff=ROUND_TRIP_EFF, c_rate=C_RATE,
+              soc_min=SOC_MIN, soc_max=SOC_MAX):
+    """Full-power discharge hours of a full ESS (None for unlimited energy)."""
+    if energy_kWh is None:
+        return None
+    p_max = min(power_kW, c_rate * energy_kWh)
+    if p_max <= 0:
+        return 0.0
+    return (soc_max - soc_min) * energy_kWh * np.sqrt(round_trip_eff) / p_max
+
+def event_values(events, ess_limited=False):
+    """
+    Hourly revenue of the 1-hour events table (E_shed_kWh * SMP_hourly).
+
+    Returns (value, ess_value): with a limited ESS its part of the energy
+    (Q_ESS_shed_kW) is split off as ess_value, otherwise ess_value is None.
+    """
+    smp = events['SMP_hourly'].to_numpy(dtype=float)
+    energy = events['E_shed_kWh'].to_numpy(dtype=float)
+    if not ess_limited:
+        return energy * smp, None
+    ess = events['Q_ESS_shed_kW'].to_numpy(dtype=float)
+    return (energy - ess) * smp, ess * smp
+
+def _day_grid(index, values, fill):
+    """(..., days, 24) grid of hourly values and the dates of its rows."""
+    dates = index.normalize()
+    _, first, row = np.unique(dates.asi8, return_index=True, return_inverse=True)
+    values = np.asarray(values)
+    grid = np.full(values.shape[:-1] + (len(first), HOURS), fill, dtype=values.dtype)
+    grid[..., row, index.hour] = values
+    return grid, dates[first]
+
+def _relax(dst, src, v, w, frac):
+    """dst = max(dst, src + hour value) for the ESS options: none, one full hour (e + 1), the fraction (b 0 -> 1)."""
+    shape = v.shape + (1,) * (dst.ndim - 2)
+    v, w = v.reshape(shape), w.reshape(shape)
+    np.maximum(dst, src + v, out=dst)
+    if dst.shape[-2] > 1:
+        np.maximum(dst[..., 1:, :], src[..., :-1, :] + v + w, out=dst[..., 1:, :])
+    if dst.shape[-1] > 1:
+        np.maximum(dst[..., 1], src[..., 0] + v[..., 0] + frac * w[..., 0], out=dst[..., 1])
+
+def _day_dp(base, ess, K, L, M, U, frac, trail=None):
+    """
+    Best revenue of every day for exactly k = 0..K dispatched hours.
+
+    base / ess: (S, D, 24) hour values, -inf where the hour is not an event.
+    The state axes after (S, D) are hours used k, event length r, events
+    started m, full ESS hours e and fractional ESS hour b. Returns
+    (S, D, K + 1); trail (a list) collects the states before every hour and
+    after the last one for schedule().
+    """
+    B = 2 if frac > 0 else 1
+    V = np.full(base.shape[:2] + (K + 1, L + 1, M + 1, U + 1, B), -np.inf)
+    V[:, :, 0, 0, 0, 0, 0] = 0.0
+    active = np.isfinite(base).any(axis=(0, 1))   # Hours with an event on some day
+    ended = True                                  # No event in progress (all states at r = 0)
+    for h in range(HOURS):
+        if trail is not None:
+            trail.append(V)
+        if not active[h] and ended:
+            continue
+        new = np.full_like(V, -np.inf)
+        new[:, :, :, 0] = V.max(axis=3)                                   # skip: the event ends
+        if active[h]:
+            v, w = base[:, :, h], ess[:, :, h]
+            _relax(new[:, :, 1:, 1, 1:], V[:, :, :-1, 0, :-1], v, w, frac)    # start an event
+            _relax(new[:, :, 1:, 2:], V[:, :, :-1, 1:-1], v, w, frac)         # extend the event
+        ended = not active[h]
+        V = new
+    if trail is not None:
+        trail.append(V)
+    return V.reshape(V.shape[:3] + (-1,)).max(axis=3)
+
+def _limits(candidate, max_daily_events, max_event_hours, ess_hours):
+    """State sizes: hours per day K, event length L, events M, full ESS hours U and the fraction."""
+    K = int(min(max_daily_events * max_event_hours, candidate.sum(axis=-1).max(initial=0)))
+    L = min(max_event_hours, K)
+    M = min(max_daily_events, K)
+    if ess_hours is None or ess_hours >= K:
+        return K, L, M, 0, 0.0
+    return K, L, M, int(ess_hours), float(ess_hours - int(ess_hours))
+
+def solve(index, value, ess_value=None, candidate=None, max_hours=MAX_HOURS, max_daily_events=MAX_DAILY_EVENTS,
+          max_event_hours=MAX_EVENT_HOURS, ess_hours=None):
+    """
+    Optimal dispatch of the hourly events for every annual budget 0..max_hours.
+
+    index: hourly DatetimeIndex; value: revenue of dispatching each hour,
+    (T,) or (S, T) for S scenarios; ess_value: the ESS part of it (only
+    used with ess_hours); candidate: hours that may be dispatched (default
+    all). Returns a dict with 'revenue' (S, max_hours + 1), the best revenue
+    with at most n hours, plus what schedule() needs.
+    """
+    value = np.atleast_2d(np.asarray(value, dtype=float))
+    candidate = np.ones(len(index), dtype=bool) if candidate is None else np.asarray(candidate, dtype=bool)
+    cand, days = _day_grid(index, candidate, False)
+    K, L, M, U, frac = _limits(cand, max_daily_events, max_event_hours, ess_hours)
+    if ess_value is None:
+        ess_value = np.zeros_like(value)
+    elif U == 0 and frac == 0 and (ess_hours is None or ess_hours >= K):
+        # No energy coupling: the ESS part is always delivered
+        value, ess_value = value + ess_value, np.zeros_like(value)
+    ess_value = np.broadcast_to(np.atleast_2d(np.asarray(ess_value, dtype=float)), value.shape)
+
+    base, _ = _day_grid(index, np.where(candidate, value, -np.inf), -np.inf)
+    ess, _ = _day_grid(index, np.where(candidate, ess_value, 0.0), 0.0)
+
+    # Best revenue of every day per number of hours (only days with events need the DP)
+    event_days = np.flatnonzero(cand.any(axis=-1))
+    day_values = np.full(value.shape[:1] + (len(days), K + 1), -np.inf)
+    day_values[:, :, 0] = 0.0
+    if K > 0:
+        day_values[:, event_days] = _day_dp(base[:, event_days], ess[:, event_days], K, L, M, U, frac)
+
+    # Knapsack over days: best revenue with at most n hours, and the hours of every day
+    S, D = day_values.shape[:2]
+    G = np.zeros((S, max_hours + 1))
+    choice = np.zeros((S, D, max_hours + 1), dtype=np.int16)
+    for d in event_days:
+        best = G.copy()
+        for k in range(1, min(K, max_hours) + 1):
+            cand_k = np.full_like(G, -np.inf)
+            cand_k[:, k:] = G[:, :-k] + day_values[:, d, k, None]
+            better = cand_k > best
+            best = np.where(better, cand_k, best)
+            choice[:, d][better] = k
+        G = best
+    return {'revenue': G, 'choice': choice, 'days': days, 'base': base, 'ess': ess,
+            'limits': (K, L, M, U, frac), 'index': index}
+
+def schedule(solution, n_hours, scenario=0):
+    """Boolean mask over the index of the hours dispatched with a budget of n_hours."""
+    choice = solution['choice'][scenario]
+    K, L, M, U, frac = solution['limits']
+
+    # Hours of every day (knapsack backtrack)
+    hours_of = np.zeros(len(solution['days']), dtype=int)
+    n = n_hours
+    for d in range(len(hours_of) - 1, -1, -1):
+        hours_of[d] = choice[d, n]
+        n -= hours_of[d]
+
+    # Hours of the dispatched days (DP backtrack over the stored states)
+    sel = np.flatnonzero(hours_of)
+    base = solution['base'][scenario:scenario + 1, sel]
+    ess = solution['ess'][scenario:scenario + 1, sel]
+    trail = []
+    _day_dp(base, ess, K, L, M, U, frac, trail)
+    grid = np.zeros((len(hours_of), HOURS), dtype=bool)
+    for i, d in enumerate(sel):
+        k = hours_of[d]
+        end = trail[HOURS][0, i, k]
+        state = (k,) + np.unravel_index(np.argmax(end), end.shape)
+        for h in range(HOURS - 1, -1, -1):
+            before = trail[h][0, i]
+            k, r, m, e, b = state
+            if r == 0:
+                # Skipped: the event (if any) ended at any length
+                state = (k, int(np.argmax(before[k, :, m, e, b])), m, e, b)
+                continue
+            grid[d, h] = True
+            v, w = base[0, i, h], ess[0, i, h]
+            prev = (k - 1, r - 1, m - 1 if r == 1 else m)
+            options = [(before[prev + (e, b)] + v, (e, b))]
+            if e > 0:
+                options.append((before[prev + (e - 1, b)] + v + w, (e - 1, b)))
+            if b == 1:
+                options.append((before[prev + (e, 0)] + v + frac * w, (e, 0)))
+            state = prev + max(options)[1]
+    day, hour = np.nonzero(grid)
+    return solution['index'].isin(solution['days'][day] + pd.to_timedelta(hour, unit='h'))
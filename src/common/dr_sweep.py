@@ -0,0 +1,139 @@
+"""
+Vectorized DR parameter sweep.
+
+simulate_dr.py computes the DR potential of every 15-min interval as
+
+    Q_shed = mask_shed * (alpha_IT * P_IT + alpha_cool(season) * P_Cool + Q_ESS)
+    Q_up   = mask_up   * (alpha_IT_forward * P_IT + Q_ESS)
+
+with alpha_cool = alpha_cool_summer in Summer and alpha_cool_other otherwise
+(the gross cooling shed, without the thermal rebound of common/thermal.py).
+Q_ESS is the ESS power rating available in every window slot (the unlimited
+energy case of common/ess.py; energy-limited sizings go through
+ess.sizing_table, see size_ess.py).
+Both are linear in the parameter vector (PARAM_NAMES), so for a grid of K
+parameter sets Q is one matrix product, features (T, F) @ params.T (F, K).
+Hourly means are linear too, so the 1-hour event binning of
+process_dr_events_1h.py is the same product on hourly-averaged features.
+
+sweep() reduces every parameter set straight to per-season statistics:
+
+    mean_kW / p90_kW   over the 15-min intervals inside the windows
+    events             1-hour events as in process_dr_events_1h.py: the whole
+                       hour inside the window, Q >= Qmin and Q > 0, with
+                       Qmin = QMIN_RATIO * seasonal mean of the positive hourly Q
+
+The (intervals x K) products are only formed per season and per chunk of
+CHUNK parameter sets, and each kind only evaluates its distinct parameter
+subsets (shed ignores alpha_IT_forward, up ignores the cooling alphas).
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from common.ess import ESS_POWER_KW
+
+PARAM_NAMES = ['alpha_IT', 'alpha_cool_summer', 'alpha_cool_other', 'alpha_IT_forward', 'Q_ESS_kW']
+DEFAULT_PARAMS = {
+    'alpha_IT': 0.10,
+    'alpha_cool_summer': 0.15,
+    'alpha_cool_other': 0.10,
+    'alpha_IT_forward': 0.10,
+    'Q_ESS_kW': ESS_POWER_KW, # 1.25 MW, constant in every window (no energy limit)
+}
+# Parameters each kind depends on (columns of its feature matrix)
+KIND_PARAMS = {
+    'shed': ['alpha_IT', 'alpha_cool_summer', 'alpha_cool_other', 'Q_ESS_kW'],
+    'up': ['alpha_IT_forward', 'Q_ESS_kW'],
+}
+SEASONS = ['Spring', 'Summer', 'Fall', 'Winter']
+QUANTILE = 0.9
+QMIN_RATIO = 0.3   # process_dr_events_1h.py: Qmin = 0.3 * seasonal mean
+CHUNK = 512        # Parameter sets per matrix product
+
+def param_grid(**values):
+    """
+    Cartesian grid of parameter sets, shaped (K, len(PARAM_NAMES)).
+
+    Keyword arguments give the values of a parameter (e.g. Q_ESS_kW=[0, 1250]);
+    parameters not given stay at DEFAULT_PARAMS.
+    """
+    axes = [np.atleast_1d(values.get(name, DEFAULT_PARAMS[name])).astype(float) for name in PARAM_NAMES]
+    return np.array(list(itertools.product(*axes)))
+
+def kind_features(df, kind):
+    """(T, len(KIND_PARAMS[kind])) features of one kind, zero outside its window."""
+    mask = df[f'mask_{kind}'].to_numpy(dtype=float)
+    p_it = df['P_IT_kW'].to_numpy(dtype=float)
+    if kind == 'up':
+        return np.column_stack([p_it, np.ones_like(p_it)]) * mask[:, None]
+    summer = (df['season'] == 'Summer').to_numpy(dtype=float)
+    p_cool = df['P_Cool_kW'].to_numpy(dtype=float)
+    return np.column_stack([p_it, p_cool * summer, p_cool * (1 - summer), np.ones_like(p_it)]) * mask[:, None]
+
+def hourly_bins(index):
+    """Hour bin of every interval (resample('1h') labels) and the first row of every bin."""
+    hours = index.asi8 // (3600 * 10**9)
+    labels, first, bins = np.unique(hours, return_index=True, return_inverse=True)
+    return bins, first, np.bincount(bins)
+
+def sweep(df, params, quantile=QUANTILE, qmin_ratio=QMIN_RATIO, chunk=CHUNK):
+    """
+    Per-season DR statistics for every parameter set.
+
+    df: simulate_dr output with season, mask_shed, mask_up, P_IT_kW, P_Cool_kW.
+    params: (K, len(PARAM_NAMES)) array (see param_grid).
+    Returns a long table with one row per (parameter set, kind, season):
+    the parameters, 'kind', 'season', 'intervals' (15-min window intervals),
+    'mean_kW', 'p90_kW' (named after quantile) and 'events'.
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    season = df['season'].astype(str).to_numpy()
+    bins, first, n_intervals = hourly_bins(df.index)
+    hour_season = season[first]
+    q_col = f"p{round(quantile * 100):02d}_kW"
+
+    tables = []
+    for kind, names in KIND_PARAMS.items():
+        mask = df[f'mask_{kind}'].to_numpy()
+        x = kind_features(df, kind)
+        # Hourly means of the features (resample('1h').mean()) and full-window hours
+        x_hourly = np.stack([np.bincount(bins, weights=x[:, j]) for j in range(x.shape[1])], axis=1)
+        x_hourly /= n_intervals[:, None]
+        full_hour = np.bincount(bins, weights=mask) / n_intervals >= 1.0
+
+        # Distinct parameter subsets of this kind
+        theta, inverse = np.unique(params[:, [PARAM_NAMES.index(n) for n in names]], axis=0,
+                                   return_inverse=True)
+        for s in SEASONS:
+            x_s = x[(season == s) & mask]
+            xh_s = x_hourly[hour_season == s]
+            event_ok = full_hour[hour_season == s]
+            stats = np.full((len(theta), 3), np.nan)
+            stats[:, 2] = 0
+            for lo in range(0, len(theta), chunk):
+                t = theta[lo:lo + chunk].T
+                if len(x_s):
+                    q = x_s @ t
+                    stats[lo:lo + chunk, 0] = q.mean(axis=0)
+                    stats[lo:lo + chunk, 1] = np.percentile(q, quantile * 100, axis=0)
+                qh = xh_s @ t
+                positive = qh > 0
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    qmin = qmin_ratio * np.where(positive, qh, 0).sum(axis=0) / positive.sum(axis=0)
+                qmin = np.nan_to_num(qmin)
+                stats[lo:lo + chunk, 2] = (event_ok[:, None] & (qh >= qmin) & positive).sum(axis=0)
+
+            table = pd.DataFrame(params, columns=PARAM_NAMES)
+            table['kind'] = kind
+            table['season'] = pd.Categorical([s] * len(params), categories=SEASONS)
+            table['intervals'] = len(x_s)
+            table['mean_kW'] = stats[inverse.ravel(), 0]
+            table[q_col] = stats[inverse.ravel(), 1]
+            table['events'] = stats[inverse.ravel(), 2].astype(int)
+            tables.append(table)
+
+    out = pd.concat(tables, ignore_index=True)
+    out.insert(0, 'param_set', np.tile(np.arange(len(params)), len(KIND_PARAMS) * len(SEASONS)))
+    return out.sort_values(['param_set', 'kind', 'season'], kind='stable', ignore_index=True)
@@ -0,0 +1,93 @@
+"""
+Table-driven DR windows.
+
+A window policy lists the hours of each season in which shed or up events
+are called. Hour h covers h:00-h:59:
+
+    {'Summer': {'shed': [11, 13, 14, 15, 16], 'up': []}, ...}
+
+policy_table() compiles it for the given day types into a boolean lookup
+table
+
+    table[kind, season, day_type, hour]     kind 0 = shed, 1 = up
+
+calendar_codes() turns the timestamps into flat (season, day type, hour) cell
+numbers once. The masks of a policy are then one gather, table[:, codes].
+A stack of P tables gives (P, T) shed/up matrices in the same single fancy
+index (window_masks), so many candidate designs can be evaluated at once.
+"""
+import json
+
+import numpy as np
+
+SEASONS = ['Spring', 'Summer', 'Fall', 'Winter']
+SEASON_OF_MONTH = np.array(['', 'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                            'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'])
+DAY_TYPES = ['Weekday', 'Weekend']
+KINDS = ['shed', 'up']
+HOURS = 24
+
+# Weekday windows of the current program design
+DEFAULT_WINDOWS = {
+    # Shed: 11-12, 13-17 / Up: None
+    'Summer': {'shed': [11, 13, 14, 15, 16], 'up': []},
+    # Shed: None / Up: 11-14
+    'Fall': {'shed': [], 'up': [11, 12, 13]},
+    # Shed: 08-12, 15-16 / Up: 12-14
+    'Winter': {'shed': [8, 9, 10, 11, 15], 'up': [12, 13]},
+    # Shed: 10-11 / Up: 12-15
+    'Spring': {'shed': [10], 'up': [12, 13, 14]},
+}
+DEFAULT_DAY_TYPES = ['Weekday']
+
+# Season code of every month (index 0 unused)
+MONTH_SEASON = np.array([0] + [SEASONS.index(s) for s in SEASON_OF_MONTH[1:]])
+
+def season_of(index):
+    """Season label of every timestamp (vectorized get_season)."""
+    return SEASON_OF_MONTH[index.month]
+
+def calendar_codes(index):
+    """Flat (season, day type, hour) cell number of every timestamp."""
+    season = MONTH_SEASON[index.month]
+    weekend = (index.weekday >= 5).astype(np.int64) # 5=Sat, 6=Sun
+    return (season * len(DAY_TYPES) + weekend) * HOURS + index.hour.values
+
+def policy_table(windows=DEFAULT_WINDOWS, day_types=DEFAULT_DAY_TYPES, shed_priority=True):
+    """
+    Boolean (kind, season, day type, hour) table of a window policy.
+
+    shed_priority: hours in both the shed and the up window of a cell are
+    shed hours only.
+    """
+    table = np.zeros((len(KINDS), len(SEASONS), len(DAY_TYPES), HOURS), dtype=bool)
+    days = [DAY_TYPES.index(d) for d in day_types]
+    for season, kinds in windows.items():
+        for kind, hours in kinds.items():
+            table[KINDS.index(kind), SEASONS.index(season)][np.ix_(days, list(hours))] = True
+    if shed_priority:
+        table[1] &= ~table[0]
+    return table
+
+def window_masks(tables, codes):
+    """
+    Shed and up masks of one table (2, S, D, H) or a stack (P, 2, S, D, H).
+
+    Returns (shed, up) boolean arrays shaped (T,) or (P, T).
+    """
+    tables = np.asarray(tables)
+    flat = tables.reshape(tables.shape[:-3] + (-1,))
+    masks = flat[..., codes]
+    return masks[..., 0, :], masks[..., 1, :]
+
+def load_windows(path):
+    """
+    Read a window policy from JSON:
+
+        {"day_types": ["Weekday"], "windows": {"Summer": {"shed": [13, 14], "up": []}, ...}}
+
+    day_types is optional (weekdays only). Returns (windows, day_types).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    return spec['windows'], spec.get('day_types', DEFAULT_DAY_TYPES)
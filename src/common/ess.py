@@ -0,0 +1,192 @@
+"""
+Battery ESS dispatch with state of charge.
+
+The ESS used to be a constant Q_ESS_fixed_kW in every DR window slot. Here it
+has a power rating (kW), an energy capacity (kWh), a round-trip efficiency
+(split evenly between charging and discharging), a C-rate limit
+(power <= c_rate * energy) and SOC limits, and its SOC is carried from slot
+to slot:
+
+    shed window   discharge at the power limit while SOC > soc_min
+    up window     charge at the power limit while SOC < soc_max
+    other slots   recharge at recharge_kW towards the next window: to soc_max
+                  before a shed window, down to soc_min before an up window
+
+Every slot therefore adds a kind-dependent step to the SOC and clips it to
+[soc_min, soc_max]. Repeating the same add-and-clip step n times is one
+add-and-clip of n steps, so the recursion only loops over the runs of equal
+slot kinds (a few per day), with each step vectorized over all ESS sizings;
+per-slot SOC and power are then filled in by broadcasting.
+
+energy_kWh=None means unlimited energy: the ESS delivers its power rating in
+every window slot, as the old constant did. Slots are taken as consecutive
+DT_H intervals.
+"""
+import numpy as np
+import pandas as pd
+
+DT_H = 0.25               # 15-min slots
+
+# Default ESS (the former Q_ESS_fixed_kW, no energy limit)
+ESS_POWER_KW = 1250.0
+ESS_ENERGY_KWH = None
+ROUND_TRIP_EFF = 0.90
+C_RATE = 1.0              # Max power per kWh of capacity (1/h)
+SOC_MIN = 0.10
+SOC_MAX = 0.95
+
+# Slot kinds
+SHED, UP, RECHARGE, DRAIN = 0, 1, 2, 3
+
+CHUNK = 64                # Sizings per dispatch call in sizing_table (bounds the (K, T) arrays)
+
+def add_ess_arguments(parser):
+    parser.add_argument('--ess-kw', type=float, default=ESS_POWER_KW,
+                        help=f'ESS power rating in kW (default {ESS_POWER_KW:g})')
+    parser.add_argument('--ess-kwh', type=float, default=ESS_ENERGY_KWH,
+                        help='ESS energy capacity in kWh (default: unlimited, constant power in every window)')
+    parser.add_argument('--ess-eff', type=float, default=ROUND_TRIP_EFF,
+                        help=f'ESS round-trip efficiency (default {ROUND_TRIP_EFF:g})')
+    parser.add_argument('--ess-c-rate', type=float, default=C_RATE,
+                        help=f'ESS C-rate limit, power <= c_rate * kWh (default {C_RATE:g})')
+    parser.add_argument('--ess-recharge-kw', type=float, default=None,
+                        help='ESS recharge power outside DR windows (default: the power limit)')
+
+def ess_config(args):
+    """dispatch() keyword arguments from the add_ess_arguments options."""
+    return {'power_kW': args.ess_kw, 'energy_kWh': args.ess_kwh, 'round_trip_eff': args.ess_eff,
+            'c_rate': args.ess_c_rate, 'recharge_kW': args.ess_recharge_kw}
+
+def slot_kinds(mask_shed, mask_up):
+    """
+    Kind of every slot: SHED / UP inside the windows, otherwise RECHARGE
+    (next window is a shed window, or there is none) or DRAIN (next window is
+    an up window). Shed has priority where both masks are set.
+    """
+    mask_shed = np.asarray(mask_shed, dtype=bool)
+    mask_up = np.asarray(mask_up, dtype=bool)
+    window = np.flatnonzero(mask_shed | mask_up)
+    kinds = np.where(mask_shed, SHED, np.where(mask_up, UP, RECHARGE))
+
+    # Next window slot of every idle slot (searchsorted over the window positions)
+    nxt = np.searchsorted(window, np.arange(len(kinds)))
+    has_next = nxt < len(window)
+    next_up = np.zeros(len(kinds), dtype=bool)
+    next_up[has_next] = kinds[window[nxt[has_next]]] == UP
+    return np.where((kinds == RECHARGE) & next_up, DRAIN, kinds)
+
+def _params(power_kW, energy_kWh, round_trip_eff, c_rate, soc_min, soc_max, recharge_kW, soc_init):
+    """Per-sizing parameter vectors (broadcast to a common length K)."""
+    energy = np.inf if energy_kWh is None else energy_kWh
+    power, energy, eff, c_rate, soc_min, soc_max = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(v, dtype=float)) for v in
+          (power_kW, energy, round_trip_eff, c_rate, soc_min, soc_max)])
+    limited = np.isfinite(energy)
+    p_max = np.minimum(power, c_rate * energy)
+    p_rec = p_max if recharge_kW is None else np.minimum(np.broadcast_to(recharge_kW, p_max.shape), p_max)
+    eta = np.sqrt(eff) # charge and discharge efficiency
+
+    lo = np.where(limited, soc_min * np.where(limited, energy, 0), -np.inf)
+    hi = np.where(limited, soc_max * np.where(limited, energy, 0), np.inf)
+    init = hi if soc_init is None else np.where(limited, np.broadcast_to(soc_init, hi.shape), 0.0)
+    init = np.where(limited, init, 0.0)
+
+    # SOC step (kWh) of every slot kind, shape (4, K)
+    steps = np.stack([-p_max * DT_H / eta, p_max * DT_H * eta, p_rec * DT_H * eta, -p_rec * DT_H / eta])
+    return {'p_max': p_max, 'p_rec': p_rec, 'eta': eta, 'lo': lo, 'hi': hi, 'init': init,
+            'steps': steps, 'limited': limited}
+
+def _runs(kinds):
+    """Start, length and kind of every run of equal slot kinds."""
+    starts = np.flatnonzero(np.r_[True, kinds[1:] != kinds[:-1]])
+    lengths = np.diff(np.r_[starts, len(kinds)])
+    return starts, lengths, kinds[starts]
+
+def dispatch(mask_shed, mask_up, power_kW=ESS_POWER_KW, energy_kWh=ESS_ENERGY_KWH,
+             round_trip_eff=ROUND_TRIP_EFF, c_rate=C_RATE, soc_min=SOC_MIN, soc_max=SOC_MAX,
+             recharge_kW=None, soc_init=None):
+    """
+    ESS dispatch over the slots of the DR masks.
+
+    Every parameter is a scalar or an array of K sizings. soc_init (kWh)
+    defaults to soc_max * energy. Returns a dict of (T,) arrays, or (K, T)
+    for several sizings:
+
+        shed_kW     discharge power in shed windows (replaces Q_ESS_fixed_kW)
+        up_kW       charge power in up windows
+        grid_kW     ESS power at the meter, + charging / - discharging
+        soc_kWh     SOC at the end of every slot (NaN for unlimited energy)
+    """
+    kinds = slot_kinds(mask_shed, mask_up)
+    prm = _params(power_kW, energy_kWh, round_trip_eff, c_rate, soc_min, soc_max, recharge_kW, soc_init)
+    lo, hi, steps = prm['lo'], prm['hi'], prm['steps']
+
+    # SOC recursion over runs: n identical add-and-clip steps are one clip(soc + n * step)
+    starts, lengths, run_kinds = _runs(kinds)
+    soc_start = np.empty((len(starts), len(lo)))
+    soc = prm['init']
+    for r in range(len(starts)):
+        soc_start[r] = soc
+        soc = np.clip(soc + lengths[r] * steps[run_kinds[r]], lo, hi)
+
+    # Per-slot SOC before / after every slot
+    run_of = np.repeat(np.arange(len(starts)), lengths)
+    j = np.arange(len(kinds)) - starts[run_of]
+    step = steps[kinds].T                                   # (K, T)
+    before = np.clip(soc_start[run_of].T + j * step, lo[:, None], hi[:, None])
+    after = np.clip(before + step, lo[:, None], hi[:, None])
+
+    # Power at the meter: the full rate unless the SOC limit cut the slot short
+    full = (before + step >= lo[:, None]) & (before + step <= hi[:, None])
+    eta = prm['eta'][:, None]
+    discharge = np.where(full, np.where(kinds == SHED, prm['p_max'][:, None], prm['p_rec'][:, None]),
+                         (before - after) * eta / DT_H)
+    charge = np.where(full, np.where(kinds == UP, prm['p_max'][:, None], prm['p_rec'][:, None]),
+                      (after - before) / (eta * DT_H))
+    is_discharge = (kinds == SHED) | (kinds == DRAIN)
+    grid = np.where(is_discharge, -discharge, charge)
+    out = {
+        'shed_kW': np.where(kinds == SHED, discharge, 0.0),
+        'up_kW': np.where(kinds == UP, charge, 0.0),
+        'grid_kW': grid,
+        'soc_kWh': np.where(prm['limited'][:, None], after, np.nan),
+    }
+    if all(np.ndim(v) == 0 for v in (power_kW, energy_kWh, round_trip_eff, c_rate, soc_min, soc_max,
+                                     recharge_kW, soc_init)):
+        out = {name: values[0] for name, values in out.items()}
+    return out
+
+def sizing_table(mask_shed, mask_up, season, power_kW, energy_kWh, chunk=CHUNK, **kwargs):
+    """
+    Per-season ESS contribution for every (power_kW[i], energy_kWh[i]) sizing.
+
+    season: season label of every slot. Other keyword arguments go to
+    dispatch(). Returns one row per (sizing, season) with the mean ESS power
+    in the shed / up window slots and the share of those slots at full power.
+    Sizings are dispatched in chunks, so the per-slot arrays never hold more
+    than chunk sizings.
+    """
+    mask_shed = np.asarray(mask_shed, dtype=bool)
+    mask_up = np.asarray(mask_up, dtype=bool)
+    season = np.asarray(season).astype(str)
+    power_kW, energy_kWh = np.broadcast_arrays(np.atleast_1d(np.asarray(power_kW, dtype=float)),
+                                               np.atleast_1d(np.asarray(energy_kWh, dtype=float)))
+    seasons = list(pd.unique(season))
+
+    rows = []
+    for lo in range(0, len(power_kW), chunk):
+        power, energy = power_kW[lo:lo + chunk], energy_kWh[lo:lo + chunk]
+        out = dispatch(mask_shed, mask_up, power_kW=power, energy_kWh=energy, **kwargs)
+        p_max = np.minimum(power, kwargs.get('c_rate', C_RATE) * energy)[:, None]
+        for s in seasons:
+            in_season = season == s
+            cols = {'sizing': np.arange(lo, lo + len(power)), 'power_kW': power, 'energy_kWh': energy, 'season': s}
+            for kind, mask in [('shed', mask_shed), ('up', mask_up)]:
+                slots = in_season & mask
+                values = out[f'{kind}_kW'][:, slots]
+                cols[f'{kind}_slots'] = slots.sum()
+                with np.errstate(invalid='ignore'):
+                    cols[f'{kind}_mean_kW'] = values.mean(axis=1) if slots.any() else np.nan
+                    cols[f'{kind}_full_share'] = (values >= p_max - 1e-9).mean(axis=1) if slots.any() else np.nan
+            rows.append(pd.DataFrame(cols))
+    return pd.concat(rows).sort_values('sizing', kind='stable', ignore_index=True)
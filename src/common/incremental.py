@@ -0,0 +1,86 @@
+"""
+Incremental (month-append) support for the preprocessing -> DR -> events chain.
+
+A stage run with --incremental only recomputes rows from recompute_start():
+the end of its existing output minus the look-back the stage needs (weather
+interpolation, hourly bins, ...), or an explicit --since date. The new rows
+are merged into the existing output with merge_into().
+
+Global parameters fitted over the whole history (change-point models, PUE k,
+seasonal Qmin) are stored under PARAMS_DIR by the full run and reused by
+incremental runs; they are only refitted by a full run.
+"""
+import json
+import os
+
+import pandas as pd
+
+from common.storage import exists, load_frame, save_frame, INDEX_COL, DATE_COL
+from common.timestamps import build_datetime
+
+PARAMS_DIR = 'data/params'
+
+def add_arguments(parser):
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only recompute rows after the existing output (plus look-back) and merge them in')
+    parser.add_argument('--since', default=None,
+                        help='With --incremental: recompute from this date (e.g. 2025-05-01) instead')
+
+def params_path(name):
+    return os.path.join(PARAMS_DIR, f'{name}.json')
+
+def save_params(name, params):
+    os.makedirs(PARAMS_DIR, exist_ok=True)
+    with open(params_path(name), 'w', encoding='utf-8') as f:
+        json.dump(params, f, indent=2)
+
+def load_params(name):
+    """Stored parameters of a stage, or None if it never ran in full."""
+    if not os.path.exists(params_path(name)):
+        return None
+    with open(params_path(name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _table_times(df):
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.index
+    return pd.DatetimeIndex(build_datetime(df[DATE_COL], df['hour'], df['minute']))
+
+def output_end(path):
+    """Last timestamp in a stored output, or None if there is no output yet."""
+    if not exists(path):
+        return None
+    df = load_frame(path, columns=[])
+    if not isinstance(df.index, pd.DatetimeIndex):
+        # Table keyed by date/hour/minute instead of a datetime index
+        df = load_frame(path, columns=[DATE_COL, 'hour', 'minute'])
+    times = _table_times(df)
+    return times.max() if len(times) else None
+
+def recompute_start(output_path, lookback='0min', since=None, align=None):
+    """
+    First timestamp an incremental run has to recompute.
+
+    lookback: rows before the output end that depend on the new input
+    align:    floor the start to this frequency (e.g. '1h' for hourly bins)
+    Returns None if there is no existing output (a full run is needed).
+    """
+    if since is not None:
+        start = pd.Timestamp(since)
+    else:
+        end = output_end(output_path)
+        if end is None:
+            return None
+        start = end - pd.Timedelta(lookback)
+    return start.floor(align) if align else start
+
+def merge_into(path, new_df, start, index=True):
+    """Replace the rows of a stored output from start onwards with new_df."""
+    existing = load_frame(path)
+    keep = existing[_table_times(existing) < start]
+    if not index:
+        keep = keep.reset_index(drop=True)
+    merged = pd.concat([keep, new_df[keep.columns]])
+    if index:
+        merged.index.name = INDEX_COL
+    return save_frame(merged, path, index=index), merged
@@ -0,0 +1,156 @@
+"""
+Panel load decomposition: many data-center sites on one time grid at once.
+
+Inputs are (sites x time) matrices of measured load (kWh per interval),
+temperature and relative humidity. Every step of decompose_load.py runs for
+all sites together:
+
+    enthalpy           elementwise on the (sites, time) matrix
+    change-point fits  one fit_models_batch call per season over all sites
+    PUE calibration    k per site from its cooling share (vector expression)
+    component split    IT / Cooling / Other as (sites, time) matrices
+
+Missing samples (NaN load or weather) get weight 0 in the fits. Sites are
+independent, so large panels are split into shards of SHARD_SIZE sites (this
+also bounds the (sites, th, tc) 5P grid in memory) that can run on a process
+pool. The breakpoint grid of each season comes from the whole panel, so the
+result of a site does not depend on the sharding.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common.changepoint import batch_weather_terms, fit_models_batch, MODELS
+from common.psychrometrics import calculate_enthalpy, pressure_at_altitude
+
+GROUP_BY = 'season'     # One change-point model per 'season', per 'month', or None for the whole year
+CRITERION = 'bic'
+BREAKPOINT_STEP = 0.5   # kJ/kg, spanning the panel's P2-P98 enthalpy per group
+TARGET_PUE = 1.35
+SHARD_SIZE = 64         # Sites per batched fit / process-pool task
+
+SEASON_OF_MONTH = np.array(['', 'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                            'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'])
+FIT_COLS = ['model', 'intercept', 'heating_slope', 'heating_break', 'cooling_slope', 'cooling_break']
+
+def time_groups(index, group_by=GROUP_BY):
+    """Group label of every timestamp (same labels as decompose_load.model_groups)."""
+    if group_by == 'season':
+        return SEASON_OF_MONTH[index.month]
+    if group_by == 'month':
+        return np.char.zfill(index.month.values.astype(str), 2)
+    return np.full(len(index), 'all')
+
+def breakpoint_grids(enthalpy, groups, step=BREAKPOINT_STEP):
+    """Breakpoint grid per group from the pooled P2-P98 enthalpy of all sites."""
+    grids = {}
+    for group in pd.unique(groups):
+        x = enthalpy[:, groups == group]
+        lo, hi = np.floor(np.nanpercentile(x, 2)), np.ceil(np.nanpercentile(x, 98))
+        grids[group] = np.arange(lo, hi + step, step)
+    return grids
+
+def decompose_arrays(load, enthalpy, groups, grids, models=MODELS, criterion=CRITERION,
+                     target_pue=TARGET_PUE):
+    """
+    Decompose a (sites, time) load matrix with its enthalpy matrix.
+
+    Returns (components, fits, k): components maps IT / Cooling / Other to
+    (sites, time) arrays (NaN where the input is missing), fits maps every
+    group to the fit_models_batch result arrays and k is the Other/IT ratio
+    per site.
+    """
+    valid = np.isfinite(load) & np.isfinite(enthalpy)
+    x = np.where(valid, enthalpy, 0.0)
+    y = np.where(valid, load, 0.0)
+    w = valid.astype(float)
+
+    cooling = np.zeros_like(y)
+    fits = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for group, grid in grids.items():
+            cols = groups == group
+            fits[group] = fit_models_batch(x[:, cols], y[:, cols], w[:, cols], grid, models, criterion)
+            # Cooling hinge only; a heating-side hinge stays in the IT/Other base
+            _, cooling[:, cols] = batch_weather_terms(fits[group], x[:, cols])
+    cooling = np.where(valid, cooling, np.nan)
+
+    # PUE calibration per site: k = PUE * (1 - cooling_ratio) - 1, floored at 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.nansum(cooling, axis=1) / y.sum(axis=1)
+    k = np.maximum(0.0, target_pue * (1 - ratio) - 1)
+
+    base = np.clip(np.where(valid, load, np.nan) - cooling, 0, None)
+    components = {
+        'IT': base / (1 + k[:, None]),
+        'Cooling': cooling,
+        'Other': base * (k / (1 + k))[:, None],
+    }
+    return components, fits, k
+
+def _shard(args):
+    return decompose_arrays(*args)
+
+def decompose_panel(load, temperature, humidity, group_by=GROUP_BY, models=MODELS,
+                    criterion=CRITERION, shard_size=SHARD_SIZE, jobs=1, altitude=None):
+    """
+    Decompose a panel of sites.
+
+    load, temperature, humidity: DataFrames with a DatetimeIndex and one column
+    per site. Weather is aligned to the load's timestamps and sites.
+    jobs: worker processes for the shards (1 runs them in this process).
+    altitude: optional Series of site altitudes (m) for the station pressure.
+
+    Returns (components, sites):
+      components  tidy frame indexed by datetime with site, measured_kWh,
+                  enthalpy, IT, Cooling, Other
+      sites       one row per site: k, cooling share, final PUE and the
+                  selected model of every group (e.g. Summer_model,
+                  Summer_cooling_break)
+    """
+    sites = list(load.columns)
+    index = load.index
+    temperature = temperature.reindex(index=index, columns=sites)
+    humidity = humidity.reindex(index=index, columns=sites)
+
+    # Sites on axis 0, time on axis 1
+    y = load.to_numpy(dtype=float).T
+    pressure = pressure_at_altitude(np.zeros(len(sites)) if altitude is None else
+                                    altitude.reindex(sites).fillna(0).to_numpy(dtype=float))
+    enthalpy = calculate_enthalpy(temperature.to_numpy(dtype=float).T, humidity.to_numpy(dtype=float).T,
+                                  pressure[:, None])
+    groups = time_groups(index, group_by)
+    grids = breakpoint_grids(enthalpy, groups)
+
+    shards = [slice(i, i + shard_size) for i in range(0, len(sites), shard_size)]
+    tasks = [(y[s], enthalpy[s], groups, grids, models, criterion) for s in shards]
+    if jobs == 1 or len(tasks) == 1:
+        results = [_shard(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_shard, tasks))
+
+    parts = {name: np.concatenate([r[0][name] for r in results]) for name in ['IT', 'Cooling', 'Other']}
+    k = np.concatenate([r[2] for r in results])
+
+    # Tidy output: one row per (site, timestamp), sites in input order
+    n = len(index)
+    components = pd.DataFrame({
+        'site': pd.Categorical(np.repeat(sites, n), categories=sites),
+        'measured_kWh': y.ravel(),
+        'enthalpy': enthalpy.ravel(),
+        'IT': parts['IT'].ravel(),
+        'Cooling': parts['Cooling'].ravel(),
+        'Other': parts['Other'].ravel(),
+    }, index=pd.DatetimeIndex(np.tile(index.values, len(sites)), name='datetime'))
+
+    summary = pd.DataFrame(index=pd.Index(sites, name='site'))
+    summary['k'] = k
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary['cooling_share'] = np.nansum(parts['Cooling'], axis=1) / np.nansum(y, axis=1)
+        summary['pue'] = np.nansum(y, axis=1) / np.nansum(parts['IT'], axis=1)
+    for group in grids:
+        for col in FIT_COLS:
+            summary[f'{group}_{col}'] = np.concatenate([r[1][group][col] for r in results])
+    return components, summary
@@ -0,0 +1,126 @@
+"""
+Shared rendering layer for the figure scripts.
+
+Importing this module forces the non-interactive Agg backend (no display,
+no GUI event loop) and applies the shared figure style, so import it instead
+of matplotlib.pyplot / seaborn:
+
+    from common.plotting import plt, sns, plot_series, save_figure, render_figures
+
+matplotlib and seaborn take over a second to import. Scripts with tabular
+outputs import this module inside their figure functions only, so a
+--no-figures run never loads them.
+
+plot_series()    draws a line with at most MAX_POINTS points: longer series are
+                 reduced with Largest-Triangle-Three-Buckets (LTTB), which keeps
+                 the visual extremes of every bucket
+save_figure()    saves at DPI and closes the figure, so memory stays flat
+render_figures() runs independent figure functions on a process pool
+"""
+import gc
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg', force=True)
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+# Set style
+sns.set_theme(style="whitegrid")
+plt.rcParams['font.family'] = 'sans-serif'
+
+DPI = 300
+MAX_POINTS = 4000   # Point budget per line, about the pixel width of a 15-inch figure at 300 dpi
+
+def lttb(x, y, n_out):
+    """
+    Indices of the n_out points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept. The rest is split into
+    n_out - 2 buckets and each bucket keeps the point forming the largest
+    triangle with the previously kept point and the next bucket's mean.
+    Bucket means come from one np.add.reduceat; only the chain of kept
+    points is sequential.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket i = [edges[i], edges[i+1]), edges[i] = 1 + floor(i * (n - 2) / (n_out - 2)) in exact integers
+    edges = 1 + np.arange(n_out - 1, dtype=np.int64) * (n - 2) // (n_out - 2)
+    starts = edges[:-1]
+    # Reduce over x[:n-1] so the last bucket ends at edges[-1] = n - 1: the
+    # pinned last point belongs to no bucket
+    finite = np.isfinite(y[:n - 1])
+    counts = np.add.reduceat(finite.astype(float), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.add.reduceat(np.where(finite, x[:n - 1], 0.0), starts) / counts
+        mean_y = np.add.reduceat(np.where(finite, y[:n - 1], 0.0), starts) / counts
+    # The last bucket looks ahead to the final point
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i, (lo, hi) in enumerate(zip(starts, edges[1:])):
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        # A gap (NaN) in the bucket is kept so the line still breaks there
+        a = lo + int(np.argmax(np.where(np.isnan(area), np.inf, area)))
+        keep[i + 1] = a
+    return keep
+
+def downsample(x, y, max_points=MAX_POINTS):
+    """(x, y) reduced to at most max_points with LTTB; datetimes and pandas objects keep their type."""
+    if len(x) <= max_points:
+        return x, y
+    if isinstance(x, pd.DatetimeIndex) or np.issubdtype(np.asarray(x).dtype, np.datetime64):
+        x_num = pd.DatetimeIndex(x).asi8
+    else:
+        x_num = np.asarray(x)
+    keep = lttb(x_num, np.asarray(y, dtype=float), max_points)
+    pick = lambda v: v.iloc[keep] if isinstance(v, pd.Series) else v[keep]
+    return pick(x), pick(y)
+
+def plot_series(ax, x, y, *args, max_points=MAX_POINTS, **kwargs):
+    """ax.plot of a (long) time series through downsample()."""
+    x, y = downsample(x, y, max_points)
+    return ax.plot(x, y, *args, **kwargs)
+
+def save_figure(path, fig=None, dpi=DPI, **kwargs):
+    """
+    Save a figure (default: the current one) and close it. A closed figure is
+    a reference cycle (figure <-> canvas <-> axes), so it is collected right
+    away instead of at the next full GC pass: memory stays flat across many
+    figures.
+    """
+    fig = fig or plt.gcf()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(path, dpi=dpi, **kwargs)
+    plt.close(fig)
+    gc.collect()
+    return path
+
+def _render(task):
+    func, args = task[0], task[1:]
+    return func(*args)
+
+def render_figures(tasks, jobs=None):
+    """
+    Run independent figure tasks, each (func, *args) where func draws and
+    saves one figure and returns its path. Functions must be module-level
+    (picklable). With several CPUs the tasks run on a process pool; with one
+    CPU (or jobs=1) they run here, one after another.
+    """
+    jobs = min(len(tasks), jobs or os.cpu_count() or 1)
+    if jobs <= 1:
+        return [_render(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_render, tasks))
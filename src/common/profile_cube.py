@@ -0,0 +1,282 @@
+"""
+Load-profile cube: statistics of every load component per (season, day type,
+15-minute slot) cell, computed in one pass and cached on disk.
+
+The seasonal / weekday-weekend analyses and the annual load generator all
+reduce the same 15-minute tables by season, day type and time of day. Here
+every cell is reduced once:
+
+    values[stat, component, season, day_type, slot]
+
+    stat       count, mean, std, min, max and one pN entry per quantile
+    day_type   0 = Weekday, 1 = Weekend
+    slot       hour * 4 + minute // 15 (96 per day)
+
+Quantiles come from a single sort per component (by cell, then value) and
+linear interpolation between the two order statistics around each cell's
+position, as in pandas' groupby quantile, instead of a separate quantile call
+per group. Cells without data are NaN (count 0).
+
+load_cube() serves the cube of a stored table from CACHE_DIR and rebuilds it
+when the table file or the cube parameters change:
+
+    cube = load_cube('data/data_with_weather', ['measured_kWh'])
+    profile = profile_table(cube, by=['season', 'time'])
+"""
+import argparse
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.storage import load_frame, resolve, DATE_COL
+from common.timestamps import build_datetime
+
+CACHE_DIR = 'data/.cache/profile_cube'
+CUBE_VERSION = 1
+
+SEASONS = ['Spring', 'Summer', 'Autumn', 'Winter']
+SEASON_OF_MONTH = np.array(['', 'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                            'Summer', 'Summer', 'Autumn', 'Autumn', 'Autumn', 'Winter'])
+DAY_TYPES = ['Weekday', 'Weekend']
+SLOTS_PER_HOUR = 4
+SLOTS = 24 * SLOTS_PER_HOUR
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+BASE_STATS = ['count', 'mean', 'std', 'min', 'max']
+AXES = ['season', 'day_type', 'time']
+
+def quantile_name(q):
+    return f"p{round(q * 100):02d}"
+
+def season_of(index, season_of_month=SEASON_OF_MONTH):
+    """Season label of every timestamp (vectorized get_season)."""
+    return np.asarray(season_of_month)[index.month]
+
+def slot_times():
+    """datetime.time of every slot (00:00, 00:15, ... 23:45)."""
+    return [datetime.time(s // SLOTS_PER_HOUR, s % SLOTS_PER_HOUR * 15) for s in range(SLOTS)]
+
+def cell_codes(index, seasons, season_of_month=SEASON_OF_MONTH):
+    """Flat cell number (season, day type, slot) of every timestamp; -1 for months outside seasons."""
+    code_of_month = np.array([seasons.index(s) if s in seasons else -1 for s in season_of_month])
+    season = code_of_month[index.month]
+    weekend = (index.weekday >= 5).astype(np.int64) # 5=Sat, 6=Sun
+    slot = index.hour * SLOTS_PER_HOUR + index.minute // 15
+    codes = (season * len(DAY_TYPES) + weekend) * SLOTS + slot
+    return np.where(season >= 0, codes, -1)
+
+def _reduce_sorted(values, codes, n_cells, quantiles):
+    """Statistics per cell of one component; rows of (codes, values) in any order."""
+    ok = np.isfinite(values) & (codes >= 0)
+    values, codes = values[ok], codes[ok]
+
+    # One sort by (cell, value): every cell becomes a sorted run
+    order = np.lexsort((values, codes))
+    v, c = values[order], codes[order]
+
+    count = np.bincount(c, minlength=n_cells)
+    start = np.cumsum(count) - count
+    last = start + count - 1
+    has = count > 0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(c, weights=v, minlength=n_cells) / count
+        # Two-pass sample variance (ddof=1, NaN for single samples like pandas)
+        ss = np.bincount(c, weights=(v - mean[c]) ** 2, minlength=n_cells)
+        std = np.where(count > 1, np.sqrt(ss / (count - 1)), np.nan)
+
+    def order_stat(pos):
+        out = np.full(n_cells, np.nan)
+        out[has] = v[pos[has]]
+        return out
+
+    stats = [count.astype(float), mean, std, order_stat(start), order_stat(last)]
+    for q in quantiles:
+        pos = start + q * (count - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, last)
+        frac = pos - lo
+        a, b = order_stat(lo), order_stat(hi)
+        stats.append(a + (b - a) * frac)
+    return np.stack(stats)
+
+def build_cube(index, values, components, seasons=SEASONS, season_of_month=SEASON_OF_MONTH,
+               quantiles=QUANTILES):
+    """
+    Reduce a (time, component) array into the profile cube.
+
+    index: DatetimeIndex of the rows; values: array (len(index), len(components)).
+    Returns a dict with 'values' (stat, component, season, day type, slot) and
+    the labels of every axis ('stats', 'components', 'seasons', 'quantiles').
+    """
+    seasons = list(seasons)
+    values = np.asarray(values, dtype=float).reshape(len(index), -1)
+    codes = cell_codes(index, seasons, season_of_month)
+    n_cells = len(seasons) * len(DAY_TYPES) * SLOTS
+
+    cube = np.stack([_reduce_sorted(values[:, j], codes, n_cells, quantiles)
+                     for j in range(values.shape[1])], axis=1)
+    stats = BASE_STATS + [quantile_name(q) for q in quantiles]
+    return {
+        'values': cube.reshape(len(stats), len(components), len(seasons), len(DAY_TYPES), SLOTS),
+        'stats': stats,
+        'components': list(components),
+        'seasons': seasons,
+        'quantiles': list(quantiles),
+    }
+
+def _read_source(path, components):
+    """Datetime index and component values of a stored table."""
+    df = load_frame(path, columns=components)
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.index, df[components].to_numpy(dtype=float)
+    # Table keyed by date/hour/minute instead of a datetime index
+    df = load_frame(path, columns=[DATE_COL, 'hour', 'minute'] + list(components))
+    index = pd.DatetimeIndex(build_datetime(df[DATE_COL], df['hour'], df['minute']))
+    return index, df[components].to_numpy(dtype=float)
+
+def _cache_file(source, components, seasons, season_of_month, quantiles):
+    params = json.dumps([CUBE_VERSION, list(components), list(seasons), list(season_of_month),
+                         list(quantiles)])
+    key = hashlib.sha1(params.encode()).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(CACHE_DIR, f'{name}_{key}.npz')
+
+def load_cube(path, components, seasons=SEASONS, season_of_month=SEASON_OF_MONTH,
+              quantiles=QUANTILES, refresh=False):
+    """
+    Profile cube of a stored table, from the cache when it is still valid.
+
+    The cache is keyed by the cube parameters and invalidated by the table
+    file's size and modification time, so rewriting the table rebuilds it.
+    """
+    source = resolve(path)
+    st = os.stat(source)
+    signature = f"{source}:{st.st_size}:{st.st_mtime_ns}"
+    cache_file = _cache_file(source, components, seasons, season_of_month, quantiles)
+
+    if not refresh and os.path.exists(cache_file):
+        with np.load(cache_file) as cached:
+            if str(cached['signature']) == signature:
+                cube = {name: cached[name].tolist() for name in ['stats', 'components', 'seasons', 'quantiles']}
+                cube['values'] = cached['values']
+                return cube
+
+    index, values = _read_source(path, list(components))
+    cube = build_cube(index, values, components, seasons, season_of_month, quantiles)
+
+    # Write then rename: stages running in parallel may build the same cube
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_file, signature=signature, **cube)
+    os.replace(tmp_file, cache_file)
+    return cube
+
+def stat_array(cube, stat, component):
+    """(season, day type, slot) array of one statistic of one component."""
+    return cube['values'][cube['stats'].index(stat), cube['components'].index(component)]
+
+def profile_table(cube, by=AXES, stats=('mean',)):
+    """
+    Long table of the cube pooled over the axes not in by.
+
+    by: subset of AXES ('season', 'day_type', 'time'); time holds datetime.time
+    values. count, mean, std, min and max can be pooled; quantiles only exist
+    at full resolution (by=AXES). Columns are the by keys plus one column per
+    component, or (component, stat) columns when several stats are requested.
+    Cells without data are dropped, as in a groupby.
+    """
+    by = list(by)
+    stats = list(stats)
+    drop = tuple(i for i, axis in enumerate(AXES) if axis not in by)
+    pooled_only = [s for s in stats if s not in BASE_STATS]
+    if drop and pooled_only:
+        raise ValueError(f"Quantiles {pooled_only} cannot be pooled over {[AXES[i] for i in drop]}")
+
+    columns = {}
+    present = 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for comp in cube['components']:
+            nj = stat_array(cube, 'count', comp)
+            total = nj.sum(axis=drop)
+            present = np.maximum(present, total)
+            mean = np.nansum(nj * stat_array(cube, 'mean', comp), axis=drop) / total
+            for stat in stats:
+                if not drop or stat not in BASE_STATS:
+                    out = stat_array(cube, stat, comp)
+                elif stat == 'count':
+                    out = total
+                elif stat == 'mean':
+                    out = mean
+                elif stat == 'std':
+                    # Within-cell plus between-cell sum of squares. A single-sample
+                    # cell has std NaN but no within-cell term; its between-cell
+                    # term still counts
+                    cell_mean = stat_array(cube, 'mean', comp)
+                    within = np.where(nj > 1, (nj - 1) * stat_array(cube, 'std', comp) ** 2, 0.0)
+                    between = np.where(nj > 0, nj * (cell_mean - np.expand_dims(mean, drop)) ** 2, 0.0)
+                    ss = np.sum(within + between, axis=drop)
+                    out = np.where(total > 1, np.sqrt(ss / (total - 1)), np.nan)
+                elif stat == 'min':
+                    out = np.nanmin(np.where(nj > 0, stat_array(cube, 'min', comp), np.inf), axis=drop)
+                else:
+                    out = np.nanmax(np.where(nj > 0, stat_array(cube, 'max', comp), -np.inf), axis=drop)
+                columns[comp if len(stats) == 1 else (comp, stat)] = out.ravel()
+
+    labels = {'season': cube['seasons'], 'day_type': DAY_TYPES, 'time': slot_times()}
+    keys = pd.MultiIndex.from_product([labels[axis] for axis in by], names=by).to_frame(index=False)
+    table = pd.concat([keys, pd.DataFrame(columns)], axis=1)
+    return table[np.ravel(present) > 0].reset_index(drop=True)
+
+def check_profile_table(n=3000, seed=0):
+    """
+    Compare profile_table with a pandas groupby on random sparse data, where
+    many cells hold a single sample, for every subset of AXES. Returns the
+    largest absolute difference (raises AssertionError above 1e-9).
+    """
+    rng = np.random.default_rng(seed)
+    slots = pd.date_range('2024-01-01', '2024-12-31 23:45', freq='15min')
+    index = pd.DatetimeIndex(np.sort(rng.choice(slots, n, replace=False)))
+    values = rng.normal(100, 20, n)
+    cube = build_cube(index, values, ['x'])
+
+    day_type = np.asarray(DAY_TYPES)[(index.weekday >= 5).astype(int)]
+    frame = pd.DataFrame({'season': season_of(index), 'day_type': day_type, 'time': index.time, 'x': values})
+    worst = 0.0
+    for r in range(1, len(AXES) + 1):
+        for by in [[a for a in AXES if a in combo] for combo in itertools.combinations(AXES, r)]:
+            ours = profile_table(cube, by=by, stats=BASE_STATS)
+            ours.columns = by + BASE_STATS
+            ref = frame.groupby(by)['x'].agg(['count', 'mean', 'std', 'min', 'max']).reset_index()
+            merged = ref.merge(ours, on=by, suffixes=('_ref', ''), validate='one_to_one')
+            assert len(merged) == len(ref) == len(ours), f"Cells differ for {by}"
+            for stat in BASE_STATS:
+                a, b = merged[stat].to_numpy(dtype=float), merged[f'{stat}_ref'].to_numpy(dtype=float)
+                assert np.array_equal(np.isnan(a), np.isnan(b)), f"NaN pattern of {stat} differs for {by}"
+                diff = np.nanmax(np.abs(a - b), initial=0.0)
+                assert diff < 1e-9, f"{stat} by {by} differs by {diff}"
+                worst = max(worst, diff)
+    return worst
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build (or refresh) the profile cube of a stored table.')
+    parser.add_argument('path', nargs='?', help='Logical table path, e.g. data/data_with_weather')
+    parser.add_argument('components', nargs='*', help='Columns to reduce, e.g. measured_kWh')
+    parser.add_argument('--check', action='store_true',
+                        help='Check profile_table against a pandas groupby on sparse random data and exit')
+    args = parser.parse_args()
+    if args.check:
+        print(f"profile_table matches groupby (max abs diff {check_profile_table():.2e})")
+        sys.exit(0)
+    if not args.path or not args.components:
+        parser.error('path and components are required (unless --check)')
+
+    cube = load_cube(args.path, args.components, refresh=True)
+    print(f"{args.path}: {cube['values'].shape} ({' x '.join(['stat', 'component', 'season', 'day_type', 'slot'])})")
+    print(profile_table(cube, by=['season', 'day_type'], stats=['count', 'mean', 'std', 'min', 'max']))
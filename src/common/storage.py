@@ -0,0 +1,170 @@
+"""
+Typed columnar store for the intermediate and final time-series tables.
+
+Scripts address a table by its logical path without extension, e.g.
+'data/dr_simulation_results'. load_frame() reads the Parquet/Feather file if
+one exists and otherwise falls back to the legacy CSV, so existing outputs keep
+working until they are migrated:
+
+    python src/common/storage.py data/*.csv
+
+Either way the returned frame has a datetime64 'datetime' index, a categorical
+season column and real booleans for the mask/event flags.
+"""
+import os
+import sys
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+# Preferred on-disk format: 'parquet' or 'feather' (both need pyarrow)
+STORE_FORMAT = 'parquet'
+EXTENSIONS = {'parquet': '.parquet', 'feather': '.feather', 'csv': '.csv'}
+
+INDEX_COL = 'datetime'
+DATE_COL = 'date'
+SEASON_COLS = ['season', 'Season']
+SEASON_ORDER = ['Spring', 'Summer', 'Fall', 'Autumn', 'Winter']
+BOOL_COLS = ['mask_shed', 'mask_up', 'is_event_shed', 'is_event_up', 'is_weekday', 'is_filled']
+
+def _strip_ext(path):
+    root, ext = os.path.splitext(path)
+    return root if ext in EXTENSIONS.values() else path
+
+def resolve(path):
+    """Return the file backing a logical table path (columnar first, then CSV)."""
+    root = _strip_ext(path)
+    candidates = [STORE_FORMAT, 'parquet', 'feather'] if HAS_ARROW else []
+    for fmt in candidates + ['csv']:
+        file_path = root + EXTENSIONS[fmt]
+        if os.path.exists(file_path):
+            return file_path
+    raise FileNotFoundError(f"No stored table for {path}")
+
+def exists(path):
+    try:
+        resolve(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def _coerce(df):
+    """Apply the store's dtypes: datetime index, categorical season, real booleans."""
+    if INDEX_COL in df.columns:
+        df[INDEX_COL] = pd.to_datetime(df[INDEX_COL])
+        df = df.set_index(INDEX_COL)
+
+    for col in SEASON_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            present = set(df[col].dropna().unique())
+            categories = [s for s in SEASON_ORDER if s in present] + sorted(present - set(SEASON_ORDER))
+            df[col] = pd.Categorical(df[col], categories=categories)
+
+    for col in BOOL_COLS:
+        if col in df.columns and df[col].dtype != bool:
+            df[col] = df[col].map({True: True, False: False, 'True': True, 'False': False}).fillna(False).astype(bool)
+    return df
+
+def _since_filter(file_path, since):
+    """Parquet row-group filter for rows at or after since (datetime or date keyed)."""
+    import pyarrow.parquet as pq
+    names = pq.read_schema(file_path).names
+    if INDEX_COL in names:
+        return [(INDEX_COL, '>=', since)]
+    if DATE_COL in names:
+        return [(DATE_COL, '>=', int(since.strftime('%Y%m%d')))]
+    return None
+
+def _rows_since(df, since):
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df[df.index >= since]
+    if {DATE_COL, 'hour', 'minute'}.issubset(df.columns):
+        from common.timestamps import build_datetime
+        return df[build_datetime(df[DATE_COL], df['hour'], df['minute']) >= since.to_datetime64()]
+    return df
+
+def load_frame(path, columns=None, since=None):
+    """
+    Load a stored table.
+
+    columns: optional list of columns to read; only these (plus the datetime
+    index) are read from disk.
+    since: optional timestamp; only rows at or after it are returned (pushed
+    down to the Parquet reader). Tables keyed by date/hour/minute are
+    filtered on those columns.
+    """
+    file_path = resolve(path)
+    since = pd.Timestamp(since) if since is not None else None
+    filters = _since_filter(file_path, since) if since is not None and file_path.endswith('.parquet') else None
+
+    if file_path.endswith('.csv'):
+        usecols = None
+        if columns is not None:
+            header = pd.read_csv(file_path, nrows=0, encoding='utf-8-sig').columns
+            usecols = [c for c in [INDEX_COL] + list(columns) if c in header]
+        df = pd.read_csv(file_path, usecols=usecols, encoding='utf-8-sig')
+    elif file_path.endswith('.feather'):
+        cols = None if columns is None else [INDEX_COL] + list(columns)
+        try:
+            df = pd.read_feather(file_path, columns=cols)
+        except (KeyError, ValueError):
+            # Table without a datetime column
+            df = pd.read_feather(file_path, columns=list(columns))
+    else:
+        cols = None if columns is None else [INDEX_COL] + list(columns)
+        try:
+            df = pd.read_parquet(file_path, columns=cols, filters=filters)
+        except (KeyError, ValueError):
+            df = pd.read_parquet(file_path, columns=list(columns), filters=filters)
+
+    df = _coerce(df)
+    return _rows_since(df, since) if since is not None else df
+
+def save_frame(df, path, index=True):
+    """
+    Store a table in STORE_FORMAT (CSV if pyarrow is unavailable).
+
+    index: keep the datetime index as the 'datetime' column. Set to False for
+    tables keyed by their own columns (e.g. date/hour/minute).
+    Returns the written file path.
+    """
+    fmt = STORE_FORMAT if HAS_ARROW else 'csv'
+    file_path = _strip_ext(path) + EXTENSIONS[fmt]
+
+    out = df.reset_index() if index else df.reset_index(drop=True)
+    if index and INDEX_COL not in out.columns:
+        out = out.rename(columns={out.columns[0]: INDEX_COL})
+    out = _coerce(out)
+    if index:
+        out = out.reset_index()
+
+    if fmt == 'parquet':
+        out.to_parquet(file_path, index=False)
+    elif fmt == 'feather':
+        out.to_feather(file_path)
+    else:
+        out.to_csv(file_path, index=False)
+
+    # Drop stale copies in other formats so resolve() cannot pick them up
+    for other in EXTENSIONS.values():
+        stale = _strip_ext(path) + other
+        if stale != file_path and other != '.csv' and os.path.exists(stale):
+            os.remove(stale)
+    return file_path
+
+def migrate(csv_path):
+    """Convert a legacy CSV table into the columnar store."""
+    df = load_frame(csv_path)
+    return save_frame(df, csv_path, index=isinstance(df.index, pd.DatetimeIndex))
+
+if __name__ == "__main__":
+    if not HAS_ARROW:
+        print("pyarrow is required to migrate tables (pip install pyarrow)")
+        sys.exit(1)
+    for csv_path in sys.argv[1:]:
+        print(f"Migrating {csv_path} -> {migrate(csv_path)}")
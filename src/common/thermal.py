@@ -0,0 +1,96 @@
+"""
+Thermal-mass (first-order RC) response of cooling DR.
+
+Shedding cooling power u (kW) in a window leaves heat in the building's
+thermal mass. The cooling debt D (kWh of cooling not yet delivered) at the
+end of every slot is
+
+    D[t] = a * D[t-1] + DT_H * (u[t] - p[t]),     a = exp(-DT_H / tau_h)
+
+and is repaid as extra cooling r[t] = payback * (1 - a) / DT_H * D[t-1]: the
+zone relaxes back to its setpoint with the RC time constant tau_h. p is the
+optional pre-cooling before every shed window, which stores cold (negative
+debt) that offsets the repayment during the window.
+
+    inside a shed window    net shed u - r, decaying as the mass heats up
+    after it                rebound r
+    before it               pre-cool p (and the decay of the stored cold)
+
+With payback = 1 every deferred kWh is eventually repaid. D is one IIR
+filter over the whole series (scipy.signal.lfilter), so all events of a
+year, including overlapping tails, are one call. tau_h=None switches the
+model off: gross shed u, no rebound. Slots are taken as consecutive DT_H
+intervals.
+"""
+import numpy as np
+
+DT_H = 0.25               # 15-min slots
+
+TAU_H = None              # Thermal time constant in hours (None: no thermal model)
+PAYBACK = 1.0             # Share of the deferred cooling that is repaid
+PRECOOL_H = 0.0           # Pre-cool hours before every shed window
+PRECOOL_ALPHA = 0.10      # Pre-cool power as a share of P_Cool
+
+def add_thermal_arguments(parser):
+    parser.add_argument('--thermal-tau-h', type=float, default=TAU_H,
+                        help='Thermal time constant of the cooling shed in hours (default: no rebound model)')
+    parser.add_argument('--thermal-payback', type=float, default=PAYBACK,
+                        help=f'Share of the deferred cooling energy repaid after the shed (default {PAYBACK:g})')
+    parser.add_argument('--precool-h', type=float, default=PRECOOL_H,
+                        help='Pre-cool hours before every shed window (needs --thermal-tau-h)')
+    parser.add_argument('--precool-alpha', type=float, default=PRECOOL_ALPHA,
+                        help=f'Pre-cool power as a share of P_Cool (default {PRECOOL_ALPHA:g})')
+
+def thermal_config(args):
+    """cooling_response() keyword arguments from the add_thermal_arguments options."""
+    return {'tau_h': args.thermal_tau_h, 'payback': args.thermal_payback,
+            'precool_h': args.precool_h, 'precool_alpha': args.precool_alpha}
+
+def precool_mask(mask_shed, hours):
+    """Slots within `hours` before the start of a shed window (outside the windows)."""
+    mask_shed = np.asarray(mask_shed, dtype=bool)
+    n = int(round(hours / DT_H))
+    if n <= 0:
+        return np.zeros(len(mask_shed), dtype=bool)
+    starts = np.flatnonzero(mask_shed & ~np.r_[False, mask_shed[:-1]])
+    # Distance of every slot to the next window start
+    nxt = np.searchsorted(starts, np.arange(len(mask_shed)))
+    has_next = nxt < len(starts)
+    lead = np.full(len(mask_shed), n + 1)
+    lead[has_next] = starts[nxt[has_next]] - np.flatnonzero(has_next)
+    return ~mask_shed & (lead <= n)
+
+def cooling_response(mask_shed, p_cool, alpha_cool, tau_h=TAU_H, payback=PAYBACK, precool_h=PRECOOL_H,
+                     precool_alpha=PRECOOL_ALPHA, debt_init=0.0):
+    """
+    Cooling DR of the shed windows with thermal rebound.
+
+    p_cool: cooling power (kW) per slot; alpha_cool: shed share (scalar or
+    per slot). p_cool may also be (K, T) for K load scenarios. debt_init is
+    the cooling debt (kWh) before the first slot. Returns a dict of arrays:
+
+        shed_kW     net cooling shed inside the windows (0 outside)
+        rebound_kW  repayment outside the windows
+        precool_kW  pre-cool power before the windows
+        debt_kWh    cooling debt at the end of every slot (NaN without the model)
+    """
+    mask_shed = np.asarray(mask_shed, dtype=bool)
+    p_cool = np.asarray(p_cool, dtype=float)
+    gross = np.where(mask_shed, alpha_cool * p_cool, 0.0)
+    if tau_h is None:
+        zeros = np.zeros_like(gross)
+        return {'shed_kW': gross, 'rebound_kW': zeros, 'precool_kW': zeros,
+                'debt_kWh': np.full_like(gross, np.nan)}
+
+    from scipy.signal import lfilter   # Only needed with the thermal model
+    precool = np.where(precool_mask(mask_shed, precool_h), precool_alpha * p_cool, 0.0)
+    a = np.exp(-DT_H / tau_h)
+    debt_init = np.broadcast_to(np.asarray(debt_init, dtype=float), gross.shape[:-1])
+    debt, _ = lfilter([DT_H], [1.0, -a], gross - precool, axis=-1, zi=(a * debt_init)[..., None])
+    repay = payback * (1 - a) / DT_H * np.concatenate([debt_init[..., None], debt[..., :-1]], axis=-1)
+    return {
+        'shed_kW': np.where(mask_shed, gross - repay, 0.0),
+        'rebound_kW': np.where(mask_shed, 0.0, repay),
+        'precool_kW': precool,
+        'debt_kWh': debt,
+    }
@@ -0,0 +1,65 @@
+"""
+Vectorized timestamps for the integer date/hour/minute columns.
+
+The load, weather and DR tables key every interval by a YYYYMMDD 'date' plus
+'hour' and 'minute' integers. Building datetime64 by formatting those as
+strings and parsing them back with pd.to_datetime is slow on large files, so
+here the epoch day is computed directly with the days-from-civil algorithm
+(proleptic Gregorian, Howard Hinnant) and everything stays int64.
+
+    df.index = build_datetime_index(df)
+"""
+import numpy as np
+import pandas as pd
+
+NS_PER_MIN = 60 * 10**9
+NS_PER_DAY = 24 * 60 * NS_PER_MIN
+
+def days_from_civil(year, month, day):
+    """Days since 1970-01-01 for integer year/month/day arrays."""
+    y = np.asarray(year, dtype=np.int64) - (np.asarray(month) <= 2)
+    m = np.asarray(month, dtype=np.int64)
+    d = np.asarray(day, dtype=np.int64)
+
+    era = np.floor_divide(y, 400)
+    yoe = y - era * 400                                  # [0, 399]
+    mp = (m + 9) % 12                                    # March = 0
+    doy = (153 * mp + 2) // 5 + d - 1                    # [0, 365]
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy        # [0, 146096]
+    return era * 146097 + doe - 719468
+
+def civil_from_days(days):
+    """Inverse of days_from_civil: (year, month, day) integer arrays."""
+    z = np.asarray(days, dtype=np.int64) + 719468
+    era = np.floor_divide(z, 146097)
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    year = yoe + era * 400 + (month <= 2)
+    return year, month, day
+
+def to_timestamp_ns(date, hour, minute):
+    """Build int64 epoch-ns timestamps from YYYYMMDD / hour / minute integer columns."""
+    date = np.asarray(date, dtype=np.int64)
+    days = days_from_civil(date // 10000, date // 100 % 100, date % 100)
+    minutes = np.asarray(hour, dtype=np.int64) * 60 + np.asarray(minute, dtype=np.int64)
+    return days * NS_PER_DAY + minutes * NS_PER_MIN
+
+def from_timestamp_ns(t_ns):
+    """Inverse of to_timestamp_ns: returns (YYYYMMDD, hour, minute) integer arrays."""
+    t_ns = np.asarray(t_ns, dtype=np.int64)
+    year, month, day = civil_from_days(np.floor_divide(t_ns, NS_PER_DAY))
+    minutes = np.mod(t_ns, NS_PER_DAY) // NS_PER_MIN
+    return year * 10000 + month * 100 + day, minutes // 60, minutes % 60
+
+def build_datetime(date, hour, minute):
+    """datetime64[ns] array from YYYYMMDD / hour / minute integer columns."""
+    return to_timestamp_ns(date, hour, minute).view('M8[ns]')
+
+def build_datetime_index(df, date_col='date', hour_col='hour', minute_col='minute'):
+    """DatetimeIndex named 'datetime' built from a frame's date/hour/minute columns."""
+    values = build_datetime(df[date_col].values, df[hour_col].values, df[minute_col].values)
+    return pd.DatetimeIndex(values, name='datetime')
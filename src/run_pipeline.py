@@ -0,0 +1,377 @@
+"""
+Dependency-aware runner for the analysis pipeline.
+
+Every stage declares its script, the files it reads and the files it writes.
+A stage is skipped when the hash of its script (plus src/common), arguments
+and input file contents matches the previous successful run and all its
+outputs exist. Stages whose inputs are ready run concurrently in a process
+pool, so the visualize_* scripts and the revenue analyses run side by side.
+
+Run from the repository root:
+
+    python src/run_pipeline.py                     # everything that is out of date
+    python src/run_pipeline.py analyze_rrmse       # one target and its upstream stages
+    python src/run_pipeline.py --dry-run           # show what would run
+    python src/run_pipeline.py --force -j 4        # rerun everything on 4 workers
+    python src/run_pipeline.py --no-figures        # data outputs only, skip figure-only stages
+"""
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SRC_DIR)
+from common.storage import EXTENSIONS, resolve
+
+STATE_DIR = 'data/.cache/pipeline'
+STATE_FILE = os.path.join(STATE_DIR, 'state.json')
+LOG_DIR = os.path.join(STATE_DIR, 'logs')
+FIGURE_EXT = '.png'
+
+# Tables are given as logical store paths (no extension); raw files and
+# figures as file paths or glob patterns. Stages with 'incremental' accept
+# --incremental/--since (see common/incremental.py); stages with 'figures'
+# accept --no-figures (data outputs only, no matplotlib/seaborn import).
+STAGES = [
+    # 01 Preprocessing
+    {'name': 'merge_power_source', 'script': '01_Preprocessing/merge_power_source.py',
+     'inputs': ['power_source_data/*.xlsx'],
+     'outputs': ['data/power_source_integrated']},
+    {'name': 'generate_annual_load', 'script': '01_Preprocessing/generate_annual_load.py',
+     'inputs': ['data/data_center_load_clean'],
+     'outputs': ['data/data_center_load_annualized_20240601_20250531']},
+    {'name': 'clean_smp', 'script': '01_Preprocessing/clean_smp.py',
+     'inputs': ['data/SMP_system_price.csv'],
+     'outputs': ['data/smp_clean']},
+    {'name': 'clean_weather', 'script': '01_Preprocessing/clean_weather.py', 'incremental': True,
+     'inputs': ['data/data_center_load_annualized_20240601_20250531', 'data/data_weather.csv'],
+     'outputs': ['data/data_with_weather']},
+
+    # 02 Load Analysis
+    {'name': 'decompose_load', 'script': '02_Load_Analysis/decompose_load.py', 'incremental': True, 'figures': True,
+     'inputs': ['data/data_with_weather'],
+     'outputs': ['data/data_decomposition', 'figures/figure_decomposition.png']},
+    {'name': 'visualize_data', 'script': '02_Load_Analysis/visualize_data.py',
+     'inputs': ['data/data_with_weather'],
+     'outputs': ['figure_1_full_timeseries.png', 'figure_2_daily_profile.png',
+                 'figure_3_monthly_dist.png', 'figure_4_histogram.png']},
+    {'name': 'visualize_seasonal', 'script': '02_Load_Analysis/visualize_seasonal.py',
+     'inputs': ['data/data_with_weather'],
+     'outputs': ['figures/figure_5_seasonal_boxplot.png', 'figures/figure_6_seasonal_daily_profile.png']},
+    {'name': 'visualize_weekday_weekend', 'script': '02_Load_Analysis/visualize_weekday_weekend.py',
+     'inputs': ['data/data_with_weather'],
+     'outputs': ['figures/figure_7_overall_weekday_weekend_box.png',
+                 'figures/figure_8_overall_weekday_weekend_profile.png',
+                 'figures/figure_9_seasonal_weekday_weekend_box.png', 'figures/figure_10_*_profile.png']},
+
+    # 03 DR Modelling
+    {'name': 'simulate_dr', 'script': '03_DR_Modelling/simulate_dr.py', 'incremental': True,
+     'inputs': ['data/data_decomposition'],
+     'outputs': ['data/dr_simulation_results']},
+    {'name': 'process_dr_events_1h', 'script': '03_DR_Modelling/process_dr_events_1h.py', 'incremental': True,
+     'inputs': ['data/dr_simulation_results', 'data/smp_clean'],
+     'outputs': ['data/dr_events_1h']},
+    {'name': 'qc_dr_results', 'script': '03_DR_Modelling/qc_dr_results.py',
+     'inputs': ['data/dr_simulation_results'],
+     'outputs': []},
+    {'name': 'analyze_dr_final', 'script': '03_DR_Modelling/analyze_dr_final.py', 'figures': True,
+     'inputs': ['data/dr_simulation_results'],
+     'outputs': ['data/dr_final_stats_summary.csv', 'data/dr_final_components.csv',
+                 'figures/06_Final_Report/final_figure_*.png']},
+    {'name': 'sweep_dr_params', 'script': '03_DR_Modelling/sweep_dr_params.py',
+     'inputs': ['data/dr_simulation_results'],
+     'outputs': ['data/dr_param_sweep']},
+    {'name': 'size_ess', 'script': '03_DR_Modelling/size_ess.py',
+     'inputs': ['data/dr_simulation_results'],
+     'outputs': ['data/ess_sizing']},
+    {'name': 'analyze_dr_potential', 'script': '03_DR_Modelling/analyze_dr_potential.py', 'figures': True,
+     'inputs': ['data/smp_clean', 'data/power_source_integrated'],
+     'outputs': ['figures/04_DR_Analysis/figure_seasonal_profile_*.png']},
+    {'name': 'estimate_rated_load', 'script': '03_DR_Modelling/estimate_rated_load.py', 'figures': True,
+     'inputs': ['data/data_with_weather'],
+     'outputs': ['figures/05_Capacity_Planning/figure_load_duration_curve.png']},
+    {'name': 'rank_power_sources', 'script': '03_DR_Modelling/rank_power_sources.py',
+     'inputs': ['data/power_source_integrated'],
+     'outputs': []},
+    {'name': 'visualize_decomposition_seasonal', 'script': '03_DR_Modelling/visualize_decomposition_seasonal.py',
+     'inputs': ['data/data_decomposition'],
+     'outputs': ['figures/03_Load_Decomposition/figure_decomposition_*.png']},
+    {'name': 'visualize_dr_components', 'script': '03_DR_Modelling/visualize_dr_components.py',
+     'inputs': ['data/dr_simulation_results'],
+     'outputs': ['figures/04_DR_Analysis/figure_dr_components_stacked.png']},
+    {'name': 'visualize_dr_distribution', 'script': '03_DR_Modelling/visualize_dr_distribution.py',
+     'inputs': ['data/dr_simulation_results'],
+     'outputs': ['figures/04_DR_Analysis/figure_dr_distribution_*.png']},
+    {'name': 'visualize_dr_no_ess', 'script': '03_DR_Modelling/visualize_dr_no_ess.py',
+     'inputs': ['data/dr_simulation_results'],
+     'outputs': ['figures/04_DR_Analysis/final_figure_3_components_no_ess.png']},
+    {'name': 'visualize_dr_profile', 'script': '03_DR_Modelling/visualize_dr_profile.py',
+     'inputs': ['data/dr_simulation_results'],
+     'outputs': ['figures/04_DR_Analysis/figure_dr_profile_*.png']},
+
+    # 04 Economic Analysis
+    {'name': 'analyze_revenue', 'script': '04_Economic_Analysis/analyze_revenue.py', 'figures': True,
+     'inputs': ['data/dr_simulation_results', 'data/smp_clean'],
+     'outputs': ['data/revenue_results.csv', 'figures/06_Final_Report/figure_revenue_sensitivity.png']},
+    {'name': 'analyze_revenue_final', 'script': '04_Economic_Analysis/analyze_revenue_final.py', 'figures': True,
+     'inputs': ['data/dr_events_1h'],
+     'outputs': ['data/revenue_results_final.csv', 'figures/06_Final_Report/figure_revenue_sensitivity_final.png']},
+    {'name': 'analyze_revenue_monthly', 'script': '04_Economic_Analysis/analyze_revenue_monthly.py', 'figures': True,
+     'inputs': ['data/dr_events_1h'],
+     'outputs': ['data/revenue_capacity_monthly.csv', 'figures/06_Final_Report/figure_monthly_cp_rates.png',
+                 'figures/06_Final_Report/figure_annual_cp_comparison.png', 'figures/06_Final_Report/figure_monthly_cp_revenue.png']},
+    {'name': 'analyze_revenue_refined', 'script': '04_Economic_Analysis/analyze_revenue_refined.py', 'figures': True,
+     'inputs': ['data/dr_events_1h'],
+     'outputs': ['data/revenue_results_refined.csv', 'figures/06_Final_Report/figure_revenue_sensitivity_refined.png',
+                 'figures/06_Final_Report/figure_smp_distribution_check.png']},
+
+    # 05 Reliability
+    {'name': 'analyze_rrmse', 'script': '05_Reliability/analyze_rrmse.py', 'figures': True,
+     'inputs': ['data/dr_events_1h'],
+     'outputs': ['data/reliability_metrics.csv', 'figures/06_Final_Report/figure_reliability_distribution.png']},
+
+    # 06 Long-Term Strategy (assumptions are constants in the scripts)
+    {'name': 'analyze_dcf', 'script': '06_LongTerm_Strategy/analyze_dcf.py', 'figures': True,
+     'inputs': [],
+     'outputs': ['data/dcf_30y_projection.csv', 'data/dcf_summary_metrics.csv',
+                 'figures/06_Final_Report/figure_dcf_revenue_composition.png', 'figures/06_Final_Report/figure_dcf_cashflow.png']},
+    {'name': 'analyze_dcf_50mw', 'script': '06_LongTerm_Strategy/analyze_dcf_50mw.py', 'figures': True,
+     'inputs': [],
+     'outputs': ['data/dcf_30y_projection_50mw.csv', 'figures/06_Final_Report/figure_dcf_cashflow_50mw.png']},
+    {'name': 'analyze_dcf_sensitivity', 'script': '06_LongTerm_Strategy/analyze_dcf_sensitivity.py', 'figures': True,
+     'inputs': [],
+     'outputs': ['data/dcf_sensitivity_results.csv', 'figures/06_Final_Report/figure_dcf_tornado.png']},
+]
+
+def _key(path):
+    """Normalize a table path so 'data/x', 'data/x.csv' and 'data/x.parquet' match."""
+    root, ext = os.path.splitext(path)
+    return root if ext in EXTENSIONS.values() else path
+
+def build_graph(stages):
+    """Map every stage to the stages producing its inputs."""
+    producers = {}
+    for stage in stages:
+        for out in stage['outputs']:
+            producers[_key(out)] = stage['name']
+    return {stage['name']: sorted({producers[_key(i)] for i in stage['inputs'] if _key(i) in producers} - {stage['name']})
+            for stage in stages}
+
+def select(stages, graph, targets):
+    """Targets plus everything upstream of them, in declaration order."""
+    if not targets:
+        return stages
+    unknown = set(targets) - set(graph)
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {sorted(unknown)}")
+    needed, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(graph[name])
+    return [s for s in stages if s['name'] in needed]
+
+# --- Hashing ---
+
+_file_hashes = {}
+
+def file_hash(path):
+    """sha256 of a file, memoized on (size, mtime) within this run."""
+    st = os.stat(path)
+    memo = (path, st.st_size, st.st_mtime_ns)
+    if memo not in _file_hashes:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        _file_hashes[memo] = h.hexdigest()
+    return _file_hashes[memo]
+
+def input_files(pattern):
+    """Files behind a declared input: glob matches, or the stored table file."""
+    if any(ch in pattern for ch in '*?['):
+        return sorted(glob.glob(pattern))
+    try:
+        return [resolve(pattern)]
+    except FileNotFoundError:
+        return [pattern] if os.path.exists(pattern) else []
+
+def is_figure(path):
+    return path.endswith(FIGURE_EXT)
+
+def figure_only(stage):
+    """Stages whose every output is a figure and that cannot skip them (the visualize_* scripts)."""
+    return not stage.get('figures') and bool(stage['outputs']) and all(is_figure(o) for o in stage['outputs'])
+
+def outputs_exist(stage, figures=True):
+    for out in stage['outputs']:
+        if not figures and is_figure(out):
+            continue
+        if not input_files(out):
+            return False
+    return True
+
+def code_hash(stage):
+    files = [os.path.join(SRC_DIR, stage['script'])] + sorted(glob.glob(os.path.join(SRC_DIR, 'common', '*.py')))
+    return [file_hash(f) for f in files]
+
+def stage_hash(stage, args):
+    payload = {'code': code_hash(stage), 'args': args, 'inputs': {}}
+    for pattern in stage['inputs']:
+        files = input_files(pattern)
+        if not files:
+            raise FileNotFoundError(f"{stage['name']}: missing input {pattern}")
+        payload['inputs'][pattern] = [(f, file_hash(f)) for f in files]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_state(state):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+# --- Execution ---
+
+def run_stage(script, args, log_path):
+    """Run one pipeline script as __main__ in this worker process, logging its output."""
+    import runpy
+    import traceback
+    os.environ.setdefault('MPLBACKEND', 'Agg')  # Workers have no display
+
+    t0 = time.perf_counter()
+    ok = True
+    with open(log_path, 'w', encoding='utf-8') as log:
+        sys.stdout = sys.stderr = log
+        sys.argv = [script] + args
+        try:
+            runpy.run_path(script, run_name='__main__')
+        except SystemExit as e:
+            ok = e.code in (None, 0)
+        except BaseException:
+            traceback.print_exc()
+            ok = False
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    return ok, time.perf_counter() - t0
+
+def run_pipeline(targets=None, force=False, jobs=None, dry_run=False, incremental=False, figures=True):
+    graph = build_graph(STAGES)
+    stages = select(STAGES, graph, targets)
+    if not figures:
+        stages = [s for s in stages if not figure_only(s)]
+    by_name = {s['name']: s for s in stages}
+    state = {} if force else load_state()
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    def stage_args(stage):
+        args = ['--incremental'] if incremental and stage.get('incremental') else []
+        if not figures and stage.get('figures'):
+            args.append('--no-figures')
+        return args
+
+    pending = {s['name'] for s in stages}
+    status = {}    # name -> 'ran' | 'cached' | 'failed' | 'blocked'
+    running = {}   # future -> (name, hash)
+
+    # Stages run in fresh processes (spawn, one task per child) so matplotlib
+    # and warning state never leaks from one script into the next
+    pool = None if dry_run else ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn'),
+                                                    max_tasks_per_child=1)
+    try:
+        while pending or running:
+            # Start every stage whose upstream stages are finished
+            for name in [n for n in sorted(pending, key=list(by_name).index)
+                         if all(u in status for u in graph[n] if u in by_name)]:
+                pending.discard(name)
+                stage = by_name[name]
+                upstream = [status[u] for u in graph[name] if u in by_name]
+                if any(u in ('failed', 'blocked') for u in upstream):
+                    status[name] = 'blocked'
+                    print(f"[blocked] {name}")
+                    continue
+
+                if dry_run:
+                    # Upstream reruns may change this stage's inputs
+                    try:
+                        h = stage_hash(stage, stage_args(stage))
+                        stale = state.get(name) != h or not outputs_exist(stage, figures)
+                    except FileNotFoundError:
+                        stale = True
+                    status[name] = 'ran' if stale or 'ran' in upstream else 'cached'
+                    print(f"[{'run' if status[name] == 'ran' else 'up to date'}] {name}")
+                    continue
+
+                try:
+                    h = stage_hash(stage, stage_args(stage))
+                except FileNotFoundError as e:
+                    status[name] = 'failed'
+                    print(f"[failed] {e}")
+                    continue
+                if state.get(name) == h and outputs_exist(stage, figures):
+                    status[name] = 'cached'
+                    print(f"[up to date] {name}")
+                    continue
+
+                print(f"[start] {name}")
+                log_path = os.path.join(LOG_DIR, f'{name}.log')
+                future = pool.submit(run_stage, os.path.join(SRC_DIR, stage['script']), stage_args(stage), log_path)
+                running[future] = (name, h)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, h = running.pop(future)
+                ok, seconds = future.result()
+                if ok and outputs_exist(by_name[name], figures):
+                    status[name] = 'ran'
+                    state[name] = h
+                    save_state(state)
+                    print(f"[done] {name} ({seconds:.1f}s)")
+                else:
+                    status[name] = 'failed'
+                    state.pop(name, None)
+                    save_state(state)
+                    print(f"[failed] {name} ({seconds:.1f}s), see {os.path.join(LOG_DIR, name + '.log')}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    counts = {k: sum(1 for v in status.values() if v == k) for k in ['ran', 'cached', 'failed', 'blocked']}
+    label = 'would run' if dry_run else 'ran'
+    print(f"\n{counts['ran']} {label}, {counts['cached']} up to date, "
+          f"{counts['failed']} failed, {counts['blocked']} blocked")
+    return status
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the pipeline stages that are out of date.')
+    parser.add_argument('targets', nargs='*', help='Stage names (default: all)')
+    parser.add_argument('--force', action='store_true', help='Ignore cached hashes and rerun')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--dry-run', action='store_true', help='Only show which stages would run')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Pass --incremental to stages that support it')
+    parser.add_argument('--no-figures', action='store_true',
+                        help='Data outputs only: pass --no-figures to stages that support it and skip figure-only stages')
+    parser.add_argument('--list', action='store_true', help='List stages and their upstream stages')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, upstream in build_graph(STAGES).items():
+            print(f"{name:34s} <- {', '.join(upstream) if upstream else '-'}")
+        sys.exit(0)
+
+    status = run_pipeline(args.targets, args.force, args.jobs, args.dry_run, args.incremental, not args.no_figures)
+    sys.exit(1 if any(v in ('failed', 'blocked') for v in status.values()) else 0)